@@ -1,6 +1,8 @@
-from http.client import NOT_EXTENDED
 import numpy as np
 import itertools
+import math
+
+from TimeBudget import Deadline
 
 minInsDenominator = 0.6
 minInsNumerator = 1
@@ -10,8 +12,22 @@ precision = 0.0001
 exponents = [x for x in np.arange(0.1, 1.5, 0.1)]
 precisionList = [0.1, 0.01, 0.001, 0.0001]
 rclSize = 4
+# Cross-check incremental route and solution totals after every applied move
+debugBookkeeping = False
+# Nearest neighbours per node scanned by relocation and swap, None scans full neighbourhoods
+granularNeighbours = None
+# Skip local search origins whose route is unchanged since they last had no improving move
+dontLookBits = False
+# Route pairs whose length product reaches this are priced with array operations, None never batches
+batchMoveThreshold = 100
+# MinimumInsertions scores customers lazily in upper bound order, see `BoundedInsertionTable`
+boundedInsertions = False
 tuningIterator = 0
 noTuningLeft = False
+# Globals a solve depends on, copied into worker processes
+SolverSettings = ('minInsDenominator', 'minInsNumerator', 'nnDenominator', 'nnNumerator', 'precision', 'rclSize',
+                  'debugBookkeeping', 'granularNeighbours', 'dontLookBits', 'batchMoveThreshold',
+                  'boundedInsertions')
 
 combinations = [x for x in itertools.product(exponents, repeat=2)]
 
@@ -23,3 +39,86 @@ def TuneExponents():
     tuningIterator += 1
     if tuningIterator >= len(combinations) - 1:
         return True
+
+
+def SetExponents(combination):
+    """Sets the insertion exponents used by `MinimumInsertions`
+
+    Args:
+        combination `tuple`: (denominator, numerator) pair from `combinations`
+    """
+    global minInsDenominator, minInsNumerator
+    minInsDenominator, minInsNumerator = combination
+
+
+def GetSettings() -> dict:
+    """Returns the current values of `SolverSettings`"""
+    return {name: globals()[name] for name in SolverSettings}
+
+
+def ApplySettings(settings: dict):
+    """Sets globals from a `GetSettings` dict"""
+    globals().update((name, settings[name]) for name in SolverSettings)
+
+
+def RaceExponents(evaluate, seeds=range(10, 60, 10), eta=3, deadline: Deadline = None):
+    """Races all exponent combinations with successive halving
+
+    Every combination is first evaluated on a single seed. After each round
+    only the best `1 / eta` of them survive, and the survivors are evaluated
+    again on `eta` times as many seeds, until the full seed list is reached.
+    Most combinations are dropped after one cheap start instead of a full solve.
+
+    With a deadline, every round gets an equal share of the time left and
+    splits it evenly over its evaluations, time unused by one evaluation
+    going to the next. Once the deadline expires the race stops with the best
+    solution so far.
+
+    Args:
+        evaluate: Callable taking a list of seeds and a `Deadline`, and returning
+            a `Solution` for the exponents currently set
+        seeds (`Iterable[int]`, optional): Seeds of a full evaluation
+        eta (`int`, optional): Elimination and budget growth factor. Defaults to 3.
+        deadline (`Deadline`, optional): Time budget of the race. Defaults to no time limit.
+
+    Returns:
+        tuple: Best `Solution` found and its (denominator, numerator) combination.
+        The winning combination is left set.
+    """
+    seeds = list(seeds)
+    deadline = deadline or Deadline()
+    survivors = list(combinations)
+    budget = 1
+    roundsLeft = RaceRounds(len(survivors), len(seeds), eta)
+    bestSol, bestCombination = None, None
+    while True:
+        budget = min(budget, len(seeds))
+        roundDeadline = deadline.Slice(1 / roundsLeft)
+        results = []
+        for i, combination in enumerate(survivors):
+            if bestSol is not None and deadline.Expired():
+                break
+            SetExponents(combination)
+            sol = evaluate(seeds[:budget], roundDeadline.Slice(1 / (len(survivors) - i)))
+            results.append((sol.profit, combination))
+            if bestSol is None or sol.profit > bestSol.profit:
+                bestSol, bestCombination = sol, combination
+        if budget == len(seeds) or deadline.Expired():
+            break
+        # Stable sort keeps grid order among equally good combinations
+        results.sort(key=lambda x: x[0], reverse=True)
+        survivors = [c for _, c in results[:math.ceil(len(results) / eta)]]
+        budget = len(seeds) if len(survivors) == 1 else budget * eta
+        roundsLeft -= 1
+    SetExponents(bestCombination)
+    return bestSol, bestCombination
+
+
+def RaceRounds(candidates: int, seeds: int, eta: int) -> int:
+    """Counts the rounds `RaceExponents` runs for a number of combinations and seeds"""
+    rounds, budget = 1, 1
+    while min(budget, seeds) < seeds:
+        candidates = math.ceil(candidates / eta)
+        budget = seeds if candidates == 1 else budget * eta
+        rounds += 1
+    return rounds
@@ -0,0 +1,228 @@
+"""Solves many instances in one warm process pool
+
+Instances come from a directory, where every .csv or tab separated .txt
+file is an instance and a .csv is preferred over a .txt of the same name,
+or from a manifest listing one instance path per line. Each instance gets
+its own solution and log file in the output directory. Results are yielded
+as instances finish. Outputs are named <instance>.solution.txt and
+<instance>.log, so they never overwrite an instance file even when written
+next to the instances.
+
+Usage:
+    python BatchSolver.py instances --out solutions --workers 8 --time-limit 30
+    python BatchSolver.py nightly.manifest --out solutions --summary results.jsonl
+"""
+import argparse
+import contextlib
+import json
+import multiprocessing
+import os
+import time
+
+import AdaptiveTuning as tune
+from Model import Model
+from Solver import Solver
+from TimeBudget import Deadline
+from Testing import exportSolution
+
+InstanceExtensions = ('.csv', '.txt')
+SolutionSuffix = '.solution'
+
+
+class BatchResult:
+    """Outcome of one batch instance
+
+    Attributes:
+        - index: Position of the instance in the batch
+        - instance: Instance file path
+        - name: Unique output name of the instance
+        - profit: Profit of the best solution, None on error
+        - duration: Total duration of the best solution, None on error
+        - routes: Node id sequences of the best solution's routes
+        - seconds: Wall time spent on the instance
+        - solutionPath: Written solution file, None on error
+        - logPath: File holding everything printed while solving
+        - error: Error message if solving failed, None otherwise
+    """
+    __slots__ = ('index', 'instance', 'name', 'profit', 'duration', 'routes', 'seconds', 'solutionPath',
+                 'logPath', 'error')
+
+    def __init__(self, index, instance, name, profit=None, duration=None, routes=None, seconds=0.0,
+                 solutionPath=None, logPath=None, error=None):
+        self.index = index
+        self.instance = instance
+        self.name = name
+        self.profit = profit
+        self.duration = duration
+        self.routes = routes or []
+        self.seconds = seconds
+        self.solutionPath = solutionPath
+        self.logPath = logPath
+        self.error = error
+
+    def AsDict(self) -> dict:
+        """Returns the result as a JSON serializable dict"""
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+def InstancePaths(source: str) -> list:
+    """Lists the instance files of a directory or a manifest
+
+    Args:
+        source `str`: Directory of instance files, or a manifest file with one
+            instance path per line. Blank lines and lines starting with # are
+            skipped, relative paths are relative to the manifest.
+
+    Returns:
+        list: Instance file paths, sorted by name for a directory and skipping solution files and
+            subdirectories, in listed order for a manifest
+    """
+    if os.path.isdir(source):
+        chosen = {}
+        for entry in sorted(os.listdir(source)):
+            stem, extension = os.path.splitext(entry)
+            path = os.path.join(source, entry)
+            if extension.lower() in InstanceExtensions and not stem.endswith(SolutionSuffix) and \
+                    (stem not in chosen or extension.lower() == '.csv') and os.path.isfile(path):
+                chosen[stem] = path
+        return [chosen[stem] for stem in sorted(chosen)]
+    base = os.path.dirname(os.path.abspath(source))
+    with open(source) as f:
+        lines = [line.strip() for line in f]
+    return [os.path.join(base, line) for line in lines if line and not line.startswith('#')]
+
+
+def OutputNames(paths: list) -> list:
+    """Names every instance after its file, numbering repeated names in order"""
+    names = []
+    used = set()
+    for path in paths:
+        stem = os.path.splitext(os.path.basename(path))[0]
+        name, copyNumber = stem, 1
+        while name in used:
+            copyNumber += 1
+            name = "%s_%d" % (stem, copyNumber)
+        used.add(name)
+        names.append(name)
+    return names
+
+
+def InitBatchWorker(settings: dict):
+    """Pool initializer copying the tuning settings of the batch"""
+    tune.ApplySettings(settings)
+
+
+def SolveInstance(task) -> BatchResult:
+    """Solves one batch instance and writes its solution and log
+
+    The tuning settings are restored afterwards, since the exponent race
+    leaves its winner set and the next instance must start from the batch
+    settings. Errors are returned in the result instead of raised, so one
+    bad instance does not stop the batch.
+
+    Args:
+        task `tuple`: (index, instance path, output name, options dict)
+
+    Returns:
+        BatchResult: Outcome of the instance
+    """
+    index, path, name, options = task
+    base = os.path.join(options['outputDir'], name)
+    result = BatchResult(index, path, name, logPath=base + '.log')
+    settings = tune.GetSettings()
+    start = time.perf_counter()
+    try:
+        with open(result.logPath, 'w') as log, contextlib.redirect_stdout(log):
+            deadline = Deadline(options['timeLimit'])
+            model = Model(memoryLimit=options['memoryLimit'])
+            model.build_model(path, options['cacheDir'])
+            if options['race']:
+                bestSol = Solver(model).solve(options['seeds'], deadline.Slice(0.1))
+                sol, _ = tune.RaceExponents(lambda seeds, budget: Solver(model).solve(seeds, budget),
+                                            options['seeds'], deadline=deadline)
+                if sol.profit > bestSol.profit:
+                    bestSol = sol
+            else:
+                bestSol = Solver(model).solve(options['seeds'], deadline)
+            exportSolution(base + SolutionSuffix, bestSol)
+        result.profit = int(bestSol.profit)
+        result.duration = float(bestSol.duration)
+        result.routes = [list(rt.sequenceOfNodes) for rt in bestSol.routes]
+        result.solutionPath = base + SolutionSuffix + '.txt'
+    except Exception as error:
+        result.error = "%s: %s" % (type(error).__name__, error)
+    finally:
+        tune.ApplySettings(settings)
+    result.seconds = time.perf_counter() - start
+    return result
+
+
+def SolveBatch(source: str, outputDir: str, workers: int = None, timeLimit: float = None,
+               seeds=range(10, 60, 10), race: bool = False, cacheDir: str = None, memoryLimit: int = None):
+    """Solves every instance of a directory or manifest in a warm process pool
+
+    Workers are started once and solve instance after instance, so the
+    imports are paid once per worker. A model cache directory also lets
+    repeated instances skip parsing and the matrix build.
+
+    Args:
+        source `str`: Directory or manifest, see `InstancePaths`
+        outputDir `str`: Directory of the per-instance solution and log files
+        workers (`int`, optional): Worker processes, 1 solves in this process. Defaults to the CPU count.
+        timeLimit (`float`, optional): Seconds per instance. Defaults to no time limit.
+        seeds (`Iterable[int]`, optional): Seeds of the multi-start. Defaults to 10, 20, ..., 50.
+        race (`bool`, optional): Race the insertion exponents like Main does. Defaults to False.
+        cacheDir (`str`, optional): Model cache directory, see `Model.build_model`. Defaults to None.
+        memoryLimit (`int`, optional): Matrix memory ceiling in bytes, see `Model`. Defaults to None.
+
+    Yields:
+        BatchResult: One result per instance, in completion order
+    """
+    paths = InstancePaths(source)
+    os.makedirs(outputDir, exist_ok=True)
+    options = {'outputDir': outputDir, 'timeLimit': timeLimit, 'seeds': list(seeds), 'race': race,
+               'cacheDir': cacheDir, 'memoryLimit': memoryLimit}
+    tasks = [(index, path, name, options) for index, (path, name) in enumerate(zip(paths, OutputNames(paths)))]
+    workers = min(workers or os.cpu_count() or 1, max(len(tasks), 1))
+    if workers == 1:
+        for task in tasks:
+            yield SolveInstance(task)
+        return
+    with multiprocessing.Pool(workers, InitBatchWorker, (tune.GetSettings(),)) as pool:
+        yield from pool.imap_unordered(SolveInstance, tasks)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Solves a directory or manifest of instances")
+    parser.add_argument('source', help="directory of instance files, or a manifest listing them")
+    parser.add_argument('--out', default='solutions', help="directory of the solution and log files")
+    parser.add_argument('--workers', type=int, default=None, help="worker processes, the CPU count by default")
+    parser.add_argument('--time-limit', type=float, default=None, help="seconds per instance")
+    parser.add_argument('--seeds', type=int, nargs='+', default=list(range(10, 60, 10)))
+    parser.add_argument('--race', action='store_true', help="race the insertion exponents like Main")
+    parser.add_argument('--cache', metavar='DIR', help="model cache directory")
+    parser.add_argument('--memory-limit', type=float, metavar='MB',
+                        help="compute distances on demand once the dense matrices would exceed MB")
+    parser.add_argument('--summary', metavar='PATH', help="append one JSON line per result to PATH")
+    args = parser.parse_args()
+
+    memoryLimit = None if args.memory_limit is None else int(args.memory_limit * 2 ** 20)
+    summary = open(args.summary, 'a') if args.summary else None
+    try:
+        for result in SolveBatch(args.source, args.out, args.workers, args.time_limit, args.seeds, args.race,
+                                 args.cache, memoryLimit):
+            if result.error:
+                print("%-40s FAILED %s" % (result.name, result.error))
+            else:
+                print("%-40s profit %6d  %8.2fs  %s" % (result.name, result.profit, result.seconds,
+                                                        result.solutionPath))
+            if summary:
+                summary.write(json.dumps(result.AsDict()) + '\n')
+                summary.flush()
+    finally:
+        if summary:
+            summary.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,176 @@
+"""Times and memory-profiles the solver phases on synthetic instances
+
+Every instance is generated with `InstanceGenerator`, then model building,
+both constructions, each local search operator and VNS are run on it. Times
+are the best of a few repeats. Peak memory comes from a separate traced run,
+since tracing slows Python code down. Results are written as JSON, and
+`--compare` reports how they changed against an earlier results file.
+
+Usage:
+    python Benchmark.py --customers 100 1000 --output bench.json
+    python Benchmark.py --customers 100 1000 --output new.json --compare bench.json
+"""
+import argparse
+import copy
+import datetime
+import json
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+import AdaptiveTuning as tune
+import InstanceGenerator
+from Model import Model
+from Solver import Solver, Solution
+from Optimization import LocalSearch, VNS, OperatorNames
+
+
+def LoadModel(path: str, cacheDir: str = None, memoryLimit: int = None) -> Model:
+    """Builds the model of an instance file, memory-mapping it from a cache in cacheDir if given"""
+    model = Model(memoryLimit=memoryLimit)
+    model.build_model(path, cacheDir)
+    return model
+
+
+def CloneSolution(solution: Solution) -> Solution:
+    """Copies a solution together with its routes, so it can be improved more than once"""
+    return copy.deepcopy(solution)
+
+
+def Measure(run, setup=None, repeats: int = 3, memory: bool = True) -> dict:
+    """Times a callable and records its peak traced memory
+
+    Args:
+        run: Callable taking the value returned by `setup`
+        setup (optional): Callable preparing a fresh input, excluded from timing
+        repeats (`int`, optional): Timed runs, the best one is reported. Defaults to 3.
+        memory (`bool`, optional): Adds a traced run for the peak memory. Defaults to True.
+
+    Returns:
+        dict: seconds, meanSeconds, repeats, peakBytes and the last result of `run`
+    """
+    times = []
+    result = None
+    for _ in range(repeats):
+        arg = setup() if setup else None
+        start = time.perf_counter()
+        result = run(arg)
+        times.append(time.perf_counter() - start)
+    peak = None
+    if memory:
+        arg = setup() if setup else None
+        tracemalloc.start()
+        run(arg)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return {"seconds": min(times), "meanSeconds": sum(times) / len(times), "repeats": repeats,
+            "peakBytes": peak, "result": result}
+
+
+def BenchmarkInstance(path: str, seed: int, repeats: int, memory: bool, batchScoring: bool,
+                      cacheDir: str = None, memoryLimit: int = None):
+    """Yields one result per benchmarked phase of an instance"""
+    measured = Measure(lambda _: LoadModel(path, cacheDir, memoryLimit), repeats=repeats, memory=memory)
+    model = measured.pop("result")
+    yield "buildModel", measured
+
+    measured = Measure(lambda _: Solver(model, batchScoring).MinimumInsertions(itr=seed),
+                       repeats=repeats, memory=memory)
+    start = measured.pop("result")
+    measured["profit"] = start.profit
+    yield "minimumInsertions", measured
+
+    measured = Measure(lambda _: Solver(model).NearestNeighbor(itr=seed), repeats=repeats, memory=memory)
+    measured["profit"] = measured.pop("result").profit
+    yield "nearestNeighbor", measured
+
+    for operator, name in enumerate(OperatorNames):
+        measured = Measure(lambda sol: LocalSearch(sol, model, None, operator).run(),
+                           setup=lambda: CloneSolution(start), repeats=repeats, memory=memory)
+        improved = measured.pop("result")
+        measured["profit"] = improved.profit
+        measured["duration"] = improved.duration
+        yield "localSearch." + name, measured
+
+    measured = Measure(lambda sol: VNS(sol, len(OperatorNames) - 1, model),
+                       setup=lambda: CloneSolution(start), repeats=repeats, memory=memory)
+    improved = measured.pop("result")
+    measured["profit"] = improved.profit
+    measured["duration"] = improved.duration
+    yield "vns", measured
+
+
+def Metadata() -> dict:
+    """Describes the code version and machine the results were taken on"""
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True,
+                                check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {"commit": commit, "timestamp": datetime.datetime.now().isoformat(timespec='seconds'),
+            "python": sys.version.split()[0], "numpy": np.__version__, "platform": platform.platform()}
+
+
+def Compare(results: list, baselinePath: str, tolerance: float):
+    """Prints the time ratio of every phase against an earlier results file
+
+    Phases slower than `1 + tolerance` times the baseline are flagged.
+    """
+    with open(baselinePath) as f:
+        baseline = {(r["instance"], r["phase"]): r for r in json.load(f)["results"]}
+    for r in results:
+        old = baseline.get((r["instance"], r["phase"]))
+        if old is None or not old["seconds"]:
+            continue
+        ratio = r["seconds"] / old["seconds"]
+        flag = "  SLOWER" if ratio > 1 + tolerance else ""
+        print("%-40s %-24s %8.4fs -> %8.4fs  x%.2f%s" % (r["instance"], r["phase"], old["seconds"],
+                                                       r["seconds"], ratio, flag))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks the solver phases on synthetic instances")
+    parser.add_argument('--customers', type=int, nargs='+', default=[100, 300, 1000])
+    parser.add_argument('--layouts', nargs='+', choices=InstanceGenerator.Layouts,
+                        default=list(InstanceGenerator.Layouts))
+    parser.add_argument('--seed', type=int, default=1, help="seed of the instances and the constructions")
+    parser.add_argument('--repeats', type=int, default=3)
+    parser.add_argument('--no-memory', dest='memory', action='store_false', help="skip the traced runs")
+    parser.add_argument('--batch-scoring', action='store_true', help="use array insertion scoring")
+    parser.add_argument('--bounded-insertions', action='store_true',
+                        help="score insertions lazily in upper bound order")
+    parser.add_argument('--instances', default='instances', help="directory of the generated instances")
+    parser.add_argument('--model-cache', metavar='DIR', help="time model building from a binary cache in DIR")
+    parser.add_argument('--memory-limit', type=float, metavar='MB',
+                        help="compute distances on demand once the dense matrices would exceed MB")
+    parser.add_argument('--output', default='benchmark.json')
+    parser.add_argument('--compare', metavar='PATH', help="earlier results file to compare against")
+    parser.add_argument('--tolerance', type=float, default=0.1, help="slowdown flagged by --compare")
+    args = parser.parse_args()
+
+    tune.boundedInsertions = args.bounded_insertions
+    memoryLimit = None if args.memory_limit is None else int(args.memory_limit * 2 ** 20)
+    results = []
+    for customers in args.customers:
+        for layout in args.layouts:
+            instance = InstanceGenerator.GenerateInstance(customers, layout, args.seed)
+            path = InstanceGenerator.WriteInstance(instance, args.instances)
+            for phase, measured in BenchmarkInstance(path, args.seed, args.repeats, args.memory,
+                                                     args.batch_scoring, args.model_cache, memoryLimit):
+                measured.update(instance=instance.name, customers=customers, layout=layout, phase=phase)
+                results.append(measured)
+                print("%-40s %-24s %8.4fs %12s" % (instance.name, phase, measured["seconds"],
+                                                  measured["peakBytes"] if args.memory else ''))
+
+    with open(args.output, 'w') as f:
+        json.dump({"meta": Metadata(), "results": results}, f, indent=2, default=float)
+    if args.compare:
+        Compare(results, args.compare, args.tolerance)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+import heapq
+import math
+
+
+class RestrictedCandidateList:
+    """Bounded restricted candidate list used by the GRASP constructors
+
+    Keeps the `capacity` best scored candidates in a min-heap, so offering a
+    candidate costs O(log k) instead of a full sort. Once full, a candidate
+    replaces the worst entry when its score exceeds that entry's score minus
+    `precision`. Ties are broken by arrival order, exactly like the stable
+    sorted list it replaces.
+
+    Callers should compare a score against `threshold` before building the
+    payload, so rejected candidates allocate nothing.
+
+    Attributes:
+        - capacity: Max number of candidates kept
+        - precision: Tolerance when comparing against the worst entry
+        - threshold: Score a candidate has to exceed to enter the list
+        - heap: Min-heap of (trialProfit, arrival, payload) entries
+    """
+
+    def __init__(self, capacity: int, precision: float):
+        self.capacity = capacity
+        self.precision = precision
+        self.threshold = -math.inf
+        self.heap = []
+        self.arrivals = 0
+
+    def __len__(self):
+        return len(self.heap)
+
+    def Push(self, trialProfit: float, payload) -> bool:
+        """Offers a candidate to the list
+
+        Args:
+            trialProfit `float`: Candidate score, higher is better
+            payload: Candidate data returned by `Sample`
+
+        Returns:
+            bool: True, if the candidate entered the list
+        """
+        if trialProfit <= self.threshold:
+            return False
+        entry = (trialProfit, self.arrivals, payload)
+        self.arrivals += 1
+        if len(self.heap) < self.capacity:
+            heapq.heappush(self.heap, entry)
+            if len(self.heap) < self.capacity:
+                return True
+        else:
+            heapq.heapreplace(self.heap, entry)
+        self.threshold = self.heap[0][0] - self.precision
+        return True
+
+    def Sample(self, rng):
+        """Picks a candidate uniformly at random
+
+        Args:
+            rng `random.Random`: Seeded generator
+
+        Returns:
+            Payload of the chosen candidate, or None if the list is empty
+        """
+        if not self.heap:
+            return None
+        ordered = sorted(self.heap)
+        return ordered[rng.randint(0, len(ordered) - 1)][2]
+
+
+class Reservoir:
+    """Uniform random pick from a stream of candidates of unknown length
+
+    Reservoir sampling with a single slot: the i-th offered candidate
+    replaces the kept one with probability 1 / i, so every candidate ends up
+    kept with the same probability while only the current pick is stored.
+
+    Attributes:
+        - rng: Seeded `random.Random` generator
+        - item: Object the caller overwrites whenever `Offer` accepts
+        - seen: Number of candidates offered so far
+    """
+
+    def __init__(self, rng, item=None):
+        self.rng = rng
+        self.item = item
+        self.seen = 0
+
+    def Offer(self) -> bool:
+        """Offers the next candidate of the stream
+
+        Returns:
+            bool: True, if the candidate replaces the kept one and the caller
+            should store it in `item`
+        """
+        self.seen += 1
+        return self.rng.randrange(self.seen) == 0
@@ -0,0 +1,91 @@
+import math
+
+import numpy as np
+
+
+class DistanceOracle:
+    """Matrix-like distance backend computing entries on demand from coordinates
+
+    Stands in for the dense `Model.distances` / `Model.durations` matrices
+    when they do not fit in memory, and supports the ways the solver indexes
+    them: `oracle[i, j]` for one entry, `oracle[A, B]` with broadcast integer
+    arrays for a block of pairs, and `oracle[i]` or `oracle[start:stop]` for
+    whole rows. Entries are computed with the same float64 operations as
+    `BuildDistanceMatrix`, so they equal the dense matrix bit for bit.
+
+    Nothing is cached. Single entries are computed directly, which is
+    cheaper than any lookup, and the solver reads pairs of entries rather
+    than whole rows. Row blocks are cut to `blockRows` rows, so their
+    temporaries stay under `blockBytes`.
+
+    Attributes:
+        - shape: (n, n) shape of the emulated matrix
+        - x, y: Node coordinates as lists, for scalar entries
+        - xs, ys: Node coordinates as arrays, for array entries
+        - offsets: Value added to every entry of a column, the service time of
+          the destination node for durations, zero for distances
+        - blockBytes: Memory ceiling of a row block and its temporaries
+        - blockRows: Rows computed at once by block accesses
+    """
+
+    def __init__(self, coordinates: np.ndarray, offsets: np.ndarray = None, blockBytes: int = 64 << 20):
+        n = len(coordinates)
+        self.shape = (n, n)
+        self.xs = np.ascontiguousarray(coordinates[:, 0], dtype=np.float64)
+        self.ys = np.ascontiguousarray(coordinates[:, 1], dtype=np.float64)
+        self.x = self.xs.tolist()
+        self.y = self.ys.tolist()
+        self.offsets = np.zeros(n) if offsets is None else np.asarray(offsets, dtype=np.float64)
+        self.offsetList = self.offsets.tolist()
+        self.blockBytes = blockBytes
+        self.blockRows = max(1, blockBytes // (4 * max(1, n * 8)))
+
+    def __len__(self):
+        return self.shape[0]
+
+    def __getitem__(self, key):
+        if key.__class__ is tuple:
+            i, j = key
+            try:
+                dx = self.x[i] - self.x[j]
+            except TypeError:
+                return self.Pairs(i, j)
+            dy = self.y[i] - self.y[j]
+            return math.sqrt(dx * dx + dy * dy) + self.offsetList[j]
+        if isinstance(key, slice):
+            start, stop, step = key.indices(self.shape[0])
+            if step != 1:
+                raise IndexError("DistanceOracle row slices must be contiguous")
+            return self.Block(start, stop)
+        i = int(key)
+        return self.Block(i, i + 1)[0]
+
+    def Pairs(self, i, j) -> np.ndarray:
+        """Computes the entries of broadcast index arrays, like `matrix[i, j]`"""
+        i = np.asarray(i, dtype=np.intp)
+        j = np.asarray(j, dtype=np.intp)
+        dx = self.xs[i] - self.xs[j]
+        dx *= dx
+        dy = self.ys[i] - self.ys[j]
+        dy *= dy
+        dx += dy
+        np.sqrt(dx, out=dx)
+        dx += self.offsets[j]
+        return dx
+
+    def Block(self, start: int, stop: int) -> np.ndarray:
+        """Computes rows start to stop, at most `blockRows` of them are expected"""
+        dx = np.subtract.outer(self.xs[start:stop], self.xs)
+        dx *= dx
+        dy = np.subtract.outer(self.ys[start:stop], self.ys)
+        dy *= dy
+        dx += dy
+        del dy
+        np.sqrt(dx, out=dx)
+        dx += self.offsets
+        return dx
+
+    @property
+    def nbytes(self) -> int:
+        """Memory held by the oracle, the coordinates and offsets"""
+        return self.xs.nbytes + self.ys.nbytes + self.offsets.nbytes
@@ -0,0 +1,94 @@
+"""Checks that the headless solver modules import fast and without side effects
+
+Each module is imported in a fresh interpreter, since the import cache
+makes a second import in the same process free. The check fails when a
+module loads one of the plotting or network modules, opens a file other
+than Python modules while importing, or when the median import time over
+a few runs exceeds the budget.
+
+Usage:
+    python ImportBudget.py
+    python ImportBudget.py --budget 0.25 --runs 7 Solver SolverDaemon
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+# Directory of the solver modules, the probes import from it wherever the check is run
+Root = os.path.dirname(os.path.abspath(__file__))
+# Modules a pure solve must not need
+HeadlessModules = ('Solver', 'Model', 'csv_reader', 'AdaptiveTuning', 'BatchSolver', 'SolverDaemon')
+ForbiddenModules = ('matplotlib', 'http.client')
+
+# Run in the fresh interpreter, prints what the import loaded and opened and how long it took
+ProbeSource = """
+import importlib, importlib.machinery, json, sys, time
+suffixes = tuple(importlib.machinery.all_suffixes()) + ('.pth',)
+opened = []
+def Audit(event, args):
+    if event == 'open' and isinstance(args[0], str) and not args[0].endswith(suffixes) and '__pycache__' not in args[0]:
+        opened.append(args[0])
+sys.addaudithook(Audit)
+before = set(sys.modules)
+start = time.perf_counter()
+importlib.import_module(sys.argv[1])
+seconds = time.perf_counter() - start
+print(json.dumps({'seconds': seconds, 'modules': sorted(set(sys.modules) - before), 'opened': opened}))
+"""
+
+
+def Probe(module: str) -> dict:
+    """Imports a module in a fresh interpreter
+
+    Returns:
+        dict: Import seconds, newly loaded module names and opened non-module files
+
+    Raises:
+        ImportError: If the import fails, with the error output of the interpreter
+    """
+    probe = subprocess.run([sys.executable, '-c', ProbeSource, module], cwd=Root, capture_output=True, text=True)
+    if probe.returncode != 0:
+        raise ImportError(probe.stderr.strip() or "exit status %d" % probe.returncode, name=module)
+    return json.loads(probe.stdout)
+
+
+def CheckModule(module: str, budget: float, runs: int) -> list:
+    """Returns the problems found importing a module, empty if it passes"""
+    try:
+        probes = [Probe(module) for _ in range(runs)]
+    except ImportError as error:
+        print("%-16s fails to import\n%s" % (module, error))
+        return ["fails to import"]
+    seconds = statistics.median(probe['seconds'] for probe in probes)
+    problems = []
+    loaded = probes[0]['modules']
+    for forbidden in ForbiddenModules:
+        if forbidden in loaded:
+            problems.append("imports %s" % forbidden)
+    opened = probes[0]['opened']
+    if opened:
+        problems.append("opens %d files such as %s" % (len(opened), ', '.join(opened[:2])))
+    if seconds > budget:
+        problems.append("takes %.3fs, over the %.3fs budget" % (seconds, budget))
+    print("%-16s %7.3fs  %4d modules  %s" % (module, seconds, len(loaded), '; '.join(problems) or 'ok'))
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Checks the import time and side effects of the solver modules")
+    parser.add_argument('modules', nargs='*', default=list(HeadlessModules))
+    parser.add_argument('--budget', type=float, default=0.3, help="max median import seconds of each module")
+    parser.add_argument('--runs', type=int, default=5, help="fresh interpreters timed per module")
+    args = parser.parse_args()
+
+    failed = [module for module in args.modules if CheckModule(module, args.budget, args.runs)]
+    if failed:
+        print("Over budget or impure:", ', '.join(failed))
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
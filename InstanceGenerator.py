@@ -0,0 +1,161 @@
+"""Generates reproducible synthetic instances in the schema of Instance.csv / Instance.txt
+
+Usage:
+    python InstanceGenerator.py --customers 100 1000 10000 --layouts random clustered mixed --out instances
+"""
+import argparse
+import os
+import random
+
+Layouts = ('random', 'clustered', 'mixed')
+# Coordinates, demands, service times and profits follow the ranges of Instance.csv
+CoordinateRange = 100.0
+DemandRange = (1, 25)
+ServiceTimeRange = (1, 25)
+
+
+class Instance:
+    """Synthetic problem instance
+
+    Attributes:
+        - name: Name used for the instance files
+        - vehicles: Available vehicles
+        - capacity: Max vehicle capacity
+        - duration: Max route duration
+        - depot: (x, y) depot coordinates
+        - customers: List of (id, x, y, demand, service time, profit) rows
+    """
+    __slots__ = ('name', 'vehicles', 'capacity', 'duration', 'depot', 'customers')
+
+    def __init__(self, name, vehicles, capacity, duration, depot, customers):
+        self.name = name
+        self.vehicles = vehicles
+        self.capacity = capacity
+        self.duration = duration
+        self.depot = depot
+        self.customers = customers
+
+
+def GenerateInstance(customers: int, layout: str = 'random', seed: int = 0, vehicles: int = None,
+                     capacity: int = 150, duration: int = 200, clusters: int = None) -> Instance:
+    """Generates an instance
+
+    Args:
+        customers `int`: Number of customers
+        layout (`str`, optional): 'random' spreads customers uniformly, 'clustered'
+            draws them around cluster centres and 'mixed' does half of each. Defaults to 'random'.
+        seed (`int`, optional): Seed, the same arguments always give the same instance. Defaults to 0.
+        vehicles (`int`, optional): Available vehicles. Defaults to one per 56 customers,
+            the ratio of Instance.csv.
+        capacity (`int`, optional): Max vehicle capacity. Defaults to 150.
+        duration (`int`, optional): Max route duration. Defaults to 200.
+        clusters (`int`, optional): Cluster centres of the clustered layouts. Defaults to
+            one per 40 customers, at least 3.
+
+    Returns:
+        Instance: Generated instance
+    """
+    if layout not in Layouts:
+        raise ValueError("Unknown layout %r, expected one of %s" % (layout, ', '.join(Layouts)))
+    rng = random.Random(seed)
+    if vehicles is None:
+        vehicles = max(1, round(customers / 56))
+    if clusters is None:
+        clusters = max(3, customers // 40)
+
+    def Uniform():
+        return rng.uniform(-CoordinateRange, CoordinateRange), rng.uniform(-CoordinateRange, CoordinateRange)
+
+    centres = [(rng.uniform(-0.8, 0.8) * CoordinateRange, rng.uniform(-0.8, 0.8) * CoordinateRange)
+               for _ in range(clusters)]
+
+    def Clustered():
+        cx, cy = rng.choice(centres)
+        x = min(max(rng.gauss(cx, 0.1 * CoordinateRange), -CoordinateRange), CoordinateRange)
+        y = min(max(rng.gauss(cy, 0.1 * CoordinateRange), -CoordinateRange), CoordinateRange)
+        return x, y
+
+    depot = (round(rng.uniform(-0.5, 0.5) * CoordinateRange, 3), round(rng.uniform(-0.5, 0.5) * CoordinateRange, 3))
+    rows = []
+    for cust in range(1, customers + 1):
+        if layout == 'random' or (layout == 'mixed' and cust % 2 == 0):
+            x, y = Uniform()
+        else:
+            x, y = Clustered()
+        demand = rng.randint(*DemandRange)
+        serviceTime = rng.randint(*ServiceTimeRange)
+        # Profit follows demand, as it does in Instance.csv
+        profit = max(1, demand + round(rng.gauss(0, 5)))
+        rows.append((cust, round(x, 3), round(y, 3), demand, serviceTime, profit))
+
+    name = "%s_n%d_k%d_q%d_t%d_s%d" % (layout, customers, vehicles, capacity, duration, seed)
+    return Instance(name, vehicles, capacity, duration, depot, rows)
+
+
+def InstanceRows(instance: Instance):
+    """Yields the instance as rows of six fields, in the layout of Instance.csv"""
+    yield ['VEHICLES (k)', instance.vehicles, '', '', '', '']
+    yield ['MAXCAPACITY (Q)', instance.capacity, '', '', '', '']
+    yield ['MAXDURATION (T)', instance.duration, '', '', '', '']
+    yield [''] * 6
+    yield ['DEPOT', 'x', 'y', '', '', '']
+    yield ['', instance.depot[0], instance.depot[1], '', '', '']
+    yield [''] * 6
+    yield ['CUSTOMERS (n)', len(instance.customers), '', '', '', '']
+    yield [''] * 6
+    yield ['CUSTOMERDATA', '', '', '', '', '']
+    yield ['ID', 'x', 'y', 'Demand', 'Service Time', 'Profit']
+    for row in instance.customers:
+        yield list(row)
+
+
+def WriteCsv(instance: Instance, path: str):
+    """Writes the instance as comma separated values, like Instance.csv"""
+    with open(path, 'w', newline='') as f:
+        for row in InstanceRows(instance):
+            f.write(','.join(map(str, row)) + '\n')
+
+
+def WriteTxt(instance: Instance, path: str):
+    """Writes the instance as tab separated values, like Instance.txt"""
+    with open(path, 'w', newline='') as f:
+        for row in InstanceRows(instance):
+            f.write('\t'.join(map(str, row)) + '\r\n')
+
+
+def WriteInstance(instance: Instance, directory: str) -> str:
+    """Writes the .csv and .txt files of an instance
+
+    Returns:
+        str: Path of the .csv file
+    """
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, instance.name)
+    WriteCsv(instance, path + '.csv')
+    WriteTxt(instance, path + '.txt')
+    return path + '.csv'
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generates synthetic instances")
+    parser.add_argument('--customers', type=int, nargs='+', default=[100, 1000, 10000])
+    parser.add_argument('--layouts', nargs='+', choices=Layouts, default=list(Layouts))
+    parser.add_argument('--seeds', type=int, nargs='+', default=[1])
+    parser.add_argument('--vehicles', type=int, nargs='+', default=[None],
+                        help="vehicle counts, one per 56 customers by default")
+    parser.add_argument('--capacity', type=int, nargs='+', default=[150])
+    parser.add_argument('--duration', type=int, nargs='+', default=[200])
+    parser.add_argument('--out', default='instances', help="output directory")
+    args = parser.parse_args()
+    for customers in args.customers:
+        for layout in args.layouts:
+            for seed in args.seeds:
+                for vehicles in args.vehicles:
+                    for capacity in args.capacity:
+                        for duration in args.duration:
+                            instance = GenerateInstance(customers, layout, seed, vehicles, capacity, duration)
+                            print(WriteInstance(instance, args.out))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,122 @@
+import functools
+import json
+import time
+from collections import Counter, defaultdict
+
+# Instrumentation is off by default; call sites check `enabled` before doing any work
+enabled = False
+counters = Counter()
+phaseSeconds = defaultdict(float)
+phaseCalls = Counter()
+
+
+class PhaseTimer:
+    """Context manager adding its wall time to a named phase"""
+    __slots__ = ('name', 'start')
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        phaseSeconds[self.name] += time.perf_counter() - self.start
+        phaseCalls[self.name] += 1
+        return False
+
+
+class NullPhaseTimer:
+    """Shared do-nothing context manager handed out while disabled"""
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+nullPhaseTimer = NullPhaseTimer()
+
+
+def Enable(on: bool = True):
+    """Turns instrumentation on or off and clears the recorded data"""
+    global enabled
+    enabled = on
+    Reset()
+
+
+def Reset():
+    """Clears all counters and phase timers"""
+    counters.clear()
+    phaseSeconds.clear()
+    phaseCalls.clear()
+
+
+def Count(name: str, n: int = 1):
+    """Adds n to a named counter
+
+    Hot loops should check `enabled` first, so nothing is evaluated while disabled.
+    """
+    if enabled:
+        counters[name] += n
+
+
+def Phase(name: str):
+    """Times a block of code as a named phase
+
+    Nested phases are timed independently, so each reports its inclusive time.
+
+    Args:
+        name `str`: Phase name, dotted names group related phases
+
+    Returns:
+        Context manager, a shared no-op one while disabled
+    """
+    return PhaseTimer(name) if enabled else nullPhaseTimer
+
+
+def Timed(name: str):
+    """Decorator timing every call of a function as a named phase"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not enabled:
+                return func(*args, **kwargs)
+            with PhaseTimer(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def Counted(iterable, name: str):
+    """Yields the items of an iterable, counting them under a name"""
+    n = 0
+    for item in iterable:
+        n += 1
+        yield item
+    counters[name] += n
+
+
+def Report() -> dict:
+    """Returns the recorded data as a JSON serializable dict"""
+    return {
+        "phases": {name: {"seconds": phaseSeconds[name], "calls": phaseCalls[name]}
+                   for name in sorted(phaseSeconds)},
+        "counters": dict(sorted(counters.items())),
+    }
+
+
+def WriteReport(path: str, **extra):
+    """Writes the report of the current run as JSON
+
+    Args:
+        path `str`: Output file path
+        extra: Additional top level entries, such as the instance or the profit
+    """
+    report = Report()
+    report.update(extra)
+    with open(path, "w") as f:
+        json.dump(report, f, indent=2, default=float)
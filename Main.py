@@ -1,31 +1,58 @@
+import argparse
 import time
 
 from Model import Model
 from Solver import *
-from AdaptiveTuning import noTuningLeft, TuneExponents
+from AdaptiveTuning import RaceExponents
+from TimeBudget import Deadline
+import Instrumentation as stats
 from Testing import exportSolution, ReportSolution
 import solution_checker
 
 
-start = time.time()
+def main():
+    parser = argparse.ArgumentParser(description="Solves Instance.csv and writes solution.txt")
+    parser.add_argument("timeLimit", nargs="?", type=float, default=None,
+                        help="time limit in seconds for the whole run, none by default")
+    parser.add_argument("--report", metavar="PATH",
+                        help="record phase timers and counters and write them as JSON to PATH")
+    parser.add_argument("--cache", metavar="DIR",
+                        help="memory-map the model from a binary cache in DIR, building it on the first run")
+    parser.add_argument("--memory-limit", type=float, default=None, metavar="MB",
+                        help="compute distances on demand once the dense matrices would exceed MB")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="processes running the starts of each solve, same result as one process")
+    parser.add_argument("--no-plot", dest="plot", action="store_false",
+                        help="skip drawing OverallBestSolution.png, so matplotlib is never imported")
+    args = parser.parse_args()
 
-model = Model()
-model.build_model()
-bestSol = Solver(model).solve()
-terminate = False
-while not terminate:
-    terminate = TuneExponents()
-    sol: Solution = Solver(model).solve()
+    start = time.time()
+    deadline = Deadline(args.timeLimit)
+    stats.Enable(args.report is not None)
+
+    with stats.Phase('buildModel'):
+        model = Model(memoryLimit=None if args.memory_limit is None else int(args.memory_limit * 2 ** 20))
+        model.build_model(cacheDir=args.cache)
+    # The default exponents get a tenth of the budget, the race gets the rest
+    bestSol = Solver(model).solve(deadline=deadline.Slice(0.1), workers=args.workers)
+    with stats.Phase('race'):
+        sol, _ = RaceExponents(lambda seeds, budget: Solver(model).solve(seeds, budget, args.workers),
+                               deadline=deadline)
     if sol.profit > bestSol.profit:
         bestSol = copy.copy(sol)
-# TODO Unnecessary profit calculation
-bestSol.profit = 0
-for r in bestSol.routes:
-    bestSol.profit += CalculateRouteProfit(r)
-ReportSolution("OverallBestSolution", bestSol, model.allNodes)
-exportSolution("solution", bestSol)
-solution_checker.run()
+    # TODO Unnecessary profit calculation
+    bestSol.profit = 0
+    for r in bestSol.routes:
+        bestSol.profit += CalculateRouteProfit(model.profits, r)
+    ReportSolution("OverallBestSolution", bestSol, model.allNodes, args.plot)
+    exportSolution("solution", bestSol)
+    solution_checker.run()
+
+    end = time.time()
+    print('Seconds elapsed:', end - start)
+    if args.report:
+        stats.WriteReport(args.report, profit=bestSol.profit, seconds=end - start)
 
 
-end = time.time()
-print('Seconds elapsed:', end - start)
+if __name__ == '__main__':
+    main()
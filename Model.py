@@ -1,5 +1,9 @@
+import io
+
 import csv_reader
-import math
+import ModelCache
+from DistanceOracle import DistanceOracle
+import numpy as np
 
 
 class Node:
@@ -15,6 +19,8 @@ class Node:
         - service_time: Customer's required service time
         - profit: Profit to be earned from customer
     """
+    __slots__ = ('id', 'x', 'y', 'demand', 'service_time', 'profit')
+
     def __init__(self, id, x, y, demand, service_time, profit):
         self.id = id
         self.x = float(x)
@@ -28,54 +34,218 @@ class Model:
 
     Attributes:
         - allNodes: List of all model nodes
-        - customers: List of all nodes representing customers
+        - customers: List of the customer nodes that fit a route on their own. Customers whose
+          demand or depot round trip exceeds the limits fit no route, and only `allNodes` holds them
         - max_capacity: Max capacity of vehicles
         - max_duration: Max available time for customer service
         - vehicles: Available vehicles
-        - distances: List representing a matrix of all node distances
+        - coordinates: n x 2 `np.ndarray` of node coordinates, indexed by node id
+        - demands: `np.ndarray` of node demands, indexed by node id
+        - serviceTimes: `np.ndarray` of node service times, indexed by node id
+        - profits: `np.ndarray` of node profits, indexed by node id
+        - dtype: Float type of the matrices, `np.float32` halves their memory
+        - memoryLimit: Max bytes of the two matrices, None for no limit. Beyond
+          it they are `DistanceOracle`s computing entries on demand
+        - distances: `np.ndarray` matrix of all node distances
+        - durations: `np.ndarray` matrix of travel time plus the service time
+          of the destination node, i.e. `durations[i, j]` is the time added
+          by visiting `j` right after `i`
+        - neighbourLists: Cache of k-nearest neighbour arrays, keyed by k
     """
-    def __init__(self):
+    def __init__(self, dtype=np.float64, memoryLimit: int = None):
         self.allNodes = []
         self.customers = []
         self.max_capacity = -1
         self.max_duration = -1
         self.vehicles = -1
-        self.distances = []
-
-    def build_model(self):
-        self.max_capacity = csv_reader.get_capacity()
-        self.max_duration = csv_reader.get_duration()
-        self.vehicles = csv_reader.get_vehicles()
-        depot_x, depot_y = csv_reader.get_depot_coords()
-        depot = Node(0, depot_x, depot_y, 0, 0, 0)
-        self.allNodes.append(depot)
-        cust_data_lists = csv_reader.get_customer_data()
-        custs_map = map(lambda c: Node(int(c['id']), c['x'], c['y'],
-                                       c['demand'], c['service_time'], c['profit']), cust_data_lists)
-        self.customers.extend(list(custs_map))
-        self.allNodes.extend(self.customers)
-        self.distances = [[0.0 for x in range(len(self.allNodes))] for y in range(len(self.allNodes))]
-
-        for i in range(0, len(self.allNodes)):
-            for j in range(0, len(self.allNodes)):
-                a = self.allNodes[i]
-                b = self.allNodes[j]
-                dist = math.sqrt(math.pow(a.x - b.x, 2) + math.pow(a.y - b.y, 2))
-                self.distances[i][j] = dist
+        self.coordinates = None
+        self.demands = None
+        self.serviceTimes = None
+        self.profits = None
+        self.dtype = dtype
+        self.memoryLimit = memoryLimit
+        self.distances = None
+        self.durations = None
+        self.neighbourLists = {}
+
+    def build_model(self, path: str = "Instance.csv", cacheDir: str = None) -> bool:
+        """Loads an instance file and builds the node arrays and matrices
+
+        Args:
+            path (`str`, optional): Instance file, .csv or tab separated .txt. Defaults to "Instance.csv".
+            cacheDir (`str`, optional): Directory of binary model caches keyed by the instance file
+                hash. A cached model is memory-mapped instead of rebuilt, a missing one is written
+                after building. Models over `memoryLimit` only reuse the cached node arrays.
+                Defaults to None, no caching.
+
+        Returns:
+            bool: True, if the model was memory-mapped from the cache
+        """
+        directory = None if cacheDir is None else ModelCache.CachePath(cacheDir, path, self.dtype)
+        return self.build_cached(directory, lambda: csv_reader.LoadInstance(path))
+
+    def build_model_from_text(self, text: str, cacheDir: str = None) -> bool:
+        """Builds the model of instance file contents received as text, see `build_model`
+
+        The cache is keyed by the hash of the text, which equals the hash of a
+        file holding it, so file and text builds share cached models.
+        """
+        directory = None if cacheDir is None else \
+            ModelCache.DigestPath(cacheDir, ModelCache.TextHash(text), self.dtype)
+        return self.build_cached(directory, lambda: csv_reader.ReadInstance(io.StringIO(text), "payload"))
+
+    def build_cached(self, directory: str, read) -> bool:
+        """Memory-maps the model from a cache directory, else builds it from `read()` and saves it there
+
+        Returns:
+            bool: True, if the model was memory-mapped from the cache
+        """
+        if directory is not None:
+            cached = ModelCache.Load(directory)
+            if cached is not None:
+                header, arrays = cached
+                self.max_capacity = header['capacity']
+                self.max_duration = header['duration']
+                self.vehicles = header['vehicles']
+                self.coordinates = arrays['coordinates']
+                self.demands = arrays['demands']
+                self.serviceTimes = arrays['serviceTimes']
+                self.profits = arrays['profits']
+                if self.matrices_fit():
+                    self.distances = arrays['distances']
+                    self.durations = arrays['durations']
+                else:
+                    self.use_distance_oracle()
+                self.build_nodes(arrays['ids'])
+                return True
+        data = read()
+        self.set_instance(data)
+        if directory is not None and self.matrices_fit():
+            ModelCache.Save(directory, {'vehicles': self.vehicles, 'capacity': self.max_capacity,
+                                        'duration': self.max_duration},
+                            {'ids': data.ids, 'coordinates': self.coordinates, 'demands': self.demands,
+                             'serviceTimes': self.serviceTimes, 'profits': self.profits,
+                             'distances': self.distances, 'durations': self.durations})
+        return False
+
+    def set_instance(self, data: csv_reader.InstanceData):
+        """Builds the node arrays, matrices and nodes of parsed instance data"""
+        self.max_capacity = data.capacity
+        self.max_duration = data.duration
+        self.vehicles = data.vehicles
+        self.coordinates = data.coordinates
+        self.demands = data.demands
+        self.serviceTimes = data.serviceTimes
+        self.profits = data.profits
+        if self.matrices_fit():
+            self.distances = BuildDistanceMatrix(self.coordinates, self.dtype)
+            self.durations = self.distances + self.serviceTimes.astype(self.dtype)
+        else:
+            self.use_distance_oracle()
+        self.build_nodes(data.ids)
+
+    def build_nodes(self, ids: np.ndarray):
+        """Builds the node objects from the node arrays and the matrices
+
+        Customers that do not fit an empty route are left out of `customers`, once
+        here, instead of being rejected by every construction and insertion move.
+        """
+        self.allNodes = [Node(*fields) for fields in zip(ids.tolist(), self.coordinates[:, 0].tolist(),
+                                                        self.coordinates[:, 1].tolist(), self.demands.tolist(),
+                                                        self.serviceTimes.tolist(), self.profits.tolist())]
+        positions = np.arange(1, len(self.allNodes))
+        fits = (self.demands[positions] <= self.max_capacity) & \
+            (self.durations[0, positions] + self.durations[positions, 0] <= self.max_duration)
+        self.customers = [self.allNodes[i] for i in positions[fits].tolist()]
+
+    def matrices_fit(self) -> bool:
+        """Checks if the dense distance and duration matrices fit in `memoryLimit`"""
+        n = len(self.coordinates)
+        return self.memoryLimit is None or 2 * n * n * np.dtype(self.dtype).itemsize <= self.memoryLimit
+
+    def use_distance_oracle(self):
+        """Replaces the matrices by `DistanceOracle`s splitting `memoryLimit` between them
+
+        The oracles always compute in float64, whatever `dtype` is.
+        """
+        blockBytes = self.memoryLimit // 2
+        self.distances = DistanceOracle(self.coordinates, None, blockBytes)
+        self.durations = DistanceOracle(self.coordinates, self.serviceTimes, blockBytes)
+
+    def nearest_neighbours(self, k: int) -> np.ndarray:
+        """Returns the k nearest other nodes of every node
+
+        Computed once per k from the distance matrix and cached.
+
+        Args:
+            k `int`: Number of neighbours per node
+
+        Returns:
+            np.ndarray: n x k array of node ids, nearest first
+        """
+        if k not in self.neighbourLists:
+            n = len(self.allNodes)
+            size = min(k, n - 1)
+            nearest = np.empty((n, size), dtype=np.int32)
+            # Row blocks keep the working copy small on large instances
+            step = self.distances.blockRows if isinstance(self.distances, DistanceOracle) else 1024
+            for start in range(0, n, step):
+                block = np.array(self.distances[start:start + step], dtype=np.float64)
+                rows = np.arange(len(block))
+                block[rows, rows + start] = np.inf
+                candidates = np.argpartition(block, size - 1, axis=1)[:, :size]
+                order = np.argsort(np.take_along_axis(block, candidates, axis=1), axis=1, kind='stable')
+                nearest[start:start + len(block)] = np.take_along_axis(candidates, order, axis=1)
+            self.neighbourLists[k] = nearest
+        return self.neighbourLists[k]
+
+
+def BuildDistanceMatrix(coordinates: np.ndarray, dtype=np.float64) -> np.ndarray:
+    """Builds the euclidean distance matrix of the given nodes
+
+    Uses broadcasting in place, so at most two n x n arrays are alive at once.
+
+    Args:
+        coordinates `np.ndarray`: n x 2 array of node coordinates
+        dtype: Float type of the returned matrix
+
+    Returns:
+        np.ndarray: n x n matrix of node distances
+    """
+    x = coordinates[:, 0].astype(dtype)
+    y = coordinates[:, 1].astype(dtype)
+    distances = np.subtract.outer(x, x)
+    distances *= distances
+    dy = np.subtract.outer(y, y)
+    dy *= dy
+    distances += dy
+    del dy
+    np.sqrt(distances, out=distances)
+    return distances
 
 
 class Route:
     """Class that represents a vehicle route
 
     Attributes:
-        - sequenceOfNodes: List containing order of nodes visited
+        - sequenceOfNodes: List containing ids of nodes visited, in order
         - profit: Profit earned in route
         - capacity: Max capacity of vehicle
         - duration: Max available time for customer service
         - load: Vehicle load
         - travelled: Time spent travelling
+        - prefixDuration: Time spent up to leaving each position of the route
+        - prefixLoad: Load collected up to and including each position
+        - prefixProfit: Profit collected up to and including each position
+
+    The prefix aggregates are only kept up to date by local search, see
+    `UpdateRouteSegments` in Utils. Suffix aggregates are the route totals
+    minus a prefix.
     """
-    def __init__(self, dp, cap, dur):
+    __slots__ = ('sequenceOfNodes', 'profit', 'capacity', 'duration', 'load', 'travelled',
+                 'prefixDuration', 'prefixLoad', 'prefixProfit')
+
+    def __init__(self, dp: int, cap, dur):
         self.sequenceOfNodes = []
         self.sequenceOfNodes.append(dp)
         self.sequenceOfNodes.append(dp)
@@ -84,8 +254,20 @@ class Route:
         self.duration = dur
         self.load = 0
         self.travelled = 0
+        self.prefixDuration = [0.0, 0.0]
+        self.prefixLoad = [0, 0]
+        self.prefixProfit = [0, 0]
 
-
-
-
-
+    def __deepcopy__(self, memo):
+        """Copies the route with its own node and prefix lists, the totals are immutable"""
+        clone = Route.__new__(Route)
+        clone.sequenceOfNodes = list(self.sequenceOfNodes)
+        clone.profit = self.profit
+        clone.capacity = self.capacity
+        clone.duration = self.duration
+        clone.load = self.load
+        clone.travelled = self.travelled
+        clone.prefixDuration = list(self.prefixDuration)
+        clone.prefixLoad = list(self.prefixLoad)
+        clone.prefixProfit = list(self.prefixProfit)
+        return clone
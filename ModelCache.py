@@ -0,0 +1,85 @@
+import hashlib
+import json
+import os
+
+import numpy as np
+
+# Bumped whenever the cached arrays change meaning, so stale caches are ignored
+CacheVersion = 1
+ArrayNames = ('ids', 'coordinates', 'demands', 'serviceTimes', 'profits', 'distances', 'durations')
+
+
+def InstanceHash(path: str) -> str:
+    """Returns the sha256 hex digest of an instance file's contents"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def TextHash(text: str) -> str:
+    """Returns the sha256 hex digest of instance contents received as text
+
+    Equals `InstanceHash` of a UTF-8 file holding the same text, so a
+    received instance and its file share one cache.
+    """
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def CachePath(cacheDir: str, path: str, dtype) -> str:
+    """Returns the cache directory of an instance file built with the given matrix dtype"""
+    return DigestPath(cacheDir, InstanceHash(path), dtype)
+
+
+def DigestPath(cacheDir: str, digest: str, dtype) -> str:
+    """Returns the cache directory of the instance contents with the given digest"""
+    return os.path.join(cacheDir, "%s_%s_v%d" % (digest, np.dtype(dtype).name, CacheVersion))
+
+
+def Load(directory: str):
+    """Opens a cached model
+
+    The arrays are memory-mapped read only, so processes opening the same
+    cache share its pages and nothing is read until it is accessed. They are
+    returned as plain ndarray views of the mappings, since indexing an
+    `np.memmap` is several times slower in the solver's scalar loops.
+
+    Args:
+        directory `str`: Cache directory returned by `CachePath`
+
+    Returns:
+        tuple: (header dict, dict of arrays), None if the cache is missing
+    """
+    try:
+        with open(os.path.join(directory, 'header.json')) as f:
+            header = json.load(f)
+        arrays = {name: np.asarray(np.load(os.path.join(directory, name + '.npy'), mmap_mode='r'))
+                  for name in ArrayNames}
+    except FileNotFoundError:
+        return None
+    return header, arrays
+
+
+def Save(directory: str, header: dict, arrays: dict):
+    """Writes a model cache
+
+    Every file is written under a temporary name and renamed into place, and
+    the header goes last, so concurrent readers never see a partial cache.
+
+    Args:
+        directory `str`: Cache directory returned by `CachePath`
+        header `dict`: JSON serializable scalar model attributes
+        arrays `dict`: Arrays keyed by the names in `ArrayNames`
+    """
+    os.makedirs(directory, exist_ok=True)
+    suffix = '.%d.tmp' % os.getpid()
+    for name in ArrayNames:
+        target = os.path.join(directory, name + '.npy')
+        with open(target + suffix, 'wb') as f:
+            np.save(f, np.ascontiguousarray(arrays[name]))
+        os.replace(target + suffix, target)
+    target = os.path.join(directory, 'header.json')
+    with open(target + suffix, 'w') as f:
+        json.dump(header, f)
+    os.replace(target + suffix, target)
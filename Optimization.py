@@ -1,11 +1,18 @@
 import copy, random
 
+import numpy as np
+
 import AdaptiveTuning as tune
+import Instrumentation as stats
 
 from Testing import TestSolution
-from Model import (Route, Node)
-from Utils import (AppendNodeDuration, CalculateTravelledTime, CalculateTotalDuration,
-                        UpdateRouteLoadDurAndProfit, CapacityOrDurationIsViolated)
+from CandidateList import Reservoir
+from TimeBudget import Deadline
+from Model import (Route, Model)
+from Utils import UpdateRouteSegments, CapacityOrDurationIsViolated
+
+# Operator names indexed by operator number, as used in the instrumentation report
+OperatorNames = ('relocation', 'swap', 'twoOpt', 'insertion', 'exchange')
 
 
 class RelocationMove(object):
@@ -23,6 +30,8 @@ class RelocationMove(object):
         - durChangeTargetRt: Change of time spent in target route after insertion of node
         - moveDur: Change in distance covered
     """
+    __slots__ = ('originRoutePosition', 'targetRoutePosition', 'originNodePosition', 'targetNodePosition',
+                 'durChangeOriginRt', 'durChangeTargetRt', 'moveDur')
 
     def __init__(self):
         """Default constructor
@@ -65,15 +74,9 @@ class SwapMove(object):
 
     SwapMove is a 1 - 1 exchange of nodes. Two nodes exchange
     positions and optionally routes (sequences of nodes)."""
-    
-    positionOfFirstRoute = None
-    positionOfSecondRoute = None
-    positionOfFirstNode = None
-    positionOfSecondNode = None
-    durChangeFirstRt = None
-    durChangeSecondRt = None
-    moveDur = 0
-    
+    __slots__ = ('positionOfFirstRoute', 'positionOfSecondRoute', 'positionOfFirstNode', 'positionOfSecondNode',
+                 'durChangeFirstRt', 'durChangeSecondRt', 'moveDur')
+
     def __init__(self):
         self.positionOfFirstRoute = None
         self.positionOfSecondRoute = None
@@ -120,6 +123,8 @@ class TwoOptMove(object):
         moveDur: Duration reduction
 
     """
+    __slots__ = ('positionOfFirstRoute', 'positionOfSecondRoute', 'positionOfFirstNode', 'positionOfSecondNode',
+                 'moveDur')
 
     def __init__(self):
         """Default constructor
@@ -151,6 +156,87 @@ class TwoOptMove(object):
         self.moveDur = moveDur
 
 
+class InsertionMove(object):
+    """Represents LocalSearch operation: InsertionMove
+
+    InsertionMove places an unrouted customer into the slack of a route.
+
+    Attributes:
+        routePosition: Route number the customer is inserted into
+        nodePosition: Position number of the node the customer follows
+        customer: Id of the unrouted customer
+        moveDur: Duration increase of the route
+        profitGain: Profit increase of the solution
+    """
+    __slots__ = ('routePosition', 'nodePosition', 'customer', 'moveDur', 'profitGain')
+
+    def __init__(self):
+        self.routePosition = None
+        self.nodePosition = None
+        self.customer = None
+        self.moveDur = 0
+        self.profitGain = 0
+
+    def Initialize(self, routePosition, nodePosition, customer, moveDur, profitGain):
+        """Full constructor
+
+        Inits fields to argument values
+
+        Args:
+            routePosition: `int`
+            nodePosition: `int`
+            customer: `int`
+            moveDur: `float`
+            profitGain: `int`
+        """
+        self.routePosition = routePosition
+        self.nodePosition = nodePosition
+        self.customer = customer
+        self.moveDur = moveDur
+        self.profitGain = profitGain
+
+
+class ExchangeMove(object):
+    """Represents LocalSearch operation: ExchangeMove
+
+    ExchangeMove replaces a routed customer with a more profitable unrouted
+    one, which takes over its position.
+
+    Attributes:
+        routePosition: Route number of the replaced customer
+        nodePosition: Position number of the replaced customer
+        customer: Id of the unrouted customer
+        moveDur: Duration change of the route
+        profitGain: Profit increase of the solution
+    """
+    __slots__ = ('routePosition', 'nodePosition', 'customer', 'moveDur', 'profitGain')
+
+    def __init__(self):
+        self.routePosition = None
+        self.nodePosition = None
+        self.customer = None
+        self.moveDur = 0
+        self.profitGain = 0
+
+    def Initialize(self, routePosition, nodePosition, customer, moveDur, profitGain):
+        """Full constructor
+
+        Inits fields to argument values
+
+        Args:
+            routePosition: `int`
+            nodePosition: `int`
+            customer: `int`
+            moveDur: `float`
+            profitGain: `int`
+        """
+        self.routePosition = routePosition
+        self.nodePosition = nodePosition
+        self.customer = customer
+        self.moveDur = moveDur
+        self.profitGain = profitGain
+
+
 class LocalSearch:
     """Class for local search operations
 
@@ -159,192 +245,761 @@ class LocalSearch:
 
     Attributes:
         - initialSolution: Initial `Solution` object
-        - distanceMatrix: List representing a matrix of all node distances
+        - distanceMatrix: Matrix of all node distances
+        - durationMatrix: Matrix of travel plus destination service time
+        - demands: Node demands indexed by node id
+        - serviceTimes: Node service times indexed by node id
+        - profits: Node profits indexed by node id
         - constraints: Dict containing constraints, such as max capacity
-        - operator: `int` for selecting MoveType to apply for optimization
+        - operator: `int` for selecting MoveType to apply for optimization: 0 relocation,
+          1 swap, 2 2-opt, 3 insertion and 4 exchange of unrouted customers
         - optimizedSolution: `Solution` optimized
         - localSearchIterator: `int` count of local search applied
         - relocationMove: `RelocationMove`
+        - moveMemory: Per operator, best move remembered for each route pair
+        - evaluatedPairs: Per operator, route pairs whose remembered move is current
+        - dontLook: Customers skipped as move origins while `tune.dontLookBits` is set
+        - reservoir: `Reservoir` fed by the scans while `SampleMove` runs, else None
+        - unrouted: Customer ids not visited by any route
+        - deadline: `Deadline` that stops `run` early
     """
 
-    def __init__(self, solution, distanceMatrix, constraints, operator):
+    def __init__(self, solution, model: Model, constraints, operator, deadline: Deadline = None):
         """Constructor
 
         Args:
             solution : `Solution`
-            distanceMatrix : `List`
+            model : `Model`
             constraints : `Dict`
             operator : `int`
+            deadline : `Deadline`, optional. Defaults to no time limit.
         """
         self.initialSolution = solution
         self.optimizedSolution = solution
-        self.distanceMatrix = distanceMatrix
+        self.model = model
+        self.distanceMatrix = model.distances
+        self.durationMatrix = model.durations
+        # Python lists index faster than arrays in scalar loops
+        self.demands = model.demands.tolist()
+        self.serviceTimes = model.serviceTimes.tolist()
+        self.profits = model.profits.tolist()
         self.constraints = constraints
         self.operator = operator
         self.localSearchIterator = 0
         self.relocationMove = RelocationMove()
         self.swapMove = SwapMove()
         self.twoOptMove = TwoOptMove()
+        self.insertionMove = InsertionMove()
+        self.exchangeMove = ExchangeMove()
         self.terminateSearch = False
-        self.allRelocationMoves = list()
-        self.allSwapMoves = list()
-        self.allTwoOptMoves = list()
-
+        self.deadline = deadline or Deadline()
+        self.reservoir = None
+        self.sampleImprovingOnly = True
+        # A move only changes two routes, so the pairs not touching them keep their best move
+        # Insertions and exchanges touch a single route and are remembered under (route, route)
+        self.moveMemory = (dict(), dict(), dict(), dict(), dict())
+        self.evaluatedPairs = (set(), set(), set(), set(), set())
+        self.dontLook = set()
+        self.improvingOrigins = set()
+        self.unrouted = {c.id for c in model.customers}.difference(*(rt.sequenceOfNodes for rt in solution.routes))
+        # Routes may have been changed by construction since the last search
+        self.UpdateSegments(*solution.routes)
+
+    def UpdateSegments(self, *routes):
+        """Refreshes the prefix aggregates of the given routes"""
+        for rt in routes:
+            UpdateRouteSegments(self.durationMatrix, self.model.demands, self.model.profits, rt)
 
     def FindBestRelocationMove(self) -> RelocationMove:
+        pairs = self.DirtyPairs(0)
+        if tune.granularNeighbours:
+            candidates = self.GranularRelocations(tune.granularNeighbours, pairs)
+            if stats.enabled:
+                candidates = stats.Counted(candidates, 'localSearch.relocation.evaluated')
+            for originRouteIndex, targetRouteIndex, originNodeIndex, targetNodeIndex in candidates:
+                self.EvaluateRelocation(originRouteIndex, targetRouteIndex, originNodeIndex, targetNodeIndex)
+        else:
+            for pair in pairs:
+                if self.IsBatched(*pair):
+                    self.EvaluateRelocationsBatched(*pair)
+                    continue
+                candidates = self.AllRelocations([pair])
+                if stats.enabled:
+                    candidates = stats.Counted(candidates, 'localSearch.relocation.evaluated')
+                for originRouteIndex, targetRouteIndex, originNodeIndex, targetNodeIndex in candidates:
+                    self.EvaluateRelocation(originRouteIndex, targetRouteIndex, originNodeIndex, targetNodeIndex)
+        self.SetDontLookBits(pairs, False)
+        self.relocationMove = self.BestRememberedMove(0, RelocationMove())
+        return self.relocationMove
+
+    def AllRelocations(self, pairs):
+        """Yields every relocation as (originRoute, targetRoute, originNode, targetNode) indices
 
-        for originRouteIndex in range(0, len(self.initialSolution.routes)):
+        Args:
+            pairs `list`: (originRoute, targetRoute) index pairs to scan
+        """
+        skip = self.dontLook if tune.dontLookBits else ()
+        for originRouteIndex, targetRouteIndex in pairs:
             rt1: Route = self.initialSolution.routes[originRouteIndex]
-            for targetRouteIndex in range(0, len(self.initialSolution.routes)):
-                rt2: Route = self.initialSolution.routes[targetRouteIndex]
-                for originNodeIndex in range(1, len(rt1.sequenceOfNodes) - 1):
-                    for targetNodeIndex in range(0, len(rt2.sequenceOfNodes) - 1):
-                        if originRouteIndex == targetRouteIndex and (
-                                targetNodeIndex == originNodeIndex or targetNodeIndex == originNodeIndex - 1):
+            rt2: Route = self.initialSolution.routes[targetRouteIndex]
+            for originNodeIndex in range(1, len(rt1.sequenceOfNodes) - 1):
+                if rt1.sequenceOfNodes[originNodeIndex] in skip:
+                    continue
+                for targetNodeIndex in range(0, len(rt2.sequenceOfNodes) - 1):
+                    if originRouteIndex == targetRouteIndex and (
+                            targetNodeIndex == originNodeIndex or targetNodeIndex == originNodeIndex - 1):
+                        continue
+                    yield originRouteIndex, targetRouteIndex, originNodeIndex, targetNodeIndex
+
+    def GranularRelocations(self, k: int, pairs):
+        """Yields the relocations that place a node next to one of its k nearest neighbours
+
+        Args:
+            k `int`: Number of nearest neighbours per node
+            pairs `list`: (originRoute, targetRoute) index pairs to scan
+        """
+        routes = self.initialSolution.routes
+        positions = self.NodePositions()
+        neighbours = self.model.nearest_neighbours(k).tolist()
+        skip = self.dontLook if tune.dontLookBits else ()
+        pairs = set(pairs)
+        origins = sorted({originRouteIndex for originRouteIndex, _ in pairs})
+        seen = set()
+        for originRouteIndex in origins:
+            rt1 = routes[originRouteIndex]
+            for originNodeIndex in range(1, len(rt1.sequenceOfNodes) - 1):
+                B = rt1.sequenceOfNodes[originNodeIndex]
+                if B in skip:
+                    continue
+                for n in neighbours[B]:
+                    # B goes right after n (arc n-B) or right before it (arc B-n)
+                    for targetRouteIndex, nodeIndex in positions[n]:
+                        if (originRouteIndex, targetRouteIndex) not in pairs:
                             continue
-                        A = rt1.sequenceOfNodes[originNodeIndex - 1]
-                        B = rt1.sequenceOfNodes[originNodeIndex]
-                        C = rt1.sequenceOfNodes[originNodeIndex + 1]
-
-                        F = rt2.sequenceOfNodes[targetNodeIndex]
-                        G = rt2.sequenceOfNodes[targetNodeIndex + 1]
-                        if rt1 != rt2:
-                            # Check load constraint & PART of time constraint
-                            if rt2.load + B.demand > rt2.capacity or \
-                                    rt2.travelled + B.service_time > rt2.duration:
+                        for targetNodeIndex in (nodeIndex, nodeIndex - 1):
+                            if targetNodeIndex < 0 or \
+                                    targetNodeIndex >= len(routes[targetRouteIndex].sequenceOfNodes) - 1:
                                 continue
-                        targetRtDurChange = self.distanceMatrix[F.id][B.id] + self.distanceMatrix[B.id][G.id] - \
-                                                self.distanceMatrix[F.id][G.id] + B.service_time
-                        # Check time constraint FULLY        
-                        if rt1 != rt2 and rt2.travelled + targetRtDurChange > rt2.duration:
-                            continue                  
-                        distanceAdded = self.distanceMatrix[A.id][C.id] + self.distanceMatrix[F.id][B.id] + \
-                                    self.distanceMatrix[B.id][G.id]
-                        distanceRemoved = self.distanceMatrix[A.id][B.id] + self.distanceMatrix[B.id][C.id] + \
-                                        self.distanceMatrix[F.id][G.id]
-                        originRtDurChange = self.distanceMatrix[A.id][C.id] - self.distanceMatrix[A.id][B.id] - \
-                                                self.distanceMatrix[B.id][C.id] - B.service_time
-
-                        moveDur = distanceAdded - distanceRemoved
-                        if rt1 == rt2:
-                            if rt1.travelled + moveDur > rt1.duration:
+                            if originRouteIndex == targetRouteIndex and (
+                                    targetNodeIndex == originNodeIndex or targetNodeIndex == originNodeIndex - 1):
                                 continue
-                        if moveDur < 0:
-                            copyrm = RelocationMove()
-                            copyrm.Initialize(originRouteIndex, targetRouteIndex, originNodeIndex,
-                                              targetNodeIndex, originRtDurChange,
-                                              targetRtDurChange, moveDur)
-                            self.allRelocationMoves.append(copyrm)
-
-                        if (moveDur < self.relocationMove.moveDur + tune.precision):
-                            self.terminateSearch = False
-                            self.relocationMove.Initialize(originRouteIndex, targetRouteIndex, originNodeIndex,
-                                                                targetNodeIndex, originRtDurChange,
-                                                                targetRtDurChange, moveDur)
-        self.terminateSearch = True
+                            move = (originRouteIndex, targetRouteIndex, originNodeIndex, targetNodeIndex)
+                            if move not in seen:
+                                seen.add(move)
+                                yield move
+
+    def DirtyPairs(self, operator: int) -> list:
+        """Returns the route pairs of an operator that have to be scanned again
+
+        These are the pairs without a current remembered move, in the order of
+        a full scan. They are marked as evaluated, `ForgetRoutes` marks them
+        dirty again.
+
+        Args:
+            operator `int`: 0 for relocations (ordered pairs), 1 for swaps and
+                2 for 2-opt (unordered pairs), 3 and 4 for insertions and
+                exchanges (single routes)
+        """
+        routeCount = len(self.initialSolution.routes)
+        evaluated = self.evaluatedPairs[operator]
+        if operator >= 3:
+            pairs = [(rtInd, rtInd) for rtInd in range(routeCount) if (rtInd, rtInd) not in evaluated]
+        else:
+            pairs = [(rtInd1, rtInd2) for rtInd1 in range(routeCount)
+                     for rtInd2 in range(0 if operator == 0 else rtInd1, routeCount)
+                     if (rtInd1, rtInd2) not in evaluated]
+        evaluated.update(pairs)
+        return pairs
+
+    def BestRememberedMove(self, operator: int, best):
+        """Picks the best remembered move of an operator
+
+        Every operator keeps the first move found with the smallest duration
+        change, within a route pair and across pairs, which are compared in
+        full scan order. The pick therefore equals a scan from scratch, ties
+        going to the lower pair index. Insertions and exchanges are compared
+        by profit gain first, then by duration change.
+
+        Args:
+            operator `int`: Operator index
+            best: Empty move of the operator, returned if nothing beats it
+        """
+        memory = self.moveMemory[operator]
+        if operator >= 3:
+            for pair in sorted(memory):
+                if IsMoreProfitable(memory[pair], best):
+                    best = memory[pair]
+            return best
+        for pair in sorted(memory):
+            move = memory[pair]
+            if move.moveDur < best.moveDur:
+                best = move
+        return best
+
+    def ForgetRoutes(self, *routeIndices):
+        """Marks every route pair touching the given routes for a new scan
+
+        Also clears the don't-look bits of the customers in these routes.
+        """
+        changed = set(routeIndices)
+        for memory, evaluated in zip(self.moveMemory, self.evaluatedPairs):
+            for pair in [p for p in evaluated if p[0] in changed or p[1] in changed]:
+                evaluated.discard(pair)
+                memory.pop(pair, None)
+        for routeIndex in changed:
+            self.dontLook.difference_update(self.initialSolution.routes[routeIndex].sequenceOfNodes)
+
+    def SetDontLookBits(self, pairs, bothSides: bool):
+        """Sets the don't-look bit of every scanned customer that had no improving move
+
+        Only runs when `tune.dontLookBits` is set.
+
+        Args:
+            pairs `list`: Route pairs just scanned
+            bothSides `bool`: True, if customers of both routes act as origins
+        """
+        if tune.dontLookBits:
+            scanned = {pair[0] for pair in pairs}
+            if bothSides:
+                scanned.update(pair[1] for pair in pairs)
+            for routeIndex in scanned:
+                self.dontLook.update(self.initialSolution.routes[routeIndex].sequenceOfNodes[1:-1])
+            self.dontLook -= self.improvingOrigins
+        self.improvingOrigins.clear()
+
+    def NodePositions(self) -> list:
+        """Maps every node id to its list of (route index, node index) positions
+
+        The depot appears at both ends of every route, customers at most once.
+        """
+        positions = [[] for _ in range(len(self.demands))]
+        for routeIndex, rt in enumerate(self.initialSolution.routes):
+            for nodeIndex, node in enumerate(rt.sequenceOfNodes):
+                positions[node].append((routeIndex, nodeIndex))
+        return positions
+
+    def EvaluateRelocation(self, originRouteIndex, targetRouteIndex, originNodeIndex, targetNodeIndex):
+        """Prices a single relocation and keeps it if it is the best of its route pair so far"""
+        rt1: Route = self.initialSolution.routes[originRouteIndex]
+        rt2: Route = self.initialSolution.routes[targetRouteIndex]
+        A = rt1.sequenceOfNodes[originNodeIndex - 1]
+        B = rt1.sequenceOfNodes[originNodeIndex]
+        C = rt1.sequenceOfNodes[originNodeIndex + 1]
+
+        F = rt2.sequenceOfNodes[targetNodeIndex]
+        G = rt2.sequenceOfNodes[targetNodeIndex + 1]
+        if rt1 != rt2:
+            # Check load constraint & PART of time constraint
+            if rt2.load + self.demands[B] > rt2.capacity or \
+                    rt2.travelled + self.serviceTimes[B] > rt2.duration:
+                return
+        targetRtDurChange = self.durationMatrix[F, B] + self.distanceMatrix[B, G] - \
+                                self.distanceMatrix[F, G]
+        # Check time constraint FULLY
+        if rt1 != rt2 and rt2.travelled + targetRtDurChange > rt2.duration:
+            return
+        distanceAdded = self.distanceMatrix[A, C] + self.distanceMatrix[F, B] + \
+                    self.distanceMatrix[B, G]
+        distanceRemoved = self.distanceMatrix[A, B] + self.distanceMatrix[B, C] + \
+                        self.distanceMatrix[F, G]
+        originRtDurChange = self.distanceMatrix[A, C] - self.durationMatrix[A, B] - \
+                                self.distanceMatrix[B, C]
+
+        moveDur = distanceAdded - distanceRemoved
+        if rt1 == rt2:
+            if rt1.travelled + moveDur > rt1.duration:
+                return
+        if moveDur < 0:
+            self.improvingOrigins.add(B)
+        if self.reservoir is not None and (moveDur < 0 or not self.sampleImprovingOnly) and \
+                self.reservoir.Offer():
+            self.reservoir.item.Initialize(originRouteIndex, targetRouteIndex, originNodeIndex,
+                                           targetNodeIndex, originRtDurChange,
+                                           targetRtDurChange, moveDur)
+
+        pair = (originRouteIndex, targetRouteIndex)
+        best = self.moveMemory[0].get(pair)
+        if best is None:
+            best = RelocationMove()
+        if moveDur < best.moveDur:
+            best.Initialize(originRouteIndex, targetRouteIndex, originNodeIndex,
+                            targetNodeIndex, originRtDurChange,
+                            targetRtDurChange, moveDur)
+            self.moveMemory[0][pair] = best
 
     def FindBestSwapMove(self) -> SwapMove:
-        for firstRouteIndex in range(0, len(self.initialSolution.routes)):
+        pairs = self.DirtyPairs(1)
+        if tune.granularNeighbours:
+            candidates = self.GranularSwaps(tune.granularNeighbours, pairs)
+            if stats.enabled:
+                candidates = stats.Counted(candidates, 'localSearch.swap.evaluated')
+            for firstRouteIndex, secondRouteIndex, firstNodeIndex, secondNodeIndex in candidates:
+                self.EvaluateSwap(firstRouteIndex, secondRouteIndex, firstNodeIndex, secondNodeIndex)
+        else:
+            for pair in pairs:
+                if self.IsBatched(*pair):
+                    self.EvaluateSwapsBatched(*pair)
+                    continue
+                candidates = self.AllSwaps([pair])
+                if stats.enabled:
+                    candidates = stats.Counted(candidates, 'localSearch.swap.evaluated')
+                for firstRouteIndex, secondRouteIndex, firstNodeIndex, secondNodeIndex in candidates:
+                    self.EvaluateSwap(firstRouteIndex, secondRouteIndex, firstNodeIndex, secondNodeIndex)
+        self.SetDontLookBits(pairs, True)
+        self.swapMove = self.BestRememberedMove(1, SwapMove())
+        return self.swapMove
+
+    def AllSwaps(self, pairs):
+        """Yields every swap as (firstRoute, secondRoute, firstNode, secondNode) indices
+
+        Args:
+            pairs `list`: (firstRoute, secondRoute) index pairs to scan
+        """
+        skip = self.dontLook if tune.dontLookBits else ()
+        for firstRouteIndex, secondRouteIndex in pairs:
             rt1: Route = self.initialSolution.routes[firstRouteIndex]
-            for secondRouteIndex in range(firstRouteIndex, len(self.initialSolution.routes)):
-                rt2: Route = self.initialSolution.routes[secondRouteIndex]
-                for firstNodeIndex in range(1, len(rt1.sequenceOfNodes) - 1):
-                    startOfSecondNodeIndex = 1
-                    if rt1 == rt2:
-                        startOfSecondNodeIndex = firstNodeIndex + 1
-                    for secondNodeIndex in range(startOfSecondNodeIndex, len(rt2.sequenceOfNodes) - 1):
-                        a1 = rt1.sequenceOfNodes[firstNodeIndex - 1]
-                        b1 = rt1.sequenceOfNodes[firstNodeIndex]
-                        c1 = rt1.sequenceOfNodes[firstNodeIndex + 1]
-                        a2 = rt2.sequenceOfNodes[secondNodeIndex - 1]
-                        b2 = rt2.sequenceOfNodes[secondNodeIndex]
-                        c2 = rt2.sequenceOfNodes[secondNodeIndex + 1]
-                        moveDur = None
-                        durChangeFirstRoute = None
-                        durChangeSecondRoute = None
-                        if rt1 == rt2:
-                            if firstNodeIndex == secondNodeIndex - 1:
-                                durRemoved = self.distanceMatrix[a1.id][b1.id] + self.distanceMatrix[b1.id][b2.id] + \
-                                                self.distanceMatrix[b2.id][c2.id] 
-                                durAdded = self.distanceMatrix[a1.id][b2.id] + self.distanceMatrix[b2.id][b1.id] + \
-                                            self.distanceMatrix[b1.id][c2.id]  
-                                moveDur = durAdded - durRemoved
-                            else:
-                                durRemoved1 = self.distanceMatrix[a1.id][b1.id] + self.distanceMatrix[b1.id][c1.id]
-                                durAdded1 = self.distanceMatrix[a1.id][b2.id] + self.distanceMatrix[b2.id][c1.id]
-                                durRemoved2 = self.distanceMatrix[a2.id][b2.id] + self.distanceMatrix[b2.id][c2.id]
-                                durAdded2 = self.distanceMatrix[a2.id][b1.id] + self.distanceMatrix[b1.id][c2.id]
-                                moveDur = durAdded1 + durAdded2 - (durRemoved1 + durRemoved2)
-                        else:
-                            if rt1.load - b1.demand + b2.demand > rt1.capacity:
-                                continue
-                            if rt2.load - b2.demand + b1.demand > rt2.capacity:
-                                continue
-                            durRemoved1 = self.distanceMatrix[a1.id][b1.id] + self.distanceMatrix[b1.id][c1.id] + b1.service_time
-                            durAdded1 = self.distanceMatrix[a1.id][b2.id] + self.distanceMatrix[b2.id][c1.id] + b2.service_time
-                            durChangeFirstRoute = durAdded1 - durRemoved1
-                            if rt1.duration + durChangeFirstRoute > rt1.duration:
+            rt2: Route = self.initialSolution.routes[secondRouteIndex]
+            for firstNodeIndex in range(1, len(rt1.sequenceOfNodes) - 1):
+                firstSkipped = rt1.sequenceOfNodes[firstNodeIndex] in skip
+                startOfSecondNodeIndex = 1
+                if rt1 == rt2:
+                    startOfSecondNodeIndex = firstNodeIndex + 1
+                for secondNodeIndex in range(startOfSecondNodeIndex, len(rt2.sequenceOfNodes) - 1):
+                    if firstSkipped and rt2.sequenceOfNodes[secondNodeIndex] in skip:
+                        continue
+                    yield firstRouteIndex, secondRouteIndex, firstNodeIndex, secondNodeIndex
+
+    def GranularSwaps(self, k: int, pairs):
+        """Yields the swaps that place a node next to one of its k nearest neighbours
+
+        Args:
+            k `int`: Number of nearest neighbours per node
+            pairs `list`: (firstRoute, secondRoute) index pairs to scan
+        """
+        routes = self.initialSolution.routes
+        positions = self.NodePositions()
+        neighbours = self.model.nearest_neighbours(k).tolist()
+        skip = self.dontLook if tune.dontLookBits else ()
+        pairs = set(pairs)
+        scanned = {routeIndex for pair in pairs for routeIndex in pair}
+        seen = set()
+        for firstRouteIndex, rt1 in enumerate(routes):
+            if firstRouteIndex not in scanned:
+                continue
+            for firstNodeIndex in range(1, len(rt1.sequenceOfNodes) - 1):
+                b1 = rt1.sequenceOfNodes[firstNodeIndex]
+                if b1 in skip:
+                    continue
+                for n in neighbours[b1]:
+                    # b1 takes the place of the node right after n or right before it
+                    for secondRouteIndex, nodeIndex in positions[n]:
+                        for secondNodeIndex in (nodeIndex + 1, nodeIndex - 1):
+                            if secondNodeIndex < 1 or \
+                                    secondNodeIndex >= len(routes[secondRouteIndex].sequenceOfNodes) - 1:
                                 continue
-                            durRemoved2 = self.distanceMatrix[a2.id][b2.id] + self.distanceMatrix[b2.id][c2.id] + b2.service_time
-                            durAdded2 = self.distanceMatrix[a2.id][b1.id] + self.distanceMatrix[b1.id][c2.id] + b1.service_time
-                            durChangeSecondRoute = durAdded2 - durRemoved2
-                            if rt2.duration + durChangeSecondRoute > rt2.duration:
+                            move = min((firstRouteIndex, firstNodeIndex), (secondRouteIndex, secondNodeIndex)) + \
+                                max((firstRouteIndex, firstNodeIndex), (secondRouteIndex, secondNodeIndex))
+                            if move[:2] == move[2:] or (move[0], move[2]) not in pairs or move in seen:
                                 continue
-                            moveDur = durChangeSecondRoute + durChangeFirstRoute
-                        if moveDur < 0:
-                            copys = SwapMove()
-                            copys.Initialize(firstRouteIndex, secondRouteIndex, firstNodeIndex, secondNodeIndex,
-                                             durChangeFirstRoute, durChangeSecondRoute, moveDur)
-                            self.allSwapMoves.append(copys)
-                        if moveDur < self.swapMove.moveDur:
-                            self.swapMove.Initialize(firstRouteIndex, secondRouteIndex, firstNodeIndex, secondNodeIndex,
-                                                durChangeFirstRoute, durChangeSecondRoute, moveDur)
-        self.terminateSearch = True
-
+                            seen.add(move)
+                            yield move[0], move[2], move[1], move[3]
+
+    def EvaluateSwap(self, firstRouteIndex, secondRouteIndex, firstNodeIndex, secondNodeIndex):
+        """Prices a single swap and keeps it if it is the best of its route pair so far"""
+        rt1: Route = self.initialSolution.routes[firstRouteIndex]
+        rt2: Route = self.initialSolution.routes[secondRouteIndex]
+        a1 = rt1.sequenceOfNodes[firstNodeIndex - 1]
+        b1 = rt1.sequenceOfNodes[firstNodeIndex]
+        c1 = rt1.sequenceOfNodes[firstNodeIndex + 1]
+        a2 = rt2.sequenceOfNodes[secondNodeIndex - 1]
+        b2 = rt2.sequenceOfNodes[secondNodeIndex]
+        c2 = rt2.sequenceOfNodes[secondNodeIndex + 1]
+        moveDur = None
+        durChangeFirstRoute = None
+        durChangeSecondRoute = None
+        if rt1 == rt2:
+            if firstNodeIndex == secondNodeIndex - 1:
+                durRemoved = self.distanceMatrix[a1, b1] + self.distanceMatrix[b1, b2] + \
+                                self.distanceMatrix[b2, c2] 
+                durAdded = self.distanceMatrix[a1, b2] + self.distanceMatrix[b2, b1] + \
+                            self.distanceMatrix[b1, c2]  
+                moveDur = durAdded - durRemoved
+            else:
+                durRemoved1 = self.distanceMatrix[a1, b1] + self.distanceMatrix[b1, c1]
+                durAdded1 = self.distanceMatrix[a1, b2] + self.distanceMatrix[b2, c1]
+                durRemoved2 = self.distanceMatrix[a2, b2] + self.distanceMatrix[b2, c2]
+                durAdded2 = self.distanceMatrix[a2, b1] + self.distanceMatrix[b1, c2]
+                moveDur = durAdded1 + durAdded2 - (durRemoved1 + durRemoved2)
+        else:
+            if rt1.load - self.demands[b1] + self.demands[b2] > rt1.capacity:
+                return
+            if rt2.load - self.demands[b2] + self.demands[b1] > rt2.capacity:
+                return
+            durRemoved1 = self.durationMatrix[a1, b1] + self.distanceMatrix[b1, c1]
+            durAdded1 = self.durationMatrix[a1, b2] + self.distanceMatrix[b2, c1]
+            durChangeFirstRoute = durAdded1 - durRemoved1
+            if rt1.travelled + durChangeFirstRoute > rt1.duration:
+                return
+            durRemoved2 = self.durationMatrix[a2, b2] + self.distanceMatrix[b2, c2]
+            durAdded2 = self.durationMatrix[a2, b1] + self.distanceMatrix[b1, c2]
+            durChangeSecondRoute = durAdded2 - durRemoved2
+            if rt2.travelled + durChangeSecondRoute > rt2.duration:
+                return
+            moveDur = durChangeSecondRoute + durChangeFirstRoute
+        if moveDur < 0:
+            self.improvingOrigins.update((b1, b2))
+        if self.reservoir is not None and (moveDur < 0 or not self.sampleImprovingOnly) and \
+                self.reservoir.Offer():
+            self.reservoir.item.Initialize(firstRouteIndex, secondRouteIndex, firstNodeIndex, secondNodeIndex,
+                                           durChangeFirstRoute, durChangeSecondRoute, moveDur)
+        pair = (firstRouteIndex, secondRouteIndex)
+        best = self.moveMemory[1].get(pair)
+        if best is None:
+            best = SwapMove()
+        if moveDur < best.moveDur:
+            best.Initialize(firstRouteIndex, secondRouteIndex, firstNodeIndex, secondNodeIndex,
+                            durChangeFirstRoute, durChangeSecondRoute, moveDur)
+            self.moveMemory[1][pair] = best
 
     def FindBestTwoOptMove(self) -> TwoOptMove:
-        for rtInd1 in range(0, len(self.initialSolution.routes)):
-            rt1: Route = self.initialSolution.routes[rtInd1]
-            for rtInd2 in range(rtInd1, len(self.initialSolution.routes)):
-                rt2: Route = self.initialSolution.routes[rtInd2]
-                for nodeInd1 in range(0, len(rt1.sequenceOfNodes) - 1):
-                    start2 = 0
-                    if (rt1 == rt2):
-                        start2 = nodeInd1 + 2
-                    for nodeInd2 in range(start2, len(rt2.sequenceOfNodes) - 1):
-                        moveDur = 0
-                        A = rt1.sequenceOfNodes[nodeInd1]
-                        B = rt1.sequenceOfNodes[nodeInd1 + 1]
-                        K = rt2.sequenceOfNodes[nodeInd2]
-                        L = rt2.sequenceOfNodes[nodeInd2 + 1]
-                        if rt1 == rt2:
-                            if nodeInd1 == 0 and nodeInd2 == len(rt1.sequenceOfNodes) - 2:
-                                continue
-                            durAdded = self.distanceMatrix[A.id][K.id] + self.distanceMatrix[B.id][L.id]
-                            durRemoved = self.distanceMatrix[A.id][B.id] + self.distanceMatrix[K.id][L.id]
-                            moveDur = durAdded - durRemoved
-                        else:
-                            if nodeInd1 == 0 and nodeInd2 == 0:
-                                continue
-                            if nodeInd1 == len(rt1.sequenceOfNodes) - 2 and nodeInd2 == len(rt2.sequenceOfNodes) - 2:
-                                continue
-                            if CapacityOrDurationIsViolated(self.distanceMatrix, rt1, nodeInd1, rt2, nodeInd2):
-                                continue
-                            durAdded = self.distanceMatrix[A.id][K.id] + self.distanceMatrix[B.id][L.id]
-                            durRemoved = self.distanceMatrix[A.id][B.id] + self.distanceMatrix[K.id][L.id]
-                            moveDur = durAdded - durRemoved
-                        if moveDur < 0:
-                            copyto = TwoOptMove()
-                            copyto.Initialize(rtInd1, rtInd2, nodeInd1, nodeInd2, moveDur)
-                            self.allTwoOptMoves.append(copyto)
-                        if moveDur < self.twoOptMove.moveDur + tune.precision:
-                            self.twoOptMove.Initialize(rtInd1, rtInd2, nodeInd1, nodeInd2, moveDur)
-        self.terminateSearch = True
+        pairs = self.DirtyPairs(2)
+        for pair in pairs:
+            if self.IsBatched(*pair):
+                self.EvaluateTwoOptsBatched(*pair)
+            else:
+                self.EvaluateTwoOpts(*pair)
+        self.SetDontLookBits(pairs, True)
+        self.twoOptMove = self.BestRememberedMove(2, TwoOptMove())
+        return self.twoOptMove
+
+    def EvaluateTwoOpts(self, rtInd1, rtInd2):
+        """Prices every 2-opt move between two routes and keeps the best one of the pair"""
+        skip = self.dontLook if tune.dontLookBits else ()
+        rt1: Route = self.initialSolution.routes[rtInd1]
+        rt2: Route = self.initialSolution.routes[rtInd2]
+        best = TwoOptMove()
+        evaluated = 0
+        for nodeInd1 in range(0, len(rt1.sequenceOfNodes) - 1):
+            firstSkipped = rt1.sequenceOfNodes[nodeInd1] in skip
+            start2 = 0
+            if (rt1 == rt2):
+                start2 = nodeInd1 + 2
+            for nodeInd2 in range(start2, len(rt2.sequenceOfNodes) - 1):
+                moveDur = 0
+                A = rt1.sequenceOfNodes[nodeInd1]
+                B = rt1.sequenceOfNodes[nodeInd1 + 1]
+                K = rt2.sequenceOfNodes[nodeInd2]
+                L = rt2.sequenceOfNodes[nodeInd2 + 1]
+                if firstSkipped and K in skip:
+                    continue
+                evaluated += 1
+                if rt1 == rt2:
+                    if nodeInd1 == 0 and nodeInd2 == len(rt1.sequenceOfNodes) - 2:
+                        continue
+                    durAdded = self.distanceMatrix[A, K] + self.distanceMatrix[B, L]
+                    durRemoved = self.distanceMatrix[A, B] + self.distanceMatrix[K, L]
+                    moveDur = durAdded - durRemoved
+                else:
+                    if nodeInd1 == 0 and nodeInd2 == 0:
+                        continue
+                    if nodeInd1 == len(rt1.sequenceOfNodes) - 2 and nodeInd2 == len(rt2.sequenceOfNodes) - 2:
+                        continue
+                    if CapacityOrDurationIsViolated(self.durationMatrix, rt1, nodeInd1, rt2, nodeInd2):
+                        continue
+                    # Tails are exchanged, so A links to L and K links to B
+                    durAdded = self.distanceMatrix[A, L] + self.distanceMatrix[K, B]
+                    durRemoved = self.distanceMatrix[A, B] + self.distanceMatrix[K, L]
+                    moveDur = durAdded - durRemoved
+                if moveDur < 0:
+                    self.improvingOrigins.update((A, K))
+                if self.reservoir is not None and (moveDur < 0 or not self.sampleImprovingOnly) and \
+                        self.reservoir.Offer():
+                    self.reservoir.item.Initialize(rtInd1, rtInd2, nodeInd1, nodeInd2, moveDur)
+                if moveDur < best.moveDur:
+                    best.Initialize(rtInd1, rtInd2, nodeInd1, nodeInd2, moveDur)
+        if best.positionOfFirstRoute is not None:
+            self.moveMemory[2][rtInd1, rtInd2] = best
+        if stats.enabled:
+            stats.Count('localSearch.twoOpt.evaluated', evaluated)
+
+    def FindBestInsertionMove(self) -> InsertionMove:
+        pairs = self.DirtyPairs(3)
+        unrouted = sorted(self.unrouted)
+        for routeIndex, _ in pairs:
+            self.EvaluateInsertions(routeIndex, unrouted)
+        self.insertionMove = self.BestRememberedMove(3, InsertionMove())
+        return self.insertionMove
+
+    def EvaluateInsertions(self, routeIndex, unrouted):
+        """Prices every insertion of an unrouted customer into a route and keeps the best one
+
+        Args:
+            routeIndex `int`: Route number
+            unrouted `list`: Unrouted customer ids, in scan order
+        """
+        rt: Route = self.initialSolution.routes[routeIndex]
+        best = InsertionMove()
+        evaluated = 0
+        for cust in unrouted:
+            profitGain = self.profits[cust]
+            if rt.load + self.demands[cust] > rt.capacity or \
+                    rt.travelled + self.serviceTimes[cust] > rt.duration:
+                continue
+            evaluated += len(rt.sequenceOfNodes) - 1
+            for nodeIndex in range(0, len(rt.sequenceOfNodes) - 1):
+                F = rt.sequenceOfNodes[nodeIndex]
+                G = rt.sequenceOfNodes[nodeIndex + 1]
+                moveDur = self.durationMatrix[F, cust] + self.distanceMatrix[cust, G] - \
+                    self.distanceMatrix[F, G]
+                if rt.travelled + moveDur > rt.duration:
+                    continue
+                if self.reservoir is not None and (profitGain > 0 or not self.sampleImprovingOnly) and \
+                        self.reservoir.Offer():
+                    self.reservoir.item.Initialize(routeIndex, nodeIndex, cust, moveDur, profitGain)
+                if profitGain > best.profitGain or (profitGain == best.profitGain and moveDur < best.moveDur):
+                    best.Initialize(routeIndex, nodeIndex, cust, moveDur, profitGain)
+        if best.routePosition is not None:
+            self.moveMemory[3][routeIndex, routeIndex] = best
+        if stats.enabled:
+            stats.Count('localSearch.insertion.evaluated', evaluated)
+
+    def FindBestExchangeMove(self) -> ExchangeMove:
+        pairs = self.DirtyPairs(4)
+        unrouted = sorted(self.unrouted, key=lambda cust: self.profits[cust], reverse=True)
+        for routeIndex, _ in pairs:
+            self.EvaluateExchanges(routeIndex, unrouted)
+        self.exchangeMove = self.BestRememberedMove(4, ExchangeMove())
+        return self.exchangeMove
+
+    def EvaluateExchanges(self, routeIndex, unrouted):
+        """Prices every exchange of a routed for an unrouted customer in a route and keeps the best one
+
+        Args:
+            routeIndex `int`: Route number
+            unrouted `list`: Unrouted customer ids, most profitable first
+        """
+        rt: Route = self.initialSolution.routes[routeIndex]
+        best = ExchangeMove()
+        evaluated = 0
+        for nodeIndex in range(1, len(rt.sequenceOfNodes) - 1):
+            A = rt.sequenceOfNodes[nodeIndex - 1]
+            B = rt.sequenceOfNodes[nodeIndex]
+            C = rt.sequenceOfNodes[nodeIndex + 1]
+            durRemoved = self.durationMatrix[A, B] + self.distanceMatrix[B, C]
+            for cust in unrouted:
+                profitGain = self.profits[cust] - self.profits[B]
+                if profitGain <= 0 and (self.reservoir is None or self.sampleImprovingOnly):
+                    # The rest of the customers are even less profitable
+                    break
+                evaluated += 1
+                if rt.load - self.demands[B] + self.demands[cust] > rt.capacity:
+                    continue
+                moveDur = self.durationMatrix[A, cust] + self.distanceMatrix[cust, C] - durRemoved
+                if rt.travelled + moveDur > rt.duration:
+                    continue
+                if self.reservoir is not None and (profitGain > 0 or not self.sampleImprovingOnly) and \
+                        self.reservoir.Offer():
+                    self.reservoir.item.Initialize(routeIndex, nodeIndex, cust, moveDur, profitGain)
+                if profitGain > best.profitGain or (profitGain == best.profitGain and moveDur < best.moveDur):
+                    best.Initialize(routeIndex, nodeIndex, cust, moveDur, profitGain)
+        if best.routePosition is not None:
+            self.moveMemory[4][routeIndex, routeIndex] = best
+        if stats.enabled:
+            stats.Count('localSearch.exchange.evaluated', evaluated)
+
+    def IsBatched(self, rtInd1, rtInd2) -> bool:
+        """Checks if the moves between two routes are priced with array operations
+
+        Pairs are batched once the product of their route lengths reaches
+        `tune.batchMoveThreshold`.
+        """
+        routes = self.initialSolution.routes
+        return tune.batchMoveThreshold is not None and \
+            len(routes[rtInd1].sequenceOfNodes) * len(routes[rtInd2].sequenceOfNodes) >= tune.batchMoveThreshold
+
+    def SkippedNodes(self, nodes) -> np.ndarray:
+        """Marks the nodes whose don't-look bit is set"""
+        if not tune.dontLookBits or not self.dontLook:
+            return np.zeros(nodes.shape, dtype=bool)
+        return np.isin(nodes, list(self.dontLook))
+
+    def KeepBatchedMoves(self, operator: int, pair, moveDur, scanned, feasible, initialize) -> np.ndarray:
+        """Keeps the moves a scan of a route pair would keep, from its delta matrix
+
+        Feeds the sampler in scan order and remembers the same best move as
+        the scalar `Evaluate*` methods. The evaluated moves are counted as a
+        scalar scan counts them, before the capacity and duration checks.
+
+        Args:
+            operator `int`: Operator index
+            pair `tuple`: Route indices of the pair
+            moveDur `np.ndarray`: Duration change of every move, in scan order
+            scanned `np.ndarray`: Mask of the moves a scan would enumerate
+            feasible `np.ndarray`: Mask of the scanned moves that meet the constraints
+            initialize: Callable filling a move object from a (row, column) entry
+
+        Returns:
+            np.ndarray: Mask of the improving moves
+        """
+        if stats.enabled:
+            stats.Count('localSearch.%s.evaluated' % OperatorNames[operator], int(np.count_nonzero(scanned)))
+        improving = feasible & (moveDur < 0)
+        if self.reservoir is not None:
+            offered = improving if self.sampleImprovingOnly else feasible
+            for row, col in zip(*np.nonzero(offered)):
+                if self.reservoir.Offer():
+                    initialize(self.reservoir.item, row, col)
+        values = np.where(feasible, moveDur, np.inf).ravel()
+        index = ReplayBestIndex(values)
+        if index >= 0:
+            move = [RelocationMove, SwapMove, TwoOptMove][operator]()
+            initialize(move, *divmod(index, moveDur.shape[1]))
+            self.moveMemory[operator][pair] = move
+        return improving
+
+    def EvaluateRelocationsBatched(self, originRouteIndex, targetRouteIndex):
+        """Prices every relocation between two routes with array operations
+
+        Rows are the origin nodes and columns the target positions, exactly as
+        `EvaluateRelocation` prices them one at a time.
+        """
+        rt1: Route = self.initialSolution.routes[originRouteIndex]
+        rt2: Route = self.initialSolution.routes[targetRouteIndex]
+        seq1 = np.asarray(rt1.sequenceOfNodes)
+        seq2 = np.asarray(rt2.sequenceOfNodes)
+        if len(seq1) < 3:
+            return
+        dist, dur = self.distanceMatrix, self.durationMatrix
+        A, B, C = seq1[:-2, None], seq1[1:-1, None], seq1[2:, None]
+        F, G = seq2[None, :-1], seq2[None, 1:]
+
+        targetRtDurChange = dur[F, B] + dist[B, G] - dist[F, G]
+        distanceAdded = dist[A, C] + dist[F, B] + dist[B, G]
+        distanceRemoved = dist[A, B] + dist[B, C] + dist[F, G]
+        originRtDurChange = dist[A, C] - dur[A, B] - dist[B, C]
+        moveDur = distanceAdded - distanceRemoved
+
+        scanned = np.broadcast_to(~self.SkippedNodes(B), moveDur.shape)
+        if rt1 != rt2:
+            feasible = scanned & ~(rt2.load + self.model.demands[B] > rt2.capacity) & \
+                ~(rt2.travelled + self.model.serviceTimes[B] > rt2.duration) & \
+                ~(rt2.travelled + targetRtDurChange > rt2.duration)
+        else:
+            # Row r holds origin node r + 1, which stays put at target r or r + 1
+            rows = np.arange(len(seq1) - 2)[:, None]
+            cols = np.arange(len(seq2) - 1)[None, :]
+            scanned = scanned & (cols != rows) & (cols != rows + 1)
+            feasible = scanned & ~(rt1.travelled + moveDur > rt1.duration)
+
+        def initialize(move, row, col):
+            move.Initialize(originRouteIndex, targetRouteIndex, int(row) + 1, int(col),
+                            originRtDurChange[row, 0], targetRtDurChange[row, col], moveDur[row, col])
+        improving = self.KeepBatchedMoves(0, (originRouteIndex, targetRouteIndex), moveDur, scanned, feasible,
+                                          initialize)
+        self.improvingOrigins.update(seq1[1:-1][improving.any(axis=1)].tolist())
+
+    def EvaluateSwapsBatched(self, firstRouteIndex, secondRouteIndex):
+        """Prices every swap between two routes with array operations
+
+        Rows are the nodes of the first route and columns the nodes of the
+        second one, exactly as `EvaluateSwap` prices them one at a time.
+        """
+        rt1: Route = self.initialSolution.routes[firstRouteIndex]
+        rt2: Route = self.initialSolution.routes[secondRouteIndex]
+        seq1 = np.asarray(rt1.sequenceOfNodes)
+        seq2 = np.asarray(rt2.sequenceOfNodes)
+        if len(seq1) < 3 or len(seq2) < 3:
+            return
+        dist, dur = self.distanceMatrix, self.durationMatrix
+        demands = self.model.demands
+        a1, b1, c1 = seq1[:-2, None], seq1[1:-1, None], seq1[2:, None]
+        a2, b2, c2 = seq2[None, :-2], seq2[None, 1:-1], seq2[None, 2:]
+
+        scanned = ~(self.SkippedNodes(b1) & self.SkippedNodes(b2))
+        durChangeFirstRoute = durChangeSecondRoute = None
+        if rt1 == rt2:
+            rows = np.arange(len(seq1) - 2)[:, None]
+            cols = np.arange(len(seq2) - 2)[None, :]
+            durRemoved = dist[a1, b1] + dist[b1, b2] + dist[b2, c2]
+            durAdded = dist[a1, b2] + dist[b2, b1] + dist[b1, c2]
+            adjacentMoveDur = durAdded - durRemoved
+            durRemoved1 = dist[a1, b1] + dist[b1, c1]
+            durAdded1 = dist[a1, b2] + dist[b2, c1]
+            durRemoved2 = dist[a2, b2] + dist[b2, c2]
+            durAdded2 = dist[a2, b1] + dist[b1, c2]
+            moveDur = np.where(cols == rows + 1, adjacentMoveDur,
+                               durAdded1 + durAdded2 - (durRemoved1 + durRemoved2))
+            scanned = feasible = scanned & (cols > rows)
+        else:
+            durRemoved1 = dur[a1, b1] + dist[b1, c1]
+            durAdded1 = dur[a1, b2] + dist[b2, c1]
+            durChangeFirstRoute = durAdded1 - durRemoved1
+            durRemoved2 = dur[a2, b2] + dist[b2, c2]
+            durAdded2 = dur[a2, b1] + dist[b1, c2]
+            durChangeSecondRoute = durAdded2 - durRemoved2
+            moveDur = durChangeSecondRoute + durChangeFirstRoute
+            feasible = scanned & \
+                ~(rt1.load - demands[b1] + demands[b2] > rt1.capacity) & \
+                ~(rt2.load - demands[b2] + demands[b1] > rt2.capacity) & \
+                ~(rt1.travelled + durChangeFirstRoute > rt1.duration) & \
+                ~(rt2.travelled + durChangeSecondRoute > rt2.duration)
+
+        def initialize(move, row, col):
+            if durChangeFirstRoute is None:
+                move.Initialize(firstRouteIndex, secondRouteIndex, int(row) + 1, int(col) + 1,
+                                None, None, moveDur[row, col])
+            else:
+                move.Initialize(firstRouteIndex, secondRouteIndex, int(row) + 1, int(col) + 1,
+                                durChangeFirstRoute[row, col], durChangeSecondRoute[row, col], moveDur[row, col])
+        improving = self.KeepBatchedMoves(1, (firstRouteIndex, secondRouteIndex), moveDur, scanned, feasible,
+                                          initialize)
+        self.improvingOrigins.update(seq1[1:-1][improving.any(axis=1)].tolist())
+        self.improvingOrigins.update(seq2[1:-1][improving.any(axis=0)].tolist())
+
+    def EvaluateTwoOptsBatched(self, rtInd1, rtInd2):
+        """Prices every 2-opt move between two routes with array operations
+
+        Rows are the arcs of the first route and columns the arcs of the
+        second one, exactly as `EvaluateTwoOpts` prices them one at a time.
+        """
+        rt1: Route = self.initialSolution.routes[rtInd1]
+        rt2: Route = self.initialSolution.routes[rtInd2]
+        seq1 = np.asarray(rt1.sequenceOfNodes)
+        seq2 = np.asarray(rt2.sequenceOfNodes)
+        dist, dur = self.distanceMatrix, self.durationMatrix
+        A, B = seq1[:-1, None], seq1[1:, None]
+        K, L = seq2[None, :-1], seq2[None, 1:]
+        rows = np.arange(len(seq1) - 1)[:, None]
+        cols = np.arange(len(seq2) - 1)[None, :]
+
+        scanned = ~(self.SkippedNodes(A) & self.SkippedNodes(K))
+        if rt1 == rt2:
+            moveDur = dist[A, K] + dist[B, L] - (dist[A, B] + dist[K, L])
+            scanned = scanned & (cols >= rows + 2)
+            feasible = scanned & ~((rows == 0) & (cols == len(seq1) - 2))
+        else:
+            # Tails are exchanged, so A links to L and K links to B
+            moveDur = dist[A, L] + dist[K, B] - (dist[A, B] + dist[K, L])
+            prefixLoad1 = np.asarray(rt1.prefixLoad)[:-1, None]
+            prefixLoad2 = np.asarray(rt2.prefixLoad)[None, :-1]
+            prefixDuration1 = np.asarray(rt1.prefixDuration)[:, None]
+            prefixDuration2 = np.asarray(rt2.prefixDuration)[None, :]
+            feasible = scanned & ~((rows == 0) & (cols == 0)) & \
+                ~((rows == len(seq1) - 2) & (cols == len(seq2) - 2)) & \
+                ~(prefixLoad1 + (rt2.load - prefixLoad2) > rt1.capacity) & \
+                ~(prefixLoad2 + (rt1.load - prefixLoad1) > rt2.capacity) & \
+                ~(prefixDuration1[:-1] + dur[A, L] + (rt2.travelled - prefixDuration2[:, 1:]) > rt1.duration) & \
+                ~(prefixDuration2[:, :-1] + dur[K, B] + (rt1.travelled - prefixDuration1[1:]) > rt2.duration)
+
+        def initialize(move, row, col):
+            move.Initialize(rtInd1, rtInd2, int(row), int(col), moveDur[row, col])
+        improving = self.KeepBatchedMoves(2, (rtInd1, rtInd2), moveDur, scanned, feasible, initialize)
+        self.improvingOrigins.update(seq1[:-1][improving.any(axis=1)].tolist())
+        self.improvingOrigins.update(seq2[:-1][improving.any(axis=0)].tolist())
 
     def ApplyRelocationMove(self):
 
         rm = self.relocationMove
-        oldDuration = CalculateTotalDuration(self.distanceMatrix, self.initialSolution)
         originRt = self.optimizedSolution.routes[rm.originRoutePosition]
         targetRt = self.optimizedSolution.routes[rm.targetRoutePosition]
         B = originRt.sequenceOfNodes[rm.originNodePosition]
@@ -354,28 +1009,24 @@ class LocalSearch:
                 targetRt.sequenceOfNodes.insert(rm.targetNodePosition, B)
             else:
                 targetRt.sequenceOfNodes.insert(rm.targetNodePosition + 1, B)
-            originRt.travelled = CalculateTravelledTime(self.distanceMatrix, originRt)
+            originRt.travelled += rm.moveDur
         else:
             del originRt.sequenceOfNodes[rm.originNodePosition]
             targetRt.sequenceOfNodes.insert(rm.targetNodePosition + 1, B)
-            originRt.travelled = CalculateTravelledTime(self.distanceMatrix, originRt)
-            targetRt.travelled = CalculateTravelledTime(self.distanceMatrix, targetRt)
-            originRt.load -= B.demand
-            targetRt.load += B.demand
-        newDuration = CalculateTotalDuration(self.distanceMatrix, self.optimizedSolution)
-        if newDuration > oldDuration:
-            self.optimizedSolution = copy.copy(self.initialSolution)
-        '''
-         # debuggingOnly
-                if abs((newDuration - oldDuration) - rm.moveDur) > 0.0001:
-            print('Cost Issue')
-        
-        '''
+            originRt.travelled += rm.durChangeOriginRt
+            targetRt.travelled += rm.durChangeTargetRt
+            originRt.load -= self.demands[B]
+            targetRt.load += self.demands[B]
+            originRt.profit -= self.profits[B]
+            targetRt.profit += self.profits[B]
+        self.optimizedSolution.duration += rm.moveDur
+        self.UpdateSegments(originRt, targetRt)
+        self.ForgetRoutes(rm.originRoutePosition, rm.targetRoutePosition)
+        self.CheckBookkeeping()
 
     def ApplySwapMove(self):
 
         sm = self.swapMove
-        oldDuration = CalculateTotalDuration(self.distanceMatrix, self.initialSolution)  # TODO Implement inside Utils.py
         rt1 = self.optimizedSolution.routes[sm.positionOfFirstRoute]
         rt2 = self.optimizedSolution.routes[sm.positionOfSecondRoute]
         b1 = rt1.sequenceOfNodes[sm.positionOfFirstNode]
@@ -383,184 +1034,289 @@ class LocalSearch:
         rt1.sequenceOfNodes[sm.positionOfFirstNode] = b2
         rt2.sequenceOfNodes[sm.positionOfSecondNode] = b1
         if (rt1 == rt2):
-            rt1.travelled = CalculateTravelledTime(self.distanceMatrix, rt1)
+            rt1.travelled += sm.moveDur
         else:
             rt1.travelled += sm.durChangeFirstRt
             rt2.travelled += sm.durChangeSecondRt
-            rt1.load = rt1.load - b1.demand + b2.demand
-            rt2.load = rt2.load + b1.demand - b2.demand
-        newDuration = CalculateTotalDuration(self.distanceMatrix, self.optimizedSolution)
-        if newDuration > oldDuration:
-            self.optimizedSolution = copy.copy(self.initialSolution)
-        '''
-                # debuggingOnly
-        if abs((newDur - oldDur) - sm.moveDur) > 0.0001:
-            print('Cost Issue')
-        '''
+            rt1.load = rt1.load - self.demands[b1] + self.demands[b2]
+            rt2.load = rt2.load + self.demands[b1] - self.demands[b2]
+            rt1.profit = rt1.profit - self.profits[b1] + self.profits[b2]
+            rt2.profit = rt2.profit + self.profits[b1] - self.profits[b2]
+        self.optimizedSolution.duration += sm.moveDur
+        self.UpdateSegments(rt1, rt2)
+        self.ForgetRoutes(sm.positionOfFirstRoute, sm.positionOfSecondRoute)
+        self.CheckBookkeeping()
 
     def ApplyTwoOptMove(self):
         top = self.twoOptMove
-        oldDuration = CalculateTotalDuration(self.distanceMatrix, self.initialSolution)
         rt1: Route = self.optimizedSolution.routes[top.positionOfFirstRoute]
         rt2: Route = self.optimizedSolution.routes[top.positionOfSecondRoute]
+        nodeInd1 = top.positionOfFirstNode
+        nodeInd2 = top.positionOfSecondNode
         if rt1 == rt2:
-            reversedSegment = reversed(rt1.sequenceOfNodes[top.positionOfFirstNode + 1: top.positionOfSecondNode + 1])
-            rt1.sequenceOfNodes[top.positionOfFirstNode + 1: top.positionOfSecondNode + 1] = reversedSegment
-            rt1.travelled = CalculateTravelledTime(self.distanceMatrix, rt1)
+            reversedSegment = reversed(rt1.sequenceOfNodes[nodeInd1 + 1: nodeInd2 + 1])
+            rt1.sequenceOfNodes[nodeInd1 + 1: nodeInd2 + 1] = reversedSegment
+            rt1.travelled += top.moveDur
 
         else:
-            relocatedSegmentOfRt1 = rt1.sequenceOfNodes[top.positionOfFirstNode + 1:]
-            relocatedSegmentOfRt2 = rt2.sequenceOfNodes[top.positionOfSecondNode + 1:]
-            del rt1.sequenceOfNodes[top.positionOfFirstNode + 1:]
-            del rt2.sequenceOfNodes[top.positionOfSecondNode + 1:]
+            # New totals from the prefix aggregates, before the sequences change
+            A = rt1.sequenceOfNodes[nodeInd1]
+            B = rt1.sequenceOfNodes[nodeInd1 + 1]
+            K = rt2.sequenceOfNodes[nodeInd2]
+            L = rt2.sequenceOfNodes[nodeInd2 + 1]
+            rt1Travelled = rt1.prefixDuration[nodeInd1] + self.durationMatrix[A, L] + \
+                rt2.travelled - rt2.prefixDuration[nodeInd2 + 1]
+            rt2Travelled = rt2.prefixDuration[nodeInd2] + self.durationMatrix[K, B] + \
+                rt1.travelled - rt1.prefixDuration[nodeInd1 + 1]
+            rt1Load = rt1.prefixLoad[nodeInd1] + rt2.load - rt2.prefixLoad[nodeInd2]
+            rt2Load = rt2.prefixLoad[nodeInd2] + rt1.load - rt1.prefixLoad[nodeInd1]
+            rt1Profit = rt1.prefixProfit[nodeInd1] + rt2.profit - rt2.prefixProfit[nodeInd2]
+            rt2Profit = rt2.prefixProfit[nodeInd2] + rt1.profit - rt1.prefixProfit[nodeInd1]
+
+            relocatedSegmentOfRt1 = rt1.sequenceOfNodes[nodeInd1 + 1:]
+            relocatedSegmentOfRt2 = rt2.sequenceOfNodes[nodeInd2 + 1:]
+            del rt1.sequenceOfNodes[nodeInd1 + 1:]
+            del rt2.sequenceOfNodes[nodeInd2 + 1:]
             rt1.sequenceOfNodes.extend(relocatedSegmentOfRt2)
             rt2.sequenceOfNodes.extend(relocatedSegmentOfRt1)
-            UpdateRouteLoadDurAndProfit(self.distanceMatrix, rt1)
-            UpdateRouteLoadDurAndProfit(self.distanceMatrix, rt2)
-        self.optimizedSolution.duration = CalculateTotalDuration(self.distanceMatrix, self.optimizedSolution)
-        newDuration = CalculateTotalDuration(self.distanceMatrix, self.optimizedSolution)
-        if newDuration > oldDuration:
-            self.optimizedSolution = copy.copy(self.initialSolution)
+            rt1.travelled, rt1.load, rt1.profit = rt1Travelled, rt1Load, rt1Profit
+            rt2.travelled, rt2.load, rt2.profit = rt2Travelled, rt2Load, rt2Profit
+        self.optimizedSolution.duration += top.moveDur
+        self.UpdateSegments(rt1, rt2)
+        self.ForgetRoutes(top.positionOfFirstRoute, top.positionOfSecondRoute)
+        self.CheckBookkeeping()
+
+    def ApplyInsertionMove(self):
+        im = self.insertionMove
+        rt: Route = self.optimizedSolution.routes[im.routePosition]
+        rt.sequenceOfNodes.insert(im.nodePosition + 1, im.customer)
+        rt.travelled += im.moveDur
+        rt.load += self.demands[im.customer]
+        rt.profit += im.profitGain
+        self.optimizedSolution.duration += im.moveDur
+        self.optimizedSolution.profit += im.profitGain
+        self.unrouted.discard(im.customer)
+        self.UpdateSegments(rt)
+        self.ForgetRoutes(im.routePosition)
+        self.ForgetCustomer(im.customer)
+        self.CheckBookkeeping()
+
+    def ApplyExchangeMove(self):
+        em = self.exchangeMove
+        rt: Route = self.optimizedSolution.routes[em.routePosition]
+        B = rt.sequenceOfNodes[em.nodePosition]
+        rt.sequenceOfNodes[em.nodePosition] = em.customer
+        rt.travelled += em.moveDur
+        rt.load += self.demands[em.customer] - self.demands[B]
+        rt.profit += em.profitGain
+        self.optimizedSolution.duration += em.moveDur
+        self.optimizedSolution.profit += em.profitGain
+        self.unrouted.discard(em.customer)
+        self.unrouted.add(B)
+        self.UpdateSegments(rt)
+        self.ForgetRoutes(em.routePosition)
+        self.ForgetCustomer(em.customer)
+        # B is unrouted again and may beat any remembered insertion or exchange
+        for operator in (3, 4):
+            self.moveMemory[operator].clear()
+            self.evaluatedPairs[operator].clear()
+        self.CheckBookkeeping()
+
+    def ForgetCustomer(self, customer):
+        """Drops the remembered insertions and exchanges of a customer that is no longer unrouted"""
+        for operator in (3, 4):
+            memory = self.moveMemory[operator]
+            for pair in [p for p, move in memory.items() if move.customer == customer]:
+                del memory[pair]
+                self.evaluatedPairs[operator].discard(pair)
+
+    def CheckBookkeeping(self):
+        """Cross-checks the incremental totals against a full recalculation
+
+        Only runs when `tune.debugBookkeeping` is set.
+        """
+        if tune.debugBookkeeping:
+            TestSolution(self.optimizedSolution, self.model)
+
+    def SampleMove(self, rng, improvingOnly=True):
+        """Draws a uniformly random feasible move of the operator in a single scan
+
+        The scanned moves are fed to a `Reservoir`, so no move list is built
+        and the solution is left unchanged. The drawn move is also set as the
+        operator's current move, ready to be applied.
+
+        Args:
+            rng `random.Random`: Seeded generator
+            improvingOnly (`bool`, optional): Sample among improving moves only. Defaults to True.
+
+        Returns:
+            The drawn move, or None if the neighbourhood has no such move
+        """
+        self.reservoir = Reservoir(rng, [RelocationMove, SwapMove, TwoOptMove, InsertionMove,
+                                         ExchangeMove][self.operator]())
+        self.sampleImprovingOnly = improvingOnly
+        # The sample is drawn from the whole neighbourhood, not only from the pairs changed since
+        # the last scan, and don't-look bits are ignored. The remembered moves stay valid.
+        self.evaluatedPairs[self.operator].clear()
+        dontLook, self.dontLook = self.dontLook, set()
+        [self.FindBestRelocationMove, self.FindBestSwapMove, self.FindBestTwoOptMove,
+         self.FindBestInsertionMove, self.FindBestExchangeMove][self.operator]()
+        reservoir, self.reservoir = self.reservoir, None
+        self.dontLook = dontLook
+        if reservoir.seen == 0:
+            return None
+        setattr(self, ['relocationMove', 'swapMove', 'twoOptMove', 'insertionMove',
+                       'exchangeMove'][self.operator], reservoir.item)
+        return reservoir.item
 
     def run(self):
+        """Applies the best move of the operator until no move saves more than `tune.precision`
 
-        while not self.terminateSearch:
+        Insertions and exchanges go on while a move still gains profit. Stops
+        early, with every applied move kept, once the deadline expires.
 
-            # SolDrawer.draw(localSearchIterator, self.solution, self.allNodes)
+        Only the route pairs touched by the last applied move are scanned again,
+        the best moves of all other pairs are taken from `moveMemory`.
 
-            # Relocations
-            if self.operator == 0:
-                self.FindBestRelocationMove()
+        Returns:
+            `Solution`: The optimized solution
+        """
+        find, apply = [(self.FindBestRelocationMove, self.ApplyRelocationMove),
+                       (self.FindBestSwapMove, self.ApplySwapMove),
+                       (self.FindBestTwoOptMove, self.ApplyTwoOptMove),
+                       (self.FindBestInsertionMove, self.ApplyInsertionMove),
+                       (self.FindBestExchangeMove, self.ApplyExchangeMove)][self.operator]
+        with stats.Phase('localSearch.' + OperatorNames[self.operator]):
+            self.terminateSearch = False
+            while not self.terminateSearch:
+
+                # SolDrawer.draw(localSearchIterator, self.solution, self.allNodes)
+
+                if self.deadline.Expired():
+                    break
+                move = find()
+                if (move.profitGain > 0 if self.operator >= 3 else move.moveDur < -tune.precision):
+                    apply()
+                    if stats.enabled:
+                        stats.Count('localSearch.%s.applied' % OperatorNames[self.operator])
+                else:
+                    self.terminateSearch = True
+
+          #      TestSolution(self.initialSolution)
+
+                if (self.initialSolution.duration < self.optimizedSolution.duration):
+                    self.optimizedSolution = copy.copy(self.initialSolution)
+
+                self.localSearchIterator = self.localSearchIterator + 1
 
-                if self.relocationMove.originRoutePosition is not None:
-                    if self.relocationMove.moveDur < 0:
-                        self.ApplyRelocationMove()
-                    else:
-                        self.terminateSearch = True
-            # Swaps
-            elif self.operator == 1:
-                self.FindBestSwapMove()
+        return self.optimizedSolution
 
-                if self.swapMove.positionOfFirstRoute is not None:
-                    if self.swapMove.moveDur < 0:
-                        self.ApplySwapMove()
-                    else:
-                        self.terminateSearch = True
-            # 2OptMoves
-            elif self.operator == 2:
-                self.FindBestTwoOptMove()
+def IsMoreProfitable(move, best) -> bool:
+    """Checks if an insertion or exchange beats the best one so far
 
-                if self.twoOptMove.positionOfFirstRoute is not None:
-                    if self.twoOptMove.moveDur < 0:
-                        self.ApplyTwoOptMove()
-                    else:
-                        self.terminateSearch = True
+    Higher profit gain wins, a smaller duration change breaks ties.
+    """
+    return move.profitGain > best.profitGain or \
+        (move.profitGain == best.profitGain and move.moveDur < best.moveDur)
 
-      #      TestSolution(self.initialSolution)
+def ReplayBestIndex(values) -> int:
+    """Finds the entry a sequential best-move scan would end on
 
-            if (self.initialSolution.duration < self.optimizedSolution.duration):
-                self.optimizedSolution = copy.copy(self.initialSolution)
+    The scan starts from a best of 0 and takes every entry strictly smaller
+    than the best so far, so it keeps the first smallest entry, exactly as
+    the scalar `Evaluate*` loops do.
 
-            self.localSearchIterator = self.localSearchIterator + 1
+    Args:
+        values `np.ndarray`: Move durations in scan order, inf where infeasible
 
-        return self.optimizedSolution
+    Returns:
+        int: Index of the kept entry, -1 if none was taken
+    """
+    if values.size == 0:
+        return -1
+    index = int(np.argmin(values))
+    return index if values[index] < 0 else -1
 
 def NeighbourhoodChange(s, ss, k: int):
     '''
     Method to change neighbourhood based on local search operators
 
+    Keeps the better of the incumbent and the improved neighbour, higher
+    profit first and shorter duration second. An improvement restarts from
+    the first operator, otherwise the next operator is tried.
+
     Parameters:
     s: Initial solution
-    ss: test solution
+    ss: test solution, a copy made by `Shake` that does not share routes with s
     k: operator index
     '''
-    if ss.duration < s.duration:
-        s = copy.copy(ss)
+    if ss.profit > s.profit or (ss.profit == s.profit and ss.duration < s.duration):
+        s = ss
         k = 0
+        if stats.enabled:
+            stats.Count('vns.restarts')
     else:
         k += 1
     return s, k
 
-def Shake(s, k: int, distanceMatrix):
+@stats.Timed('vns.shake')
+def Shake(s, k: int, model, improvingOnly=True):
     '''
     Method to pick random solution generated by k local search operator
 
+    The move is applied to a deep copy, so the incumbent stays intact while
+    the neighbour is improved and compared with it.
+
     Parameters:
     s: initial solution
     k: local search operator
+    model: problem model holding node data and matrices
+    improvingOnly: sample among improving moves only, else among all feasible moves
     '''
-    random.seed(30)
-    ls = LocalSearch(s, distanceMatrix, None, k)
-    lsInitial = LocalSearch(s, distanceMatrix, None, k)
-    ls.run()
-    solutions = None
-    ss = None
-    if k == 0:
-        solutions = ls.allRelocationMoves
-        if len(solutions) > 0:
-            indx = random.randint(0, len(solutions) - 1)
-            lsInitial.relocationMove = solutions[indx]
-            lsInitial.ApplyRelocationMove()
-            ss = lsInitial.optimizedSolution
-        else:
-            return s
-    if k == 1:
-        solutions = ls.allSwapMoves
-        if len(solutions) > 0:
-            indx = random.randint(0, len(solutions) - 1)
-            lsInitial.swapMove = solutions[indx]
-            lsInitial.ApplySwapMove()
-            ss = lsInitial.optimizedSolution
-        else:
-            return s
-    if k == 2:
-        solutions = ls.allTwoOptMoves
-        if len(solutions) > 0:
-            indx = random.randint(0, len(solutions) - 1)
-            lsInitial.twoOptMove = solutions[indx]
-            lsInitial.ApplyTwoOptMove()
-            ss = lsInitial.optimizedSolution
-        else:
-            return s
-    return ss
-
-def BestImprovement(s, distanceMatrix, k: int):
+    s = copy.deepcopy(s)
+    ls = LocalSearch(s, model, None, k)
+    move = ls.SampleMove(random.Random(30), improvingOnly)
+    if move is None:
+        return s
+    [ls.ApplyRelocationMove, ls.ApplySwapMove, ls.ApplyTwoOptMove,
+     ls.ApplyInsertionMove, ls.ApplyExchangeMove][k]()
+    return ls.optimizedSolution
+
+def BestImprovement(s, model, k: int, deadline: Deadline = None):
     '''
     Method to find steepest descent for k local search operator
 
     Parameters:
     s: initial solution
-    distanceMatrix: distance matrix for all nodes
+    model: problem model holding node data and matrices
     k: local search operator
+    deadline: stops the descent early, no time limit if None
     '''
-    condition = True
-    counter = 0
-    while (condition):
-        ss = copy.copy(s)
-        ls = LocalSearch(s, distanceMatrix, None, k)
-        ls.run()
-        s = ls.optimizedSolution
-        counter += 1
-        if (s.duration >= ss.duration):
-            break
-        else:
-            return ss
-    return s
+    ls = LocalSearch(s, model, None, k, deadline)
+    return ls.run()
 
-def VNS(s, kmax: int, distanceMatrix):
+@stats.Timed('vns')
+def VNS(s, kmax: int, model, deadline: Deadline = None):
     '''
     Method to apply Basic VNS
 
     Parameters:
     s: initial solution
     kmax: count of local search operators
-    distanceMatrix: distance matrix for all nodes
+    model: problem model holding node data and matrices
+    deadline: returns the best solution so far once expired, no time limit if None
     '''
+    deadline = deadline or Deadline()
     k = 0
     condition = True
     while (condition):
-        ss = Shake(s, k, distanceMatrix)
-        sss = BestImprovement(ss, distanceMatrix, k)
+        if deadline.Expired():
+            break
+        ss = Shake(s, k, model)
+        sss = BestImprovement(ss, model, k, deadline)
+        if stats.enabled:
+            stats.Count('vns.shakes')
+            stats.Count('vns.descents')
         s, k = NeighbourhoodChange(s, sss, k)
         if k > kmax:
             break
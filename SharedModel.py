@@ -0,0 +1,78 @@
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from DistanceOracle import DistanceOracle
+from Model import Model
+
+# Model arrays placed in shared memory, the matrices dominate on large instances
+SharedArrays = ('coordinates', 'demands', 'serviceTimes', 'profits', 'distances', 'durations')
+# Blocks attached by this process, kept referenced for as long as their views are in use
+attachedBlocks = []
+
+
+class SharedModelOwner:
+    """Shared memory copy of a model, owned by the process that created it
+
+    Use as a context manager, leaving it unlinks the shared blocks.
+
+    Attributes:
+        - blocks: `SharedMemory` blocks holding the model arrays
+        - spec: Picklable description of the model, see `AttachModel`
+    """
+    __slots__ = ('blocks', 'spec')
+
+    def __init__(self, model: Model):
+        self.blocks = []
+        arrays = {}
+        for name in SharedArrays:
+            if isinstance(getattr(model, name), DistanceOracle):
+                # Workers rebuild oracles from the shared coordinates
+                continue
+            array = np.ascontiguousarray(getattr(model, name))
+            block = shared_memory.SharedMemory(create=True, size=max(1, array.nbytes))
+            np.ndarray(array.shape, array.dtype, buffer=block.buf)[...] = array
+            self.blocks.append(block)
+            arrays[name] = (block.name, array.shape, array.dtype.str)
+        self.spec = {'arrays': arrays, 'dtype': np.dtype(model.dtype).str, 'memoryLimit': model.memoryLimit,
+                     'vehicles': model.vehicles, 'capacity': model.max_capacity, 'duration': model.max_duration,
+                     'ids': [n.id for n in model.allNodes]}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.Release()
+        return False
+
+    def Release(self):
+        """Closes and unlinks the shared blocks"""
+        for block in self.blocks:
+            block.close()
+            block.unlink()
+        self.blocks = []
+
+
+def AttachModel(spec: dict) -> Model:
+    """Builds a model whose arrays are read only views of shared memory
+
+    Args:
+        spec `dict`: `SharedModelOwner.spec` of the owning process
+
+    Returns:
+        Model: Model sharing the owner's arrays, only the node objects are copied
+    """
+    model = Model(np.dtype(spec['dtype']).type, spec['memoryLimit'])
+    model.vehicles = spec['vehicles']
+    model.max_capacity = spec['capacity']
+    model.max_duration = spec['duration']
+    for name, (blockName, shape, dtype) in spec['arrays'].items():
+        block = shared_memory.SharedMemory(name=blockName)
+        attachedBlocks.append(block)
+        array = np.ndarray(shape, np.dtype(dtype), buffer=block.buf)
+        array.flags.writeable = False
+        setattr(model, name, array)
+    if model.distances is None:
+        model.use_distance_oracle()
+    model.build_nodes(np.array(spec['ids'], dtype=np.int64))
+    return model
@@ -1,10 +1,16 @@
-import random, copy
+import random, copy, math
+import time
+import numpy as np
 
 import AdaptiveTuning as tune
+import Instrumentation as stats
 
 from Model import *
+from CandidateList import RestrictedCandidateList
+from SpatialIndex import SpatialGrid
+from TimeBudget import Deadline
 from Utils import *
-from Testing import *
+from Testing import TestSolution
 from Optimization import *
 
 
@@ -15,23 +21,42 @@ class Solution:
 
     Attributes:
         - profit: Profit number
+        - duration: Total time spent in all routes
         - routes: List containing vehicle routes
     """
+    __slots__ = ('profit', 'duration', 'routes')
+
     def __init__(self):
         self.profit = 0.0
         self.duration = 0.0
         self.routes = []
 
+    def __copy__(self):
+        if stats.enabled:
+            stats.Count('solution.copies')
+        clone = Solution.__new__(Solution)
+        clone.profit = self.profit
+        clone.duration = self.duration
+        clone.routes = self.routes
+        return clone
+
+    def __deepcopy__(self, memo):
+        """Copies the solution together with its routes, so changing the copy leaves this one intact"""
+        clone = copy.copy(self)
+        clone.routes = [copy.deepcopy(rt, memo) for rt in self.routes]
+        return clone
+
 class CustomerInsertion(object):
     """Represents a node insertion in a route
 
     To be used for customer nodes
 
     Attributes:
-        - customer: Customer `Node` for insertion
+        - customer: Customer id for insertion
         - route: `Route` for customer to be inserted
         - profit: Profit gained from insertion 
     """
+    __slots__ = ('customer', 'route', 'profit')
 
     def __init__(self):
         self.customer = None
@@ -46,11 +71,13 @@ class CustomerInsertionAllPositions(object):
     To be used for customer nodes
 
     Attributes:
-        - customer: Customer `Node` for insertion
+        - customer: Customer id for insertion
         - route: `Route` for customer to be inserted
         - insertionPosition: Position number for insertion
         - profit: Profit gained from insertion 
     """
+    __slots__ = ('customer', 'route', 'insertionPosition', 'profit')
+
     def __init__(self):
         self.customer = None
         self.route = None
@@ -67,20 +94,17 @@ class SavingsObject():
             - j: end node
             - distanceSaved: the total distance saved by the merge
         """
+    __slots__ = ('i', 'j', 'distanceSaved')
 
-    def __init__(self):
-        self.i = None
-        self.j = None
-        self.distanceSaved = 0
-
-    def __init__(self, i, j, distanceSaved):
+    def __init__(self, i=None, j=None, distanceSaved=0):
         self.i = i
         self.j = j
         self.distanceSaved = distanceSaved
 
 class RandomCandidate:
+    __slots__ = ('customer', 'trialProfit', 'route', 'insertionPosition')
 
-    def __init__(self, customer: Node, trialProfit: float, \
+    def __init__(self, customer: int, trialProfit: float, \
             route: Route, insertionPosition: int):
 
         self.customer = customer
@@ -88,117 +112,582 @@ class RandomCandidate:
         self.route = route
         self.insertionPosition = insertionPosition
 
+class InsertionTable:
+    """Persistent insertion cost table for `MinimumInsertions`
+
+    Holds the GRASP score of every feasible (customer, route, position)
+    insertion. Applying an insertion changes a single route, so only that
+    route's entries are recomputed and the inserted customer's entries dropped.
+
+    Attributes:
+        - distanceMatrix: Matrix of all node distances
+        - durationMatrix: Matrix of travel plus destination service time
+        - demands: Node demands indexed by node id
+        - serviceTimes: Node service times indexed by node id
+        - profits: Node profits indexed by node id
+        - routes: List of routes being filled
+        - entries: Dict mapping each pool customer id, in id order, to one list
+          per route of (trialProfit, insertionPosition) tuples
+    """
+
+    def __init__(self, model: Model, pool, routes: list[Route]):
+        self.distanceMatrix = model.distances
+        self.durationMatrix = model.durations
+        # Python lists index faster than arrays in scalar loops
+        self.demands = model.demands.tolist()
+        self.serviceTimes = model.serviceTimes.tolist()
+        self.profits = model.profits.tolist()
+        self.routes = routes
+        self.entries = {}
+        for cust in sorted(pool):
+            self.entries[cust] = [self.Evaluate(cust, rt) for rt in routes]
+
+    def Evaluate(self, cust: int, route: Route) -> list:
+        """Scores every feasible position of a customer in a route
+
+        Args:
+            cust `int`: Id of customer to be inserted
+            route `Route`: Route to insert into
+
+        Returns:
+            list: (trialProfit, insertionPosition) tuples in position order
+        """
+        scored = []
+        # Check capacity constraint & PART of time constraint
+        if route.load + self.demands[cust] > route.capacity or \
+                self.serviceTimes[cust] + route.travelled > route.duration:
+            return scored
+        Dp = math.pow(self.profits[cust], tune.minInsNumerator)
+        for pos in range(len(route.sequenceOfNodes) - 1):
+            A = route.sequenceOfNodes[pos]
+            B = route.sequenceOfNodes[pos + 1]
+
+            costAdded = self.durationMatrix[A, cust] + self.distanceMatrix[cust, B]
+            costRemoved = self.distanceMatrix[A, B]
+            Dc = costAdded - costRemoved
+
+            # Check time constraint fully
+            if route.travelled + Dc > route.duration:
+                continue
+
+            scored.append((Dp / math.pow(Dc, tune.minInsDenominator), pos + 1))
+        return scored
+
+    def AddRoute(self, route: Route):
+        """Scores the pool against a newly opened route"""
+        for cust, perRoute in self.entries.items():
+            perRoute.append(self.Evaluate(cust, route))
+
+    def Insert(self, cust: int, routeIndex: int):
+        """Drops an inserted customer and rescores the route it went into"""
+        del self.entries[cust]
+        route = self.routes[routeIndex]
+        for c, perRoute in self.entries.items():
+            perRoute[routeIndex] = self.Evaluate(c, route)
+
+    def CandidateCount(self) -> int:
+        """Counts the feasible insertions in the table"""
+        return sum(len(scored) for perRoute in self.entries.values() for scored in perRoute)
+
+    def FillCandidateList(self, rcl: RestrictedCandidateList):
+        """Offers every table entry to the RCL in (customer, route, position) order"""
+        for cust, perRoute in self.entries.items():
+            for route, scored in zip(self.routes, perRoute):
+                for trialProfit, pos in scored:
+                    if trialProfit > rcl.threshold:
+                        rcl.Push(trialProfit, (cust, trialProfit, route, pos))
+
+
+class BatchInsertionTable:
+    """Array-backed variant of `InsertionTable`
+
+    Keeps one score matrix per route, with a row per pool customer and a column
+    per arc, and rescores a route with array operations in a single pass.
+    Infeasible insertions and inserted customers hold -inf.
+
+    Offers the RCL exactly the candidates, in exactly the order, of
+    `InsertionTable`, so both select the same insertion for the same seed.
+    The powers go through `math.pow`, since NumPy's vectorized power may
+    differ from it in the last bit and flip near ties.
+
+    Attributes:
+        - distanceMatrix: Matrix of all node distances
+        - durationMatrix: Matrix of travel plus destination service time
+        - routes: List of routes being filled
+        - customers: Pool customer ids in id order, one per matrix row
+        - scores: List of per-route score matrices
+    """
+
+    def __init__(self, model: Model, pool, routes: list[Route]):
+        self.distanceMatrix = model.distances
+        self.durationMatrix = model.durations
+        self.routes = routes
+        self.customers = sorted(pool)
+        self.rows = {cust: row for row, cust in enumerate(self.customers)}
+        self.ids = np.array(self.customers, dtype=np.intp)
+        self.demands = model.demands[self.ids]
+        self.serviceTimes = model.serviceTimes[self.ids]
+        self.profitPowers = np.array([math.pow(p, tune.minInsNumerator) for p in model.profits[self.ids].tolist()])
+        self.alive = np.ones(len(self.customers), dtype=bool)
+        self.scores = [self.Evaluate(rt) for rt in routes]
+
+    def Evaluate(self, route: Route) -> np.ndarray:
+        """Scores every pool customer against every arc of a route
+
+        Args:
+            route `Route`: Route to insert into
+
+        Returns:
+            np.ndarray: Customers x arcs matrix of scores, -inf where infeasible
+        """
+        seq = np.array(route.sequenceOfNodes, dtype=np.intp)
+        A, B = seq[:-1], seq[1:]
+        cust = self.ids[:, None]
+        Dc = self.durationMatrix[A, cust] + self.distanceMatrix[cust, B] - self.distanceMatrix[A, B]
+
+        # Capacity constraint, PART of time constraint and time constraint fully
+        feasible = (route.load + self.demands <= route.capacity) & \
+            (self.serviceTimes + route.travelled <= route.duration) & self.alive
+        feasible = feasible[:, None] & (route.travelled + Dc <= route.duration)
+
+        scores = np.full(Dc.shape, -np.inf)
+        rows, cols = np.nonzero(feasible)
+        den = tune.minInsDenominator
+        powers = np.fromiter(map(lambda dc: math.pow(dc, den), Dc[rows, cols].tolist()),
+                             dtype=np.float64, count=len(rows))
+        scores[rows, cols] = self.profitPowers[rows] / powers
+        return scores
+
+    def AddRoute(self, route: Route):
+        """Scores the pool against a newly opened route"""
+        self.scores.append(self.Evaluate(route))
+
+    def Insert(self, cust: int, routeIndex: int):
+        """Drops an inserted customer and rescores the route it went into"""
+        row = self.rows[cust]
+        self.alive[row] = False
+        for scores in self.scores:
+            scores[row] = -np.inf
+        self.scores[routeIndex] = self.Evaluate(self.routes[routeIndex])
+
+    def CandidateCount(self) -> int:
+        """Counts the feasible insertions in the table"""
+        return sum(int(np.count_nonzero(s > -np.inf)) for s in self.scores)
+
+    def FillCandidateList(self, rcl: RestrictedCandidateList):
+        """Replays the sequential RCL updates of `InsertionTable` on arrays
+
+        Candidates below the current threshold are skipped with a vectorized
+        scan, so Python only touches the ones that enter the list.
+        """
+        table = np.hstack(self.scores)
+        routeOf = np.concatenate([np.full(s.shape[1], r) for r, s in enumerate(self.scores)])
+        positionOf = np.concatenate([np.arange(1, s.shape[1] + 1) for s in self.scores])
+        flat = np.flatnonzero(table > -np.inf)
+        scores = table.ravel()[flat]
+
+        def Push(i):
+            row, col = divmod(int(flat[i]), table.shape[1])
+            trialProfit = float(scores[i])
+            rcl.Push(trialProfit, (self.customers[row], trialProfit,
+                                   self.routes[routeOf[col]], int(positionOf[col])))
+
+        start = min(rcl.capacity - len(rcl), len(scores))
+        for i in range(start):
+            Push(i)
+        while start < len(scores):
+            threshold = rcl.threshold
+            hits = start + np.flatnonzero(scores[start:] > threshold)
+            start = len(scores)
+            for i in hits.tolist():
+                if scores[i] > rcl.threshold:
+                    Push(i)
+                # A lowered threshold admits candidates the scan above skipped
+                if rcl.threshold < threshold:
+                    start = i + 1
+                    break
+
+
+class BoundedInsertionTable(InsertionTable):
+    """Lazily scored variant of `InsertionTable` visiting customers in bound order
+
+    Keeps, per route, an upper bound on the best score of every pool customer
+    and scores a (customer, route) pair only when its bound can beat the RCL
+    threshold. If A and B are distinct nodes of a route and d1 <= d2 are the
+    distances from customer c to its two nearest nodes of that route, then
+    d(A, c) + d(c, B) >= d1 + d2 and d(A, B) is at most the longest arc L, so
+    inserting c costs at least st(c) + max(0, d1 + d2 - L). Bounds are
+    computed with array operations whenever a route changes, and pairs whose
+    bound already breaks the duration limit are never scored.
+
+    `FillCandidateList` offers customers by decreasing bound and stops at the
+    first one whose bound cannot enter the RCL, since no later one can either.
+    Visiting in bound order may keep a different one of several candidates
+    within `tune.precision` of each other than `InsertionTable`, so this table
+    is opt-in through `tune.boundedInsertions`.
+
+    Attributes:
+        - customers: Pool customer ids in id order, one per bound entry
+        - ids: `np.ndarray` of `customers`
+        - alive: Mask of the pool customers not inserted yet
+        - bounds: List of per-route arrays of score upper bounds, -inf where infeasible
+        - scored: List of per-route dicts caching exact scores by bound entry
+        - evaluated: Pairs scored exactly by the last `FillCandidateList`
+    """
+
+    def __init__(self, model: Model, pool, routes: list[Route]):
+        self.distanceMatrix = model.distances
+        self.durationMatrix = model.durations
+        self.demands = model.demands.tolist()
+        self.serviceTimes = model.serviceTimes.tolist()
+        self.profits = model.profits.tolist()
+        self.routes = routes
+        self.customers = sorted(pool)
+        self.ids = np.array(self.customers, dtype=np.intp)
+        self.customerDemands = model.demands[self.ids]
+        self.customerServiceTimes = model.serviceTimes[self.ids].astype(np.float64)
+        self.profitPowers = np.array([math.pow(p, tune.minInsNumerator) for p in model.profits[self.ids].tolist()])
+        self.alive = np.ones(len(self.customers), dtype=bool)
+        self.bounds = [self.Bounds(rt) for rt in routes]
+        self.scored = [{} for _ in routes]
+        self.evaluated = 0
+
+    def Bounds(self, route: Route) -> np.ndarray:
+        """Returns upper bounds on the best score of every pool customer in a route"""
+        seq = np.array(route.sequenceOfNodes, dtype=np.intp)
+        # The closing depot repeats the first node
+        nodes = seq[:-1]
+        distances = self.distanceMatrix[self.ids[:, None], nodes[None, :]]
+        if len(nodes) > 1:
+            nearest = np.partition(distances, 1, axis=1)
+            detour = nearest[:, 0] + nearest[:, 1] - self.distanceMatrix[seq[:-1], seq[1:]].max()
+        else:
+            detour = 2 * distances[:, 0]
+        lower = self.customerServiceTimes + np.maximum(detour, 0.0)
+        feasible = self.alive & (route.load + self.customerDemands <= route.capacity) & \
+            (route.travelled + lower <= route.duration)
+        with np.errstate(divide='ignore'):
+            # Widened so rounding never puts a bound below the exact score
+            bounds = self.profitPowers / np.power(lower, tune.minInsDenominator) * (1 + 1e-9)
+        bounds[~feasible] = -np.inf
+        return bounds
+
+    def AddRoute(self, route: Route):
+        """Bounds the pool against a newly opened route"""
+        self.bounds.append(self.Bounds(route))
+        self.scored.append({})
+
+    def Insert(self, cust: int, routeIndex: int):
+        """Drops an inserted customer and rebounds the route it went into"""
+        row = int(np.searchsorted(self.ids, cust))
+        self.alive[row] = False
+        for bounds in self.bounds:
+            bounds[row] = -np.inf
+        self.bounds[routeIndex] = self.Bounds(self.routes[routeIndex])
+        self.scored[routeIndex] = {}
+
+    def CandidateCount(self) -> int:
+        """Counts the pairs scored exactly by the last fill"""
+        return self.evaluated
+
+    def FillCandidateList(self, rcl: RestrictedCandidateList):
+        """Offers customers to the RCL by decreasing bound until none can enter it"""
+        self.evaluated = 0
+        best = np.max(self.bounds, axis=0)
+        order = np.argsort(-best, kind='stable')
+        bestList = best[order].tolist()
+        for row, bound in zip(order.tolist(), bestList):
+            if bound <= rcl.threshold:
+                break
+            cust = self.customers[row]
+            for route, bounds, scored in zip(self.routes, self.bounds, self.scored):
+                if bounds[row] <= rcl.threshold:
+                    continue
+                entries = scored.get(row)
+                if entries is None:
+                    entries = scored[row] = self.Evaluate(cust, route)
+                    self.evaluated += 1
+                for trialProfit, pos in entries:
+                    if trialProfit > rcl.threshold:
+                        rcl.Push(trialProfit, (cust, trialProfit, route, pos))
+
+
 class Solver:
     """Class to solve built problem model
 
     Attributes:
+        - model: Built problem `Model`
         - allNodes: List of all model nodes
-        - customers: List of all nodes representing customers
-        - depot: Depot node
-        - distanceMatrix: List representing a matrix of all node distances
+        - customers: List of all customer ids
+        - depot: Depot node id
+        - distanceMatrix: Matrix of all node distances
+        - durationMatrix: Matrix of travel plus destination service time
         - capacity: Max capacity of vehicles
         - duration: Max available time for customer service
         - vehicles: Available vehicles
+        - demands: Node demands indexed by node id
+        - profits: Node profits indexed by node id
+        - minServiceTime: Smallest customer service time
         - sol: current `Solution`
         - overallBestSol: Overall best `Solution`
         - rcl_size: Number of elements to be used in restricted candidate list
+        - batchScoring: Score insertion candidates with array operations
+        - deadline: `Deadline` of the running solve, no time limit by default
+        - onIncumbent: Callable receiving every improved overall best `Solution`, None for no reports
+        - reportedProfit: Profit of the last solution handed to `onIncumbent`
     """
 
-    def __init__(self, m):
+    def __init__(self, m, batchScoring=False):
+        self.model: Model = m
         self.allNodes: list[Node] = m.allNodes
-        self.customers: list[Node] = m.customers
-        self.depot: Node = m.allNodes[0]
+        self.customers: list[int] = [c.id for c in m.customers]
+        self.depot: int = 0
         self.distanceMatrix = m.distances
+        self.durationMatrix = m.durations
         self.capacity = int(m.max_capacity)
         self.duration = int(m.max_duration)
         self.vehicles = int(m.vehicles)
+        # Python lists index faster than arrays in scalar loops
+        self.demands = m.demands.tolist()
+        self.profits = m.profits.tolist()
+        self.minServiceTime = int(m.serviceTimes[1:].min()) if len(m.serviceTimes) > 1 else 0
         self.constraints = {"capacity": self.capacity, "duration": self.duration, "vehicles": self.vehicles}
         self.sol: Solution = None
         self.overallBestSol: Solution = None
         self.rcl_size = tune.rclSize
+        self.batchScoring = batchScoring
+        self.deadline = Deadline()
+        self.onIncumbent = None
+        self.reportedProfit = None
+
+    @stats.Timed('solve')
+    def solve(self, seeds=range(10, 60, 10), deadline: Deadline = None, workers: int = None, onIncumbent=None):
+        """Runs multi-start construction followed by VNS
+
+        VNS also inserts and exchanges unrouted customers, so each start needs
+        a single construction pass. Every seed is an independent start, see
+        `IndependentStart`, and the best one is kept by `KeepBest`, so the
+        sequential and the parallel solve of the same seeds end on the same
+        solution when there is no time limit.
+
+        Once the deadline expires, the starts left are skipped and the running
+        construction and VNS return what they have, so the best solution so
+        far is returned. At least one start is always made.
+
+        Args:
+            seeds (`Iterable[int]`, optional): Seeds of the starts to run. Defaults to 10, 20, ..., 50.
+            deadline (`Deadline`, optional): Time budget of the solve. Defaults to no time limit.
+            workers (`int`, optional): Processes running the starts, see `SolveParallel`.
+                Defaults to None, solving in this process.
+            onIncumbent (optional): Callable taking the overall best `Solution`, called after
+                every start that raises the best profit. Defaults to None.
 
-    def solve(self):
-        for seed in range(10, 60, 10):
-            sol = self.MinimumInsertions(itr=seed, foundSolution=None)
-            if self.overallBestSol == None or self.overallBestSol.profit < sol.profit:
-                self.overallBestSol = copy.copy(sol)
-            self.overallBestSol.duration = CalculateTotalDuration(self.distanceMatrix, self.overallBestSol)
-            print("profit before vns")
-            print(self.overallBestSol.profit)
-            self.overallBestSol = VNS(self.overallBestSol, 2, self.distanceMatrix)
-            self.overallBestSol.duration = CalculateTotalDuration(self.distanceMatrix, self.overallBestSol)
-            for seed in range(10, 60, 10):
-                sol = self.MinimumInsertions(itr=seed, foundSolution=self.overallBestSol)
-                if self.overallBestSol == None or self.overallBestSol.profit < sol.profit:
-                    self.overallBestSol = copy.copy(sol)
-            print("profit after vns")
+        Returns:
+            Solution: Best solution found
+        """
+        if deadline is not None:
+            self.deadline = deadline
+        if onIncumbent is not None:
+            self.onIncumbent = onIncumbent
+        seeds = list(seeds)
+        if workers is not None and workers > 1 and len(seeds) > 1:
+            return self.SolveParallel(seeds, workers)
+        for seed in seeds:
+            if self.overallBestSol is not None and self.deadline.Expired():
+                break
+            # The first start always finishes its construction, so there is a solution to return
+            self.KeepBest(*self.IndependentStart(seed, complete=self.overallBestSol is None))
+        return self.overallBestSol
+
+    def SolveParallel(self, seeds: list, workers: int) -> Solution:
+        """Runs the starts of `solve` in a process pool
+
+        The model arrays are copied once into shared memory and every worker
+        maps them, so tasks only carry a seed. Each worker runs the
+        `IndependentStart` of its seed and the results are reduced in seed
+        order by `KeepBest`, as the sequential loop does. Without a time limit
+        the result therefore equals the sequential solve of the same seeds,
+        whatever the number of workers or their timing.
+
+        Args:
+            seeds `list`: Seeds of the starts to run
+            workers `int`: Number of worker processes
+
+        Returns:
+            Solution: Best solution found
+        """
+        # Imported here, so single process solves never load them
+        import multiprocessing
+        from SharedModel import SharedModelOwner
+
+        # Wall clock end time, since queued starts begin after the pool does
+        end = None if self.deadline.end is None else time.time() + self.deadline.Remaining()
+        with SharedModelOwner(self.model) as shared, \
+                multiprocessing.Pool(min(workers, len(seeds)), InitStartWorker,
+                                     (shared.spec, tune.GetSettings(), self.batchScoring)) as pool:
+            # Results arrive in seed order, like the starts of the sequential loop
+            tasks = [(seed, end, index == 0) for index, seed in enumerate(seeds)]
+            for constructedProfit, sol in pool.imap(RunStartTask, tasks):
+                self.KeepBest(constructedProfit, sol)
         return self.overallBestSol
 
+    def KeepBest(self, constructedProfit, sol: Solution):
+        """Keeps a finished start if it beats the overall best solution
+
+        The highest profit wins, then the shorter duration. Starts are offered
+        in seed order and only strictly better ones are kept, so ties go to
+        the earlier seed.
+
+        Args:
+            constructedProfit: Profit of the start's construction, before VNS
+            sol `Solution`: Solution of the start after VNS
+        """
+        print("profit before vns")
+        print(constructedProfit)
+        if self.overallBestSol is None or sol.profit > self.overallBestSol.profit or \
+                (sol.profit == self.overallBestSol.profit and sol.duration < self.overallBestSol.duration):
+            self.overallBestSol = sol
+        print("profit after vns")
+        print(self.overallBestSol.profit)
+        self.ReportIncumbent()
+
+    def ReportIncumbent(self):
+        """Hands the overall best solution to `onIncumbent` if its profit improved"""
+        if self.onIncumbent is not None and \
+                (self.reportedProfit is None or self.overallBestSol.profit > self.reportedProfit):
+            self.reportedProfit = self.overallBestSol.profit
+            self.onIncumbent(self.overallBestSol)
+
+    def IndependentStart(self, seed: int, complete: bool = False):
+        """Runs one start of `solve`, construction followed by VNS for one seed
+
+        Starts do not build on each other, so they can run in any process.
+
+        Args:
+            seed `int`: Seed of the construction
+            complete (`bool`, optional): Finish the construction whatever the deadline,
+                see `MinimumInsertions`. Defaults to False.
+
+        Returns:
+            tuple: Profit of the constructed solution and the improved `Solution`
+        """
+        sol = self.MinimumInsertions(itr=seed, foundSolution=None, complete=complete)
+        constructedProfit = sol.profit
+        sol.duration = CalculateTotalDuration(self.durationMatrix, sol)
+        # Operators 3 and 4 turn the slack freed by 0 - 2 into profit
+        sol = VNS(sol, 4, self.model, self.deadline)
+        sol.duration = CalculateTotalDuration(self.durationMatrix, sol)
+        return constructedProfit, sol
+
+    @stats.Timed('construction.nearestNeighbor')
     def NearestNeighbor(self, itr=30) -> Solution:
         solution = Solution()
         solution.routes.append(Route(self.depot, self.capacity, self.duration))
         pool = set(self.customers)
+        grid = SpatialGrid(self.model.coordinates, self.customers)
+        pruned = set()
 
         vehiclesUsed = 1
-        while vehiclesUsed <= 6:
+        while vehiclesUsed <= self.vehicles:
             rt = solution.routes[-1]
 
-            insertCust = self.FindBestNN(pool, rt, itr)
-            if insertCust:
+            insertCust = self.FindBestNN(pool, rt, itr, grid, pruned)
+            if insertCust is not None:
                 # before the second occurence of depot
                 insIndex = len(rt.sequenceOfNodes) - 1
+                last = rt.sequenceOfNodes[insIndex - 1]
+                rt.travelled += self.durationMatrix[last, insertCust] + \
+                    self.distanceMatrix[insertCust, self.depot] - self.distanceMatrix[last, self.depot]
                 rt.sequenceOfNodes.insert(insIndex, insertCust)
-                rt.profit += insertCust.profit
-                rt.travelled = CalculateTravelledTime(self.distanceMatrix, rt)
-                rt.load += insertCust.demand
+                rt.profit += self.profits[insertCust]
+                rt.load += self.demands[insertCust]
                 pool.remove(insertCust)
+                grid.Remove(insertCust)
 
             else:
                 solution.profit += rt.profit
                 solution.duration += rt.travelled
                 vehiclesUsed += 1
-                if len(solution.routes) < 6:
+                if len(solution.routes) < self.vehicles:
                     solution.routes.append(Route(self.depot, self.capacity, self.duration))
+                pruned = set()
 
+        if tune.debugBookkeeping:
+            TestSolution(solution, self.model)
         return solution 
 
-    def FindBestNN(self, pool: list[Node], route: Route, itr) -> Node:
-        rng = random.Random(itr)
-        rcl: list[RandomCandidate] = []
-        for cust in pool:
-            if route.load + cust.demand <= route.capacity and \
-                AppendNodeDuration(self.distanceMatrix, route, cust) \
-                + route.travelled <= route.duration:
-
-                trialProfit = math.pow(cust.profit, tune.nnNumerator) / \
-                    math.pow(AppendNodeDuration(self.distanceMatrix, route, cust), tune.nnDenominator)
-                
-                candidate = RandomCandidate(cust, trialProfit, route, route.sequenceOfNodes[-1])
-
-                # Update rcl list
-                if len(rcl) <= self.rcl_size:
-                    rcl.append(candidate)
-                    rcl.sort(key=lambda x: x.trialProfit)
-                elif candidate.trialProfit > rcl[0].trialProfit - tune.precision:
-                    rcl.pop(0)
-                    rcl.append(candidate)
-                    rcl.sort(key=lambda x: x.trialProfit)
-        if len(rcl) == 0:
-            return  # No fit candidates left
+    def FindBestNN(self, pool: set[int], route: Route, itr, grid: SpatialGrid = None, pruned: set = None) -> int:
+        """Picks the customer to append to a route from an RCL of the best scored ones
 
-        # Choose a candidate randomly
-        candidateIndex = rng.randint(0, len(rcl) - 1)
-        return rcl[candidateIndex].customer
+        With a grid of the pool, only customers within the remaining duration
+        of the route are scored: appending costs d(last, c) + st(c) + d(c, depot),
+        so they lie on a detour between the last node and the depot no longer
+        than the time left minus the smallest service time. Candidates come in
+        ascending id order, the iteration order of the pool set, so the RCL
+        breaks ties exactly as a full scan of the pool does.
 
+        Args:
+            pool `set[int]`: Unrouted customers
+            route `Route`: Route to append to
+            itr: Seed to use in rng
+            grid (`SpatialGrid`, optional): Index of the pool. Defaults to None, scanning the pool.
+            pruned (`set`, optional): Customers that no longer fit the route, filled here. Load and
+                travelled time only grow along a route, so they never fit it again. Defaults to None.
 
-    def MinimumInsertions(self, itr=30, foundSolution: Solution = None) -> Solution:
+        Returns:
+            int: Chosen customer, None if no customer fits
+        """
+        rng = random.Random(itr)
+        # Holds one more candidate than rcl_size, as the original sorted list did
+        rcl = RestrictedCandidateList(self.rcl_size + 1, tune.precision)
+        if grid is None:
+            candidates = pool
+        else:
+            reach = route.duration - route.travelled - self.minServiceTime
+            # The slack keeps candidates the rounding of the cell bounds would drop
+            candidates = grid.WithinDetour(route.sequenceOfNodes[-2], self.depot, reach + 1e-6)
+        scored = 0
+        for cust in candidates:
+            if pruned is not None and cust in pruned:
+                continue
+            if route.load + self.demands[cust] > route.capacity:
+                if pruned is not None:
+                    pruned.add(cust)
+                continue
+            appendDuration = AppendNodeDuration(self.durationMatrix, route, cust)
+            if appendDuration + route.travelled > route.duration:
+                # Appending after any later last node costs at least st(c) + d(c, depot)
+                if pruned is not None and \
+                        self.durationMatrix[self.depot, cust] + route.travelled > route.duration + 1e-9:
+                    pruned.add(cust)
+                continue
+
+            scored += 1
+            trialProfit = math.pow(self.profits[cust], tune.nnNumerator) / \
+                math.pow(appendDuration, tune.nnDenominator)
+            if trialProfit > rcl.threshold:
+                rcl.Push(trialProfit, cust)
+        if stats.enabled:
+            # Visited candidates include the ones skipped as pruned or not fitting the route
+            stats.Count('construction.nnCandidatesVisited', len(candidates))
+            stats.Count('construction.nnCandidatesScored', scored)
+
+        # Choose a candidate randomly, None if no fit candidates left
+        return rcl.Sample(rng)
+
+
+    @stats.Timed('construction.minimumInsertions')
+    def MinimumInsertions(self, itr=30, foundSolution: Solution = None, complete: bool = False) -> Solution:
         """Implements insertions algorithm
 
         Can both build a solution from scratch, as well as improve a given solution.
+        Stops inserting once `deadline` expires and returns the partial solution,
+        unless `complete` is set.
 
         Args:
             itr (`int`, optional): Seed to use in rng. Defaults to 30.
             foundSolution (`Solution`, optional): Already found solution. Defaults to None.
+            complete (`bool`, optional): Finish the construction whatever the deadline. Defaults to False.
 
         Returns:
             Solution: Solution found with algorithm
@@ -215,23 +704,34 @@ class Solver:
         else:
             solution.routes.append(Route(self.depot, self.capacity, self.duration))
 
+        if tune.boundedInsertions:
+            tableType = BoundedInsertionTable
+        else:
+            tableType = BatchInsertionTable if self.batchScoring else InsertionTable
+        table = tableType(self.model, pool, solution.routes)
         termination = False
         while not termination:
+            if not complete and self.deadline.Expired():
+                break
 
-            candidate = self.FindBestInsertion(pool, solution.routes, itr)
+            candidate = self.FindBestInsertion(table, itr)
             if candidate:  # Found insertion
                 insertCust = candidate.customer
                 rt = candidate.route
                 pos = candidate.insertionPosition
                 # Apply insertion
+                A = rt.sequenceOfNodes[pos - 1]
+                B = rt.sequenceOfNodes[pos]
+                rt.travelled += self.durationMatrix[A, insertCust] + self.distanceMatrix[insertCust, B] - \
+                    self.distanceMatrix[A, B]
                 rt.sequenceOfNodes.insert(pos, insertCust)
-                rt.load += insertCust.demand
-                rt.travelled = CalculateTravelledTime(self.distanceMatrix, rt)
-                rt.profit += insertCust.profit
-                pool.remove(insertCust)
+                rt.load += self.demands[insertCust]
+                rt.profit += self.profits[insertCust]
+                table.Insert(insertCust, solution.routes.index(rt))
             else:  # No possible insertion
-                if len(solution.routes) < 6:
+                if len(solution.routes) < self.vehicles:
                     solution.routes.append(Route(self.depot, self.capacity, self.duration))
+                    table.AddRoute(solution.routes[-1])
                 else:
                     termination = True
 
@@ -239,47 +739,39 @@ class Solver:
             solution.duration += r.travelled
             solution.profit += r.profit
 
+        if tune.debugBookkeeping:
+            TestSolution(solution, self.model)
         return solution
 
-    def FindBestInsertion(self, pool: set[Node], routes: list[Route], itr) -> RandomCandidate:
+    def FindBestInsertion(self, table, itr) -> RandomCandidate:
         rng = random.Random(itr)
-        rcl: list[RandomCandidate] = []
-        for cust in pool:
-            for route in routes:
-
-                # Check capacity constraint & PART of time constraint
-                if route.load + cust.demand <= route.capacity and \
-                    cust.service_time + route.travelled <= route.duration:
-
-                    for pos in range(len(route.sequenceOfNodes) - 1):
-                        A: Node = route.sequenceOfNodes[pos]
-                        B: Node = route.sequenceOfNodes[pos + 1]
-
-                        
-                        costAdded = self.distanceMatrix[A.id][cust.id] + \
-                            self.distanceMatrix[cust.id][B.id] + cust.service_time
-                        costRemoved = self.distanceMatrix[A.id][B.id]
-                        Dc = costAdded - costRemoved
-
-                        # Check time constraint fully
-                        if route.travelled + Dc > route.duration:
-                            continue
-
-                        Dp = cust.profit
-                        trialProfit = math.pow(Dp, tune.minInsNumerator) / math.pow(Dc, tune.minInsDenominator)
-
-                        candidate = RandomCandidate(cust, trialProfit, route, pos + 1)
-                        # Update rcl list
-                        if len(rcl) <= self.rcl_size:
-                            rcl.append(candidate)
-                            rcl.sort(key=lambda x: x.trialProfit)
-                        elif candidate.trialProfit > rcl[0].trialProfit - tune.precision:
-                            rcl.pop(0)
-                            rcl.append(candidate)
-                            rcl.sort(key=lambda x: x.trialProfit)
+        # Holds one more candidate than rcl_size, as the original sorted list did
+        rcl = RestrictedCandidateList(self.rcl_size + 1, tune.precision)
+        table.FillCandidateList(rcl)
+        if stats.enabled:
+            stats.Count('construction.candidatesScored', table.CandidateCount())
         if len(rcl) == 0:
             return None  # No fit candidates left
 
         # Choose a candidate randomly
-        candidateIndex = rng.randint(0, len(rcl) - 1)
-        return rcl[candidateIndex]
\ No newline at end of file
+        return RandomCandidate(*rcl.Sample(rng))
+
+
+# Solver of a worker process, set up once per process by `InitStartWorker`
+workerSolver: Solver = None
+
+
+def InitStartWorker(spec: dict, settings: dict, batchScoring: bool):
+    """Pool initializer attaching the shared model and copying the tuning settings"""
+    from SharedModel import AttachModel
+
+    global workerSolver
+    tune.ApplySettings(settings)
+    workerSolver = Solver(AttachModel(spec), batchScoring)
+
+
+def RunStartTask(task):
+    """Pool task running `Solver.IndependentStart` for a (seed, wall clock end time, complete) task"""
+    seed, end, complete = task
+    workerSolver.deadline = Deadline(None if end is None else max(0.0, end - time.time()))
+    return workerSolver.IndependentStart(seed, complete)
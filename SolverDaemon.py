@@ -0,0 +1,499 @@
+"""Resident solver serving jobs over a local socket
+
+Clients talk newline delimited JSON. A job is one object holding the
+instance, either as the text of an instance file under "instance" or as a
+file path on the daemon's machine under "path", and optionally:
+    - "id": Any value, echoed back in every message of the job
+    - "timeLimit": Seconds, counted from when a worker starts the job
+    - "seeds": Seeds of the multi-start
+    - "tuning": Values of `AdaptiveTuning.SolverSettings` for this job only
+Every message sent back holds "job", the daemon's job number, "id" and a
+"status" of "queued", "running", "incumbent" for every improved best
+solution, then "done" or "error". Solution messages hold "profit",
+"duration", "routes" and "seconds", and "done" also tells where the model
+came from under "model": "memory", "disk" or "built". A job whose worker
+dies ends with an "error". {"command": "status"} reports the queue and
+{"command": "shutdown"} stops the daemon.
+
+Workers are started once and keep the models they used, keyed by the
+hash of the instance contents, and a job goes to a worker already holding
+its model when one is idle. Models are also written to an on-disk cache
+all workers share, so a known instance is memory-mapped instead of parsed
+and rebuilt even by a worker that has not seen it.
+
+Usage:
+    python SolverDaemon.py serve --port 8765 --workers 4
+    python SolverDaemon.py submit Instance.csv --port 8765 --time-limit 1
+"""
+import argparse
+import contextlib
+import io
+import json
+import multiprocessing
+import multiprocessing.connection
+import os
+import queue
+import socket
+import shutil
+import socketserver
+import tempfile
+import threading
+import time
+from collections import OrderedDict, deque
+
+import AdaptiveTuning as tune
+import ModelCache
+from Model import Model
+from Solver import Solver
+from TimeBudget import Deadline
+
+DefaultPort = 8765
+# Marks the end of a connection's requests in its outbox
+EndOfRequests = object()
+
+
+class ModelStore:
+    """LRU cache of built models, keyed by the hash of the instance contents
+
+    Misses go through the on-disk `ModelCache` in `cacheDir`, which all
+    workers share, so only the first worker to see an instance builds it.
+
+    Attributes:
+        - capacity: Max number of models kept
+        - memoryLimit: Matrix memory ceiling of new models, see `Model`
+        - cacheDir: Binary model cache directory, see `Model.build_model`
+        - models: Models by instance hash, least recently used first
+    """
+
+    def __init__(self, capacity: int = 8, memoryLimit: int = None, cacheDir: str = None):
+        self.capacity = capacity
+        self.memoryLimit = memoryLimit
+        self.cacheDir = cacheDir
+        self.models = OrderedDict()
+
+    def Get(self, job: dict):
+        """Returns the model of a job's instance, loading or building it on a miss
+
+        Returns:
+            tuple: The `Model` and where it came from, "memory", "disk" or "built"
+        """
+        key = job['key']
+        model = self.models.get(key)
+        if model is not None:
+            self.models.move_to_end(key)
+            return model, "memory"
+        model = Model(memoryLimit=self.memoryLimit)
+        if 'instance' in job:
+            mapped = model.build_model_from_text(job['instance'], self.cacheDir)
+        else:
+            mapped = model.build_model(job['path'], self.cacheDir)
+        self.models[key] = model
+        if len(self.models) > self.capacity:
+            self.models.popitem(last=False)
+        return model, "disk" if mapped else "built"
+
+
+def InstanceKey(request: dict) -> str:
+    """Returns the hash of a job's instance contents, the same for its text and its file"""
+    text = request.get('instance')
+    if text is not None:
+        return ModelCache.TextHash(text)
+    return ModelCache.InstanceHash(request['path'])
+
+
+def SolutionMessage(status: str, solution, start: float) -> dict:
+    """Describes a solution as a JSON serializable message"""
+    return {"status": status, "profit": int(solution.profit), "duration": float(solution.duration),
+            "routes": [list(rt.sequenceOfNodes) for rt in solution.routes],
+            "seconds": time.perf_counter() - start}
+
+
+def RunJob(job: dict, store: ModelStore, events):
+    """Solves one job, sending its messages as (job number, message) pairs to the events connection
+
+    Job tuning values only apply to the job, the worker settings are restored afterwards.
+    """
+    jobId = job['job']
+    events.send((jobId, {"status": "running"}))
+    settings = tune.GetSettings()
+    start = time.perf_counter()
+    try:
+        tuning = job.get('tuning') or {}
+        unknown = set(tuning).difference(tune.SolverSettings)
+        if unknown:
+            raise ValueError("Unknown tuning settings: %s" % ', '.join(sorted(unknown)))
+        tune.ApplySettings(dict(settings, **tuning))
+        model, source = store.Get(job)
+
+        def Incumbent(solution):
+            events.send((jobId, SolutionMessage("incumbent", solution, start)))
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            solution = Solver(model).solve(job.get('seeds') or range(10, 60, 10), Deadline(job.get('timeLimit')),
+                                           onIncumbent=Incumbent)
+        message = SolutionMessage("done", solution, start)
+        message["model"] = source
+        events.send((jobId, message))
+    except Exception as error:
+        events.send((jobId, {"status": "error", "error": "%s: %s" % (type(error).__name__, error)}))
+    finally:
+        tune.ApplySettings(settings)
+
+
+def WorkerLoop(inbox, events, settings: dict, modelCapacity: int, memoryLimit: int, cacheDir: str):
+    """Body of a worker process, solving the jobs of its inbox until it takes None"""
+    tune.ApplySettings(settings)
+    store = ModelStore(modelCapacity, memoryLimit, cacheDir)
+    for job in iter(inbox.get, None):
+        RunJob(job, store, events)
+
+
+class SolverDaemon:
+    """Job queue over a set of warm worker processes
+
+    Jobs wait here and are handed to idle workers one at a time, preferring
+    a worker that already holds the job's model. Every worker has its own
+    inbox and its own pipe back, so the daemon always knows which job a
+    worker runs, and a worker killed halfway through a message cannot leave
+    a lock held that the others need. A worker that dies fails its job and
+    is replaced.
+
+    Attributes:
+        - pending: Jobs waiting for a worker, in arrival order
+        - processes: Worker processes, by worker index
+        - inboxes: Job queue of every worker
+        - events: Receiving end of every worker's pipe of (job number, message) pairs
+        - idle: Indices of the workers without a job
+        - assigned: Job number of every busy worker
+        - workerModels: Instance hashes each worker holds, least recently used first,
+          mirroring its `ModelStore`
+        - outboxes: Outbox and client id of every unfinished job, by job number
+        - started: Job numbers reported running and not finished yet
+        - counts: Number of queued, running and finished jobs and replaced workers
+        - cacheDir: Model cache directory shared by the workers
+    """
+
+    def __init__(self, workers: int = None, modelCapacity: int = 8, memoryLimit: int = None, cacheDir: str = None):
+        self.modelCapacity = modelCapacity
+        self.memoryLimit = memoryLimit
+        # Without a cache directory the workers share a temporary one
+        self.ownedCacheDir = tempfile.mkdtemp(prefix='solver-daemon-') if cacheDir is None else None
+        self.cacheDir = cacheDir or self.ownedCacheDir
+        self.settings = tune.GetSettings()
+        self.pending = deque()
+        workers = workers or multiprocessing.cpu_count()
+        self.processes = [None] * workers
+        self.inboxes = [None] * workers
+        self.events = [None] * workers
+        self.idle = set(range(workers))
+        self.assigned = {}
+        self.workerModels = [OrderedDict() for _ in range(workers)]
+        self.outboxes = {}
+        self.started = set()
+        self.counts = {"queued": 0, "running": 0, "finished": 0, "replacedWorkers": 0}
+        self.nextJob = 0
+        self.closing = False
+        self.stopping = False
+        self.lock = threading.Lock()
+        self.changed = threading.Condition(self.lock)
+        self.dispatcher = threading.Thread(target=self.Dispatch, daemon=True)
+
+    def Start(self):
+        """Starts the workers and the event dispatcher"""
+        for worker in range(len(self.processes)):
+            self.StartWorker(worker)
+        self.dispatcher.start()
+
+    def StartWorker(self, worker: int):
+        """Starts the process of a worker index with a new inbox and pipe"""
+        self.inboxes[worker] = multiprocessing.Queue()
+        self.events[worker], sender = multiprocessing.Pipe(duplex=False)
+        self.workerModels[worker].clear()
+        self.processes[worker] = multiprocessing.Process(
+            target=WorkerLoop, daemon=True, args=(self.inboxes[worker], sender, self.settings, self.modelCapacity,
+                                                  self.memoryLimit, self.cacheDir))
+        self.processes[worker].start()
+        # The worker holds the only sending end left, so its death ends the pipe
+        sender.close()
+
+    def Submit(self, request: dict, outbox: queue.Queue) -> int:
+        """Queues a job, its messages go to the outbox
+
+        Returns:
+            int: Job number
+        """
+        if 'instance' not in request and 'path' not in request:
+            raise ValueError("A job needs an 'instance' or a 'path'")
+        key = InstanceKey(request)
+        with self.lock:
+            if self.closing:
+                raise ValueError("The daemon is shutting down")
+            jobId = self.nextJob
+            self.nextJob += 1
+            self.outboxes[jobId] = (outbox, request.get('id'))
+            self.counts["queued"] += 1
+            # Queued is reported before a worker can take the job, so it always comes first
+            outbox.put({"job": jobId, "id": request.get('id'), "status": "queued", "position": self.counts["queued"]})
+            self.pending.append(dict(request, job=jobId, key=key))
+            self.Assign()
+        return jobId
+
+    def Assign(self):
+        """Hands pending jobs to idle workers, preferring one holding the job's model, with the lock held"""
+        while self.pending and self.idle:
+            job = self.pending.popleft()
+            worker = min(self.idle, key=lambda i: (job['key'] not in self.workerModels[i], i))
+            self.idle.remove(worker)
+            self.assigned[worker] = job['job']
+            models = self.workerModels[worker]
+            models[job['key']] = True
+            models.move_to_end(job['key'])
+            if len(models) > self.modelCapacity:
+                models.popitem(last=False)
+            self.inboxes[worker].put(job)
+
+    def Deliver(self, jobId: int, message: dict):
+        """Updates the counts for a job message and puts it in the job's outbox, with the lock held"""
+        outbox, clientId = self.outboxes[jobId]
+        if message["status"] == "running":
+            self.started.add(jobId)
+            self.counts["queued"] -= 1
+            self.counts["running"] += 1
+        elif message["status"] in ("done", "error"):
+            if jobId not in self.started:
+                self.counts["queued"] -= 1
+                self.counts["running"] += 1
+            self.counts["running"] -= 1
+            self.counts["finished"] += 1
+            self.started.discard(jobId)
+            del self.outboxes[jobId]
+        message.update(job=jobId, id=clientId)
+        outbox.put(message)
+
+    def Dispatch(self):
+        """Routes worker messages to the outboxes of their jobs until the workers are stopped
+
+        Waits on the worker pipes and process sentinels together, so a worker
+        that dies is noticed at once. Its pipe is drained first, so a job it
+        finished before dying is not failed.
+        """
+        while True:
+            with self.lock:
+                if self.stopping and not any(process.is_alive() for process in self.processes):
+                    return
+                receivers = {connection: worker for worker, connection in enumerate(self.events)}
+                sentinels = {process.sentinel: worker for worker, process in enumerate(self.processes)}
+            ready = multiprocessing.connection.wait(list(receivers) + list(sentinels), timeout=1.0)
+            for item in ready:
+                if item in receivers:
+                    self.Receive(receivers[item])
+            for item in ready:
+                if item in sentinels:
+                    self.ReplaceWorker(sentinels[item])
+
+    def Receive(self, worker: int):
+        """Delivers the messages waiting in a worker's pipe"""
+        connection = self.events[worker]
+        while True:
+            try:
+                if not connection.poll():
+                    return
+                jobId, message = connection.recv()
+            except (EOFError, OSError):
+                return
+            with self.lock:
+                if self.assigned.get(worker) != jobId:
+                    continue
+                self.Deliver(jobId, message)
+                if message["status"] in ("done", "error"):
+                    del self.assigned[worker]
+                    self.idle.add(worker)
+                    self.Assign()
+                    self.changed.notify_all()
+
+    def ReplaceWorker(self, worker: int):
+        """Fails the job of a worker that exited and starts a new worker in its place"""
+        self.Receive(worker)
+        with self.lock:
+            if self.stopping:
+                return
+            process = self.processes[worker]
+            jobId = self.assigned.pop(worker, None)
+            if jobId is not None:
+                self.Deliver(jobId, {"status": "error", "error": "Worker exited with code %s" % process.exitcode})
+            self.events[worker].close()
+            self.counts["replacedWorkers"] += 1
+            self.idle.discard(worker)
+            self.StartWorker(worker)
+            self.idle.add(worker)
+            self.Assign()
+            self.changed.notify_all()
+
+    def Status(self) -> dict:
+        """Reports the workers and job counts"""
+        with self.lock:
+            return dict(self.counts, status="status", workers=len(self.processes), idle=len(self.idle))
+
+    def Close(self):
+        """Stops the workers once the queued jobs are finished, then the dispatcher"""
+        with self.lock:
+            self.closing = True
+            while self.pending or self.assigned:
+                self.changed.wait()
+            self.stopping = True
+        for inbox in self.inboxes:
+            inbox.put(None)
+        for process in self.processes:
+            process.join()
+        self.dispatcher.join()
+        if self.ownedCacheDir is not None:
+            shutil.rmtree(self.ownedCacheDir, ignore_errors=True)
+
+
+class DaemonRequestHandler(socketserver.StreamRequestHandler):
+    """Serves one client connection
+
+    Requests are read on a separate thread, so messages of running jobs stream
+    back while further jobs arrive. The connection closes once the client has
+    stopped sending and all its jobs are finished.
+    """
+
+    def handle(self):
+        outbox = queue.Queue()
+        reader = threading.Thread(target=self.ReadRequests, args=(outbox,), daemon=True)
+        reader.start()
+        pending = 0
+        requestsEnded = False
+        while not (requestsEnded and pending == 0):
+            message = outbox.get()
+            if message is EndOfRequests:
+                requestsEnded = True
+                continue
+            if message.get("status") == "queued":
+                pending += 1
+            elif message.get("status") in ("done", "error") and "job" in message:
+                pending -= 1
+            try:
+                self.wfile.write((json.dumps(message) + '\n').encode())
+                self.wfile.flush()
+            except OSError:
+                return
+
+    def ReadRequests(self, outbox: queue.Queue):
+        """Submits every job line of the connection, answering commands directly"""
+        solverDaemon: SolverDaemon = self.server.solverDaemon
+        try:
+            for line in self.rfile:
+                if not line.strip():
+                    continue
+                try:
+                    request = json.loads(line)
+                    command = request.get('command')
+                    if command == 'status':
+                        outbox.put(solverDaemon.Status())
+                    elif command == 'shutdown':
+                        outbox.put({"status": "shutting down"})
+                        threading.Thread(target=self.server.shutdown, daemon=True).start()
+                    elif command is not None:
+                        raise ValueError("Unknown command %r" % command)
+                    else:
+                        solverDaemon.Submit(request, outbox)
+                except (ValueError, AttributeError, OSError) as error:
+                    outbox.put({"status": "error", "error": "%s: %s" % (type(error).__name__, error)})
+        except (OSError, ValueError):
+            # The client went away, or the handler closed the stream after failing to write to it
+            pass
+        outbox.put(EndOfRequests)
+
+
+class TcpDaemonServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+def Serve(address, solverDaemon: SolverDaemon):
+    """Serves the daemon until a shutdown command arrives
+
+    Args:
+        address: Port number to listen on at 127.0.0.1, or a Unix socket path
+        solverDaemon `SolverDaemon`: Daemon to run jobs on
+    """
+    if isinstance(address, int):
+        server = TcpDaemonServer(('127.0.0.1', address), DaemonRequestHandler)
+    else:
+        server = socketserver.ThreadingUnixStreamServer(address, DaemonRequestHandler)
+        server.daemon_threads = True
+    server.solverDaemon = solverDaemon
+    solverDaemon.Start()
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+        if not isinstance(address, int):
+            os.unlink(address)
+        solverDaemon.Close()
+
+
+def Connect(address) -> socket.socket:
+    """Opens a connection to a daemon, see `Serve` for the address"""
+    if isinstance(address, int):
+        return socket.create_connection(('127.0.0.1', address))
+    connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    connection.connect(address)
+    return connection
+
+
+def Submit(address, job: dict):
+    """Sends one job to a daemon and yields its messages until it finishes
+
+    Args:
+        address: Port number or Unix socket path of the daemon
+        job `dict`: Job object, see the module docstring
+
+    Yields:
+        dict: Messages of the job, the last one with status "done" or "error"
+    """
+    with Connect(address) as connection, connection.makefile('rwb') as stream:
+        stream.write((json.dumps(job) + '\n').encode())
+        stream.flush()
+        connection.shutdown(socket.SHUT_WR)
+        for line in stream:
+            message = json.loads(line)
+            yield message
+            if message.get("status") in ("done", "error"):
+                return
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Resident solver serving jobs over a local socket")
+    commands = parser.add_subparsers(dest='command', required=True)
+    serve = commands.add_parser('serve', help="run the daemon")
+    submit = commands.add_parser('submit', help="send one instance to a running daemon")
+    for sub in (serve, submit):
+        sub.add_argument('--port', type=int, default=None, help="127.0.0.1 port, %d by default" % DefaultPort)
+        sub.add_argument('--socket', metavar='PATH', help="Unix socket path instead of a port")
+    serve.add_argument('--workers', type=int, default=None, help="worker processes, the CPU count by default")
+    serve.add_argument('--models', type=int, default=8, help="models each worker keeps")
+    serve.add_argument('--memory-limit', type=float, metavar='MB',
+                       help="compute distances on demand once the dense matrices would exceed MB")
+    serve.add_argument('--cache', metavar='DIR', help="model cache directory shared by the workers, a temporary one by default")
+    submit.add_argument('instance', help="instance file, its contents are sent")
+    submit.add_argument('--time-limit', type=float, default=None)
+    submit.add_argument('--seeds', type=int, nargs='+', default=None)
+    submit.add_argument('--tuning', type=json.loads, default=None, help="JSON object of tuning settings")
+    args = parser.parse_args()
+
+    address = args.socket or (args.port if args.port is not None else DefaultPort)
+    if args.command == 'serve':
+        memoryLimit = None if args.memory_limit is None else int(args.memory_limit * 2 ** 20)
+        Serve(address, SolverDaemon(args.workers, args.models, memoryLimit, args.cache))
+        return
+    with open(args.instance, newline='') as f:
+        job = {"id": args.instance, "instance": f.read(), "timeLimit": args.time_limit, "seeds": args.seeds,
+               "tuning": args.tuning}
+    for message in Submit(address, job):
+        print(json.dumps({key: value for key, value in message.items() if key != "routes"}))
+
+
+if __name__ == '__main__':
+    main()
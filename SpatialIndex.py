@@ -0,0 +1,94 @@
+import math
+
+import numpy as np
+
+
+class SpatialGrid:
+    """Uniform grid of node ids bucketed by their coordinates
+
+    Answers which nodes can lie on a detour between two points, i.e. the
+    nodes p with d(a, p) + d(p, b) within a reach. By the triangle inequality
+    such nodes lie inside an ellipse with foci a and b, so only the cells
+    meeting that ellipse are visited and the cost of a query follows the
+    local density instead of the number of nodes.
+
+    Attributes:
+        - x, y: Node coordinates as lists, indexed by node id
+        - cellSize: Side of a grid cell
+        - originX, originY: Lower left corner of the grid
+        - cells: Node ids of every non-empty cell, keyed by (column, row)
+    """
+
+    def __init__(self, coordinates: np.ndarray, ids, perCell: float = 4.0):
+        """
+        Args:
+            coordinates `np.ndarray`: n x 2 array of node coordinates, indexed by node id
+            ids `Iterable[int]`: Nodes to index
+            perCell (`float`, optional): Average nodes per cell the cell size is chosen for. Defaults to 4.
+        """
+        self.x = coordinates[:, 0].tolist()
+        self.y = coordinates[:, 1].tolist()
+        ids = list(ids)
+        xs = [self.x[i] for i in ids] or [0.0]
+        ys = [self.y[i] for i in ids] or [0.0]
+        self.originX, self.originY = min(xs), min(ys)
+        area = max(max(xs) - self.originX, 1e-9) * max(max(ys) - self.originY, 1e-9)
+        self.cellSize = math.sqrt(area * perCell / max(len(ids), 1))
+        self.cells = {}
+        for i in ids:
+            self.cells.setdefault(self.Cell(self.x[i], self.y[i]), []).append(i)
+
+    def Cell(self, x: float, y: float) -> tuple:
+        """Returns the (column, row) of the cell holding a point"""
+        return int((x - self.originX) // self.cellSize), int((y - self.originY) // self.cellSize)
+
+    def Remove(self, i: int):
+        """Drops a node from the grid"""
+        key = self.Cell(self.x[i], self.y[i])
+        bucket = self.cells[key]
+        bucket.remove(i)
+        if not bucket:
+            del self.cells[key]
+
+    def WithinDetour(self, a: int, b: int, reach: float) -> list:
+        """Returns the nodes that may satisfy d(a, p) + d(p, b) <= reach
+
+        Cells are kept when the distances from a and b to the cell add up to
+        at most `reach`, a lower bound for every node in it, so no node
+        satisfying the condition is missed. Callers check the exact condition.
+
+        Args:
+            a `int`: Id of the first focus node
+            b `int`: Id of the second focus node
+            reach `float`: Max detour length
+
+        Returns:
+            list: Candidate node ids in ascending order
+        """
+        ax, ay, bx, by = self.x[a], self.y[a], self.x[b], self.y[b]
+        if reach < 0 or math.sqrt((ax - bx) ** 2 + (ay - by) ** 2) > reach:
+            return []
+        # The ellipse lies within reach / 2 of the midpoint of its foci
+        half = reach / 2
+        mx, my = (ax + bx) / 2, (ay + by) / 2
+        size = self.cellSize
+        colLow, rowLow = self.Cell(mx - half, my - half)
+        colHigh, rowHigh = self.Cell(mx + half, my + half)
+        found = []
+        cells = self.cells
+        if (colHigh - colLow + 1) * (rowHigh - rowLow + 1) > len(cells):
+            keys = [key for key in cells if colLow <= key[0] <= colHigh and rowLow <= key[1] <= rowHigh]
+        else:
+            keys = [(col, row) for col in range(colLow, colHigh + 1) for row in range(rowLow, rowHigh + 1)
+                    if (col, row) in cells]
+        for col, row in keys:
+            x0 = self.originX + col * size
+            y0 = self.originY + row * size
+            dxa = max(x0 - ax, 0.0, ax - x0 - size)
+            dya = max(y0 - ay, 0.0, ay - y0 - size)
+            dxb = max(x0 - bx, 0.0, bx - x0 - size)
+            dyb = max(y0 - by, 0.0, by - y0 - size)
+            if math.sqrt(dxa * dxa + dya * dya) + math.sqrt(dxb * dxb + dyb * dyb) <= reach:
+                found.extend(cells[col, row])
+        found.sort()
+        return found
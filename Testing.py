@@ -1,28 +1,73 @@
-import matplotlib.pyplot as plt
+import numpy as np
 
 from Model import Route
 
-def TestSolution(solution):
+
+def Pyplot():
+    """Imports pyplot on first use, so solving without drawing never loads matplotlib"""
+    import matplotlib.pyplot as plt
+    return plt
+
+
+def DurationsAgree(recalculated: float, stored: float, eps: float, terms: int) -> bool:
+    """Compares durations within the rounding error of adding up `terms` matrix entries
+
+    The tolerance grows with the matrix precision `eps` and the magnitude,
+    so float32 rounding is not reported, and never drops below 1e-4.
+    """
+    return abs(recalculated - stored) <= max(0.0001, eps * max(abs(recalculated), abs(stored)) * terms)
+
+def TestSolution(solution, model) -> bool:
+    """Checks stored route and solution totals against a full recalculation
+
+    Durations are added up in float64 and compared with a tolerance scaled
+    to the matrix dtype, see `DurationsAgree`. Prints every mismatch found.
+
+    Args:
+        solution `Solution`: Solution to check
+        model `Model`: Built problem model
+
+    Returns:
+        bool: True, if all totals are consistent
+    """
+    consistent = True
+    eps = float(np.finfo(model.dtype).eps)
     totalSolProfit = 0
+    totalSolDuration = 0.0
+    totalTerms = 0
     for r in range(0, len(solution.routes)):
         rt: Route = solution.routes[r]
         rtProfit = 0
         rtLoad = 0
+        rtDuration = 0.0
         for n in range(0, len(rt.sequenceOfNodes) - 1):
             A = rt.sequenceOfNodes[n]
-            rtProfit += A.profit #change to profit
-            rtLoad += A.demand
-        if abs(rtProfit - rt.profit) < 0.0001: #change operator
+            rtProfit += model.profits[A]
+            rtLoad += model.demands[A]
+            rtDuration += float(model.durations[A, rt.sequenceOfNodes[n + 1]])
+        if abs(rtProfit - rt.profit) > 0.0001:
             print('Route Profit problem')
+            consistent = False
         if rtLoad != rt.load:
             print('Route Load problem')
+            consistent = False
+        if not DurationsAgree(rtDuration, rt.travelled, eps, len(rt.sequenceOfNodes)):
+            print('Route Cost Issue')
+            consistent = False
 
         totalSolProfit += rt.profit
+        totalSolDuration += rtDuration
+        totalTerms += len(rt.sequenceOfNodes)
 
-    if abs(totalSolProfit - solution.profit) < 0.0001: #change operator
+    if abs(totalSolProfit - solution.profit) > 0.0001:
         print('Solution Profit problem')
-    
-def ReportSolution(name, solution, allNodes):
+        consistent = False
+    if not DurationsAgree(totalSolDuration, solution.duration, eps, totalTerms):
+        print('Solution Cost Issue')
+        consistent = False
+    return consistent
+
+def ReportSolution(name, solution, allNodes, draw=True):
     print("Best solution")
     for i in range(0, len(solution.routes)):
         rt = solution.routes[i]
@@ -30,10 +75,11 @@ def ReportSolution(name, solution, allNodes):
         print("load: " + str(rt.load))
         print("duration: " + str(rt.travelled))
         for j in range(0, len(rt.sequenceOfNodes)):
-            print(rt.sequenceOfNodes[j].id, end=' ')
+            print(rt.sequenceOfNodes[j], end=' ')
         print("\nRoute profit:", rt.profit)
     print("========================")
-    SolDrawer.draw(name, solution, allNodes)
+    if draw:
+        SolDrawer.draw(name, solution, allNodes)
     print("Total profit:", solution.profit)
 
 def exportSolution(name, solution):
@@ -43,20 +89,22 @@ def exportSolution(name, solution):
         for i in range(len(solution.routes)):
             f.write("Route " + str(i + 1) + "\n")
             for node in solution.routes[i].sequenceOfNodes:
-                f.write(str(node.id) + " ")
+                f.write(str(node) + " ")
             if (i < len(solution.routes) - 1):
                 f.write("\n")
 
 class SolDrawer:
     @staticmethod
     def get_cmap(n):
-        return plt.cm.get_cmap(name=None, lut=n)
+        import matplotlib
+        return matplotlib.colormaps[matplotlib.rcParams['image.cmap']].resampled(max(n, 1))
 
     @staticmethod
     def draw(name, sol, nodes):
+        plt = Pyplot()
         plt.clf()
         SolDrawer.drawPoints(nodes)
-        SolDrawer.drawRoutes(sol)
+        SolDrawer.drawRoutes(sol, nodes)
         plt.savefig(str(name))
 
     @staticmethod
@@ -67,16 +115,17 @@ class SolDrawer:
             n = nodes[i]
             x.append(n.x)
             y.append(n.y)
-        plt.scatter(x, y, c="grey", marker='.')
+        Pyplot().scatter(x, y, c="grey", marker='.')
 
     @staticmethod
-    def drawRoutes(sol):
+    def drawRoutes(sol, nodes):
+        plt = Pyplot()
         cmap = SolDrawer.get_cmap(n=len(sol.routes))
         if sol is not None:
             for r in range(0, len(sol.routes)):
                 rt = sol.routes[r]
                 for i in range(0, len(rt.sequenceOfNodes) - 1):
-                    c0 = rt.sequenceOfNodes[i]
-                    c1 = rt.sequenceOfNodes[i + 1]
+                    c0 = nodes[rt.sequenceOfNodes[i]]
+                    c1 = nodes[rt.sequenceOfNodes[i + 1]]
                     plt.plot([c0.x, c1.x], [c0.y, c1.y], c=cmap(r))
 
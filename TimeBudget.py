@@ -0,0 +1,39 @@
+import math
+import time
+
+
+class Deadline:
+    """Wall-clock time budget checked cooperatively by the solver loops
+
+    Loops call `Expired` between steps and stop with the best solution they
+    have, so a run never overshoots the budget by more than one step.
+
+    Attributes:
+        - end: `time.perf_counter` value the budget runs out at, None for no limit
+    """
+
+    def __init__(self, seconds: float = None):
+        self.end = None if seconds is None else time.perf_counter() + seconds
+
+    def Expired(self) -> bool:
+        """Checks if the budget has run out"""
+        return self.end is not None and time.perf_counter() >= self.end
+
+    def Remaining(self) -> float:
+        """Returns the seconds left, inf for no limit"""
+        if self.end is None:
+            return math.inf
+        return max(0.0, self.end - time.perf_counter())
+
+    def Slice(self, fraction: float):
+        """Hands out part of the remaining time
+
+        Args:
+            fraction `float`: Share of the remaining time, between 0 and 1
+
+        Returns:
+            Deadline: Deadline ending after that share, without limit if this one has none
+        """
+        if self.end is None:
+            return Deadline()
+        return Deadline(self.Remaining() * fraction)
@@ -1,33 +1,33 @@
-from Model import Route, Node
+import numpy as np
 
-def AppendNodeDuration(distanceMatrix: list[int], rt: Route, targetNode: Node) -> float:
+from Model import Route
+
+def AppendNodeDuration(durationMatrix, rt: Route, targetNode: int) -> float:
     """Calculates duration of visiting new node
 
     Calculates vehicle's time spent when a new node is added.
     Combines both travelling time and service time of the new node.
 
     Args:
-        distanceMatrix `list[int]`: List representing a matrix of all node distances
+        durationMatrix `np.ndarray`: Matrix of travel plus destination service time
         rt `Route`: Specified route
-        targetNode `Node`: New node to be appended
+        targetNode `int`: Id of new node to be appended
 
     Returns:
         float: duration
     """
-    lastRouteNode = rt.sequenceOfNodes[-2].id
-    destinationNode = targetNode.id
-    originToTargetDistance = distanceMatrix[lastRouteNode][destinationNode]
-    targetToDepotDistance = distanceMatrix[destinationNode][0]
-    timeTravelled = originToTargetDistance + targetNode.service_time + targetToDepotDistance
+    lastRouteNode = rt.sequenceOfNodes[-2]
+    # Depot has no service time, so the return leg is plain travel time
+    timeTravelled = durationMatrix[lastRouteNode, targetNode] + durationMatrix[targetNode, 0]
     return timeTravelled
 
-def CalculateTravelledTime(distanceMatrix: list[int], rt: Route) -> float:
+def CalculateTravelledTime(durationMatrix, rt: Route) -> float:
     """Calculates total time spent in route
 
     Calculates total duration of route, by combining both travelling and service time.
 
     Args:
-        distanceMatrix `list[int]`: List representing a matrix of all node distances
+        durationMatrix `np.ndarray`: Matrix of travel plus destination service time
         rt `Route`: Specified route
 
     Returns:
@@ -35,61 +35,70 @@ def CalculateTravelledTime(distanceMatrix: list[int], rt: Route) -> float:
     """
     travelled = 0.0
     for i in range(0, len(rt.sequenceOfNodes) - 1):
-        A = rt.sequenceOfNodes[i].id
-        B = rt.sequenceOfNodes[i + 1].id
-        travelled += distanceMatrix[A][B]
-        travelled += rt.sequenceOfNodes[i + 1].service_time
+        A = rt.sequenceOfNodes[i]
+        B = rt.sequenceOfNodes[i + 1]
+        travelled += durationMatrix[A, B]
     return travelled
 
-def CustomersNotRouted(customers: list[Node]):
-    '''Given a Nodes list sets all isRouted attributes to False
-    Args:
-        customers `list[Node]`: Models customer list
-    '''
-    for c in customers:
-        c.isRouted = False
-    return customers
 def GetLastOpenRoute(solution) -> int:
     if len(solution.routes) == 0:
         return None
     else:
         return solution.routes[-1]
 
-def CalculateTotalDuration(distanceMatrix, solution) -> float:
+def CalculateTotalDuration(durationMatrix, solution) -> float:
     dur = 0.0
     for i in range(0, len(solution.routes)):
         rt = solution.routes[i]
-        dur += CalculateTravelledTime(distanceMatrix, rt)
+        dur += CalculateTravelledTime(durationMatrix, rt)
     return dur
 
-def UpdateRouteLoadDurAndProfit(distanceMatrix: list[int], rt: Route):
+def UpdateRouteLoadDurAndProfit(durationMatrix, demands, profits, rt: Route):
     """Calculates and updates route's cost and load
     Given a specific route, calculates total load, duration(travelled time) and profit
     Args:
-        distanceMatrix `list[int]`: List representing a matrix of all node distances
+        durationMatrix `np.ndarray`: Matrix of travel plus destination service time
+        demands: Node demands indexed by node id
+        profits: Node profits indexed by node id
         rt `Route`: Specified route
     """
-    totalDuration = rt.sequenceOfNodes[0].service_time
+    totalDuration = 0.0
     totalLoad = 0
     totalProfit = 0
     for i in range(0, len(rt.sequenceOfNodes) - 1):
         A = rt.sequenceOfNodes[i]
         B = rt.sequenceOfNodes[i + 1]
-        totalLoad += A.demand
-        totalDuration += distanceMatrix[A.id][B.id]
-        totalDuration += B.service_time
-        totalProfit += A.profit
+        totalLoad += demands[A]
+        totalDuration += durationMatrix[A, B]
+        totalProfit += profits[A]
     rt.load = totalLoad
     rt.travelled = totalDuration
     rt.profit = totalProfit
 
-def CapacityOrDurationIsViolated(distanceMatrix: list[int], rt1: Route, nodeInd1: int, rt2: Route, nodeInd2: int) -> bool:
+def UpdateRouteSegments(durationMatrix, demands, profits, rt: Route):
+    """Recalculates the prefix aggregates of a route
+
+    Args:
+        durationMatrix `np.ndarray`: Matrix of travel plus destination service time
+        demands `np.ndarray`: Node demands indexed by node id
+        profits `np.ndarray`: Node profits indexed by node id
+        rt `Route`: Specified route
+    """
+    seq = np.asarray(rt.sequenceOfNodes)
+    prefixDuration = np.zeros(len(seq))
+    np.cumsum(durationMatrix[seq[:-1], seq[1:]], out=prefixDuration[1:])
+    rt.prefixDuration = prefixDuration.tolist()
+    rt.prefixLoad = np.cumsum(demands[seq]).tolist()
+    rt.prefixProfit = np.cumsum(profits[seq]).tolist()
+
+def CapacityOrDurationIsViolated(durationMatrix, rt1: Route, nodeInd1: int, rt2: Route, nodeInd2: int) -> bool:
     """Checks if 2-opt move is going to violate Capacity or Duration restrictions
     
     Given two routes and two nodes check if applying 2-opt move is
-     going to violate Capacity or Duration restrictions on either root
+     going to violate Capacity or Duration restrictions on either root.
+     Reads the prefix aggregates of both routes, so the check takes constant time.
     Args:
-        distanceMatrix `list[int]`: List representing a matrix of all node distances
+        durationMatrix `np.ndarray`: Matrix of travel plus destination service time
         rt1 `Route`: Route 1
         nodeInd1 `int`: Node representing where the first route is going to split
         rt2 `Route`: Route 2
@@ -97,40 +106,35 @@ def CapacityOrDurationIsViolated(distanceMatrix: list[int], rt1: Route, nodeInd1
     Returns:
         boolean: True, if capacity restrictions or duration restrictions are violated
     """
-    rt1Duration = rt1.duration - distanceMatrix[rt1.sequenceOfNodes[nodeInd1].id][rt1.sequenceOfNodes[nodeInd1 + 1].id]
-    rt1FirstSegmentDuration = 0
-    rt1FirstSegmentLoad = 0
-    for i in range(0, nodeInd1):
-        A = rt1.sequenceOfNodes[i]
-        B = rt1.sequenceOfNodes[i + 1]
-        rt1FirstSegmentDuration += distanceMatrix[A.id][B.id]
-        rt1FirstSegmentDuration += B.service_time
-        rt1FirstSegmentLoad += B.demand
-
-    rt1SecondSegmentDuration = rt1Duration - rt1FirstSegmentDuration
+    A = rt1.sequenceOfNodes[nodeInd1]
+    B = rt1.sequenceOfNodes[nodeInd1 + 1]
+    K = rt2.sequenceOfNodes[nodeInd2]
+    L = rt2.sequenceOfNodes[nodeInd2 + 1]
+
+    rt1FirstSegmentLoad = rt1.prefixLoad[nodeInd1]
     rt1SecondSegmentLoad = rt1.load - rt1FirstSegmentLoad
-    rt2Duration = rt2.duration - distanceMatrix[rt2.sequenceOfNodes[nodeInd2].id][rt2.sequenceOfNodes[nodeInd2 + 1].id]
-    rt2FirstSegmentDuration = 0
-    rt2FirstSegmentLoad = 0
-    for i in range(0, nodeInd2):
-        K = rt2.sequenceOfNodes[i]
-        L = rt2.sequenceOfNodes[i + 1]
-        rt2FirstSegmentDuration += distanceMatrix[K.id][L.id]
-        rt2FirstSegmentDuration += L.service_time
-        rt2FirstSegmentLoad += L.demand
-
-    rt2SecondSegmentDuration = rt2Duration - rt2FirstSegmentDuration
+    rt2FirstSegmentLoad = rt2.prefixLoad[nodeInd2]
     rt2SecondSegmentLoad = rt2.load - rt2FirstSegmentLoad
+    if (rt1FirstSegmentLoad + rt2SecondSegmentLoad > rt1.capacity) or \
+            (rt2FirstSegmentLoad + rt1SecondSegmentLoad > rt2.capacity):
+        return True
 
-    if (rt1FirstSegmentLoad + rt2SecondSegmentLoad > rt1.capacity) or (rt1FirstSegmentDuration + rt2SecondSegmentDuration > rt1.duration):
+    # Second segments start after the service of their first node
+    rt1FirstSegmentDuration = rt1.prefixDuration[nodeInd1]
+    rt1SecondSegmentDuration = rt1.travelled - rt1.prefixDuration[nodeInd1 + 1]
+    rt2FirstSegmentDuration = rt2.prefixDuration[nodeInd2]
+    rt2SecondSegmentDuration = rt2.travelled - rt2.prefixDuration[nodeInd2 + 1]
+    if rt1FirstSegmentDuration + durationMatrix[A, L] + rt2SecondSegmentDuration > rt1.duration:
         return True
-    if (rt2FirstSegmentLoad + rt1SecondSegmentLoad > rt2.capacity) or (rt2FirstSegmentDuration + rt1SecondSegmentDuration > rt2.duration):
+    if rt2FirstSegmentDuration + durationMatrix[K, B] + rt1SecondSegmentDuration > rt2.duration:
         return True
+    return False
 
-def CalculateRouteProfit(route: Route) -> int:
+def CalculateRouteProfit(profits, route: Route) -> int:
     """Calculates total profit of route
 
     Args:
+        profits: Node profits indexed by node id
         route `Route`: Specified route
 
     Returns:
@@ -138,5 +142,5 @@ def CalculateRouteProfit(route: Route) -> int:
     """
     profit = 0
     for c in route.sequenceOfNodes:
-        profit += c.profit
+        profit += profits[c]
     return profit
@@ -1,40 +1,88 @@
-import csv
+import numpy as np
 
-with open("Instance.csv", newline='') as f:
-    reader = csv.reader(f)
-    csv_file = list(reader)
+# Rows of the instance header, the customer rows follow it
+HeaderRows = 11
+CustomerDtype = np.dtype([('id', np.int64), ('x', np.float64), ('y', np.float64),
+                          ('demand', np.int64), ('service_time', np.int64), ('profit', np.int64)])
 
 
-def get_vehicles():
-    """Return available vehicles"""
-    return csv_file[0][1]
+class InstanceData:
+    """Parsed instance file
 
+    Node arrays are indexed by node position, the depot first with zero
+    demand, service time and profit, then the customers in file order.
 
-def get_capacity():
-    """Return max vehicle capacity"""
-    return csv_file[1][1]
+    Attributes:
+        - vehicles: Available vehicles
+        - capacity: Max vehicle capacity
+        - duration: Max route duration
+        - ids: `np.ndarray` of node ids, 0 for the depot
+        - coordinates: n x 2 `np.ndarray` of node coordinates
+        - demands: `np.ndarray` of node demands
+        - serviceTimes: `np.ndarray` of node service times
+        - profits: `np.ndarray` of node profits
+    """
+    __slots__ = ('vehicles', 'capacity', 'duration', 'ids', 'coordinates', 'demands', 'serviceTimes', 'profits')
+
+    def __init__(self, vehicles, capacity, duration, ids, coordinates, demands, serviceTimes, profits):
+        self.vehicles = vehicles
+        self.capacity = capacity
+        self.duration = duration
+        self.ids = ids
+        self.coordinates = coordinates
+        self.demands = demands
+        self.serviceTimes = serviceTimes
+        self.profits = profits
+
+
+def LoadInstance(path: str) -> InstanceData:
+    """Reads an instance file, see `ReadInstance`
 
+    Args:
+        path `str`: Instance file path
 
-def get_duration():
-    """Return max service time"""
-    return csv_file[2][1]
+    Returns:
+        InstanceData: Header values and node arrays of the instance
+    """
+    with open(path, newline='') as f:
+        return ReadInstance(f, path)
 
 
-def get_depot_coords():
-    """Return depot coordinates as a tuple"""
-    return csv_file[5][1], csv_file[5][2]
+def ReadInstance(f, name: str = "instance") -> InstanceData:
+    """Reads an instance from a text stream
 
+    Both the comma separated layout of Instance.csv and the tab separated one
+    of Instance.txt are accepted, the delimiter is taken from the first line.
+    Only the header is split in Python, the customer rows are streamed by
+    `np.loadtxt` straight into typed arrays.
 
-def get_customer_data():
-    """Return customer attributes
+    Args:
+        f: Text stream positioned at the start of the instance, such as an
+            open file or an `io.StringIO` of a received payload
+        name (`str`, optional): Instance name used in error messages
 
     Returns:
-        A list containing dictionaries of customer attributes.
-        All keys correspond to Node Object fields. See Node in Model
+        InstanceData: Header values and node arrays of the instance
     """
-    cd = []
-    for i in range(11, len(csv_file)):
-        c = {'id': csv_file[i][0], 'x': csv_file[i][1], 'y': csv_file[i][2], 'demand': csv_file[i][3],
-             'service_time': csv_file[i][4], 'profit': csv_file[i][5]}
-        cd.append(c)
-    return cd
\ No newline at end of file
+    header = [f.readline() for _ in range(HeaderRows)]
+    delimiter = '\t' if '\t' in header[0] else ','
+    fields = [line.rstrip('\r\n').split(delimiter) for line in header]
+    vehicles = int(fields[0][1])
+    capacity = int(fields[1][1])
+    duration = int(fields[2][1])
+    depot = (float(fields[5][1]), float(fields[5][2]))
+    customers = int(fields[7][1])
+    rows = np.loadtxt(f, dtype=CustomerDtype, delimiter=delimiter, usecols=range(6),
+                      max_rows=customers, ndmin=1)
+    if len(rows) != customers:
+        raise ValueError("%s lists %d customers but has %d customer rows" % (name, customers, len(rows)))
+
+    def Column(field, depotValue=0):
+        column = np.empty(customers + 1, dtype=CustomerDtype[field])
+        column[0] = depotValue
+        column[1:] = rows[field]
+        return column
+
+    coordinates = np.column_stack((Column('x', depot[0]), Column('y', depot[1])))
+    return InstanceData(vehicles, capacity, duration, Column('id'), coordinates,
+                        Column('demand'), Column('service_time'), Column('profit'))
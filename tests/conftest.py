@@ -0,0 +1,46 @@
+import math
+import os
+import sys
+
+import pytest
+
+Root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, Root)
+
+from Model import Model
+
+InstancePath = os.path.join(Root, 'Instance.csv')
+
+
+def ChiSquare(counts: list) -> float:
+    expected = sum(counts) / len(counts)
+    return sum((count - expected) ** 2 / expected for count in counts)
+
+
+def UniformityBound(categories: int) -> float:
+    # Four standard deviations above the mean of a chi-square with categories - 1 degrees of freedom
+    df = categories - 1
+    return df + 4 * math.sqrt(2 * df)
+
+
+@pytest.fixture(scope='session')
+def model() -> Model:
+    """Model of Instance.csv, shared by all tests, which must not change it"""
+    m = Model()
+    m.build_model(InstancePath)
+    return m
+
+
+@pytest.fixture(scope='session')
+def generatedModels(tmp_path_factory) -> dict:
+    """Models of small generated instances keyed by layout, which tests must not change"""
+    import InstanceGenerator
+
+    directory = str(tmp_path_factory.mktemp('instances'))
+    models = {}
+    for layout in InstanceGenerator.Layouts:
+        m = Model()
+        m.build_model(InstanceGenerator.WriteInstance(InstanceGenerator.GenerateInstance(150, layout, seed=3),
+                                                      directory))
+        models[layout] = m
+    return models
@@ -0,0 +1,70 @@
+from types import SimpleNamespace
+
+import pytest
+
+import AdaptiveTuning as tune
+from TimeBudget import Deadline
+
+Combinations = [(den, num) for den in (0.2, 0.4, 0.6) for num in (1, 2, 3)]
+
+
+@pytest.fixture
+def smallGrid(monkeypatch):
+    """Races a 3 x 3 grid and restores the exponents afterwards"""
+    monkeypatch.setattr(tune, 'combinations', Combinations)
+    monkeypatch.setattr(tune, 'minInsDenominator', tune.minInsDenominator)
+    monkeypatch.setattr(tune, 'minInsNumerator', tune.minInsNumerator)
+
+
+class RecordingEvaluate:
+    """Scores every combination with a fixed profit and records the calls"""
+
+    def __init__(self, profits: dict):
+        self.profits = profits
+        self.calls = []
+
+    def __call__(self, seeds, budget):
+        combination = (tune.minInsDenominator, tune.minInsNumerator)
+        self.calls.append((combination, list(seeds), budget.Remaining()))
+        return SimpleNamespace(profit=self.profits[combination])
+
+
+def test_race_eliminates_by_profit_in_grid_order(smallGrid):
+    # Ties between the second and third best are kept in grid order
+    profits = {c: 10 * i for i, c in enumerate(Combinations)}
+    profits[Combinations[2]] = profits[Combinations[4]] = profits[Combinations[7]] = 65
+    evaluate = RecordingEvaluate(profits)
+
+    best, combination = tune.RaceExponents(evaluate, seeds=range(9))
+
+    rounds = [[c for c, seeds, _ in evaluate.calls if len(seeds) == size] for size in (1, 3, 9)]
+    assert rounds[0] == Combinations
+    assert rounds[1] == [Combinations[8], Combinations[2], Combinations[4]]
+    assert rounds[2] == [Combinations[8]]
+    assert len(evaluate.calls) == 9 + 3 + 1
+    assert combination == Combinations[8] and best.profit == 80
+    assert (tune.minInsDenominator, tune.minInsNumerator) == combination
+    assert tune.RaceRounds(len(Combinations), 9, 3) == 3
+
+
+def test_race_splits_the_budget_over_rounds_and_evaluations(smallGrid):
+    evaluate = RecordingEvaluate({c: i for i, c in enumerate(Combinations)})
+
+    tune.RaceExponents(evaluate, seeds=range(9), deadline=Deadline(900))
+
+    # The first of three rounds gets a third of the time, split over its nine evaluations.
+    # Evaluations here take no time, so what they leave goes to the next one and the next round.
+    remaining = [budget for _, _, budget in evaluate.calls]
+    assert remaining[0] == pytest.approx(300 / 9, rel=1e-3)
+    assert remaining[8] == pytest.approx(300, rel=1e-3)
+    assert remaining[9] == pytest.approx(900 / 2 / 3, rel=1e-3)
+    assert remaining[12] == pytest.approx(900, rel=1e-3)
+
+
+def test_race_stops_once_the_deadline_expires(smallGrid):
+    evaluate = RecordingEvaluate({c: i for i, c in enumerate(Combinations)})
+
+    best, combination = tune.RaceExponents(evaluate, seeds=range(9), deadline=Deadline(0))
+
+    assert [c for c, _, _ in evaluate.calls] == [Combinations[0]]
+    assert combination == Combinations[0] and best.profit == 0
@@ -0,0 +1,61 @@
+import os
+import shutil
+
+import BatchSolver
+from conftest import InstancePath
+from Solver import Solver
+from TimeBudget import Deadline
+
+
+def Touch(path: str):
+    with open(path, 'w'):
+        pass
+
+
+def test_instance_paths_of_a_directory(tmp_path):
+    for entry in ('b.txt', 'a.txt', 'a.csv', 'c.CSV', 'a.solution.txt', 'notes.md'):
+        Touch(tmp_path / entry)
+    os.mkdir(tmp_path / 'd.csv')
+
+    paths = BatchSolver.InstancePaths(str(tmp_path))
+
+    assert [os.path.basename(path) for path in paths] == ['a.csv', 'b.txt', 'c.CSV']
+
+
+def test_instance_paths_of_a_manifest(tmp_path):
+    manifest = tmp_path / 'nightly.manifest'
+    manifest.write_text("# nightly\nsub/x.csv\n\n  %s  \nsub/x.csv\n" % InstancePath)
+
+    paths = BatchSolver.InstancePaths(str(manifest))
+
+    assert paths == [str(tmp_path / 'sub' / 'x.csv'), InstancePath, str(tmp_path / 'sub' / 'x.csv')]
+
+
+def test_output_names_are_unique_and_stable():
+    paths = ['a/x.csv', 'b/x.txt', 'x_2.csv', 'c/x.csv', 'y.csv']
+
+    names = BatchSolver.OutputNames(paths)
+
+    assert names == ['x', 'x_2', 'x_2_2', 'x_3', 'y']
+    assert BatchSolver.OutputNames(paths) == names
+
+
+def test_batch_matches_solving_each_instance(model, tmp_path):
+    instances = tmp_path / 'instances'
+    os.mkdir(instances)
+    shutil.copy(InstancePath, instances / 'first.csv')
+    shutil.copy(InstancePath, instances / 'second.csv')
+    (instances / 'broken.csv').write_text("not an instance\n")
+    expected = Solver(model).solve([10, 20], Deadline())
+
+    results = list(BatchSolver.SolveBatch(str(instances), str(tmp_path / 'out'), workers=2, seeds=[10, 20]))
+
+    byName = {result.name: result for result in results}
+    assert sorted(byName) == ['broken', 'first', 'second']
+    assert byName['broken'].error and byName['broken'].solutionPath is None
+    for name in ('first', 'second'):
+        result = byName[name]
+        assert result.error is None
+        assert (result.profit, result.duration) == (int(expected.profit), float(expected.duration))
+        assert result.routes == [list(rt.sequenceOfNodes) for rt in expected.routes]
+        assert os.path.isfile(result.solutionPath) and os.path.isfile(result.logPath)
@@ -0,0 +1,39 @@
+import random
+
+from CandidateList import Reservoir
+from conftest import ChiSquare, UniformityBound
+
+
+def test_reservoir_picks_every_candidate_equally_often():
+    rng = random.Random(11)
+    for length in (1, 2, 7, 30):
+        counts = [0] * length
+        for _ in range(600 * length):
+            reservoir = Reservoir(rng)
+            for candidate in range(length):
+                if reservoir.Offer():
+                    reservoir.item = candidate
+            assert reservoir.seen == length
+            counts[reservoir.item] += 1
+        assert min(counts) > 0
+        if length > 1:
+            assert ChiSquare(counts) < UniformityBound(length)
+
+
+def test_reservoir_is_reproducible_and_keeps_its_item_without_offers():
+    kept = object()
+    assert Reservoir(random.Random(3), kept).item is kept
+
+    def Picks(seed):
+        rng = random.Random(seed)
+        picks = []
+        for _ in range(50):
+            reservoir = Reservoir(rng)
+            for candidate in range(10):
+                if reservoir.Offer():
+                    reservoir.item = candidate
+            picks.append(reservoir.item)
+        return picks
+
+    assert Picks(4) == Picks(4)
+    assert Picks(4) != Picks(5)
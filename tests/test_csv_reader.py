@@ -0,0 +1,52 @@
+import os
+
+import numpy as np
+import pytest
+
+import csv_reader
+import ImportBudget
+import InstanceGenerator
+from conftest import InstancePath, Root
+from Model import Model
+
+
+def AssertSameInstance(first: csv_reader.InstanceData, second: csv_reader.InstanceData):
+    assert (first.vehicles, first.capacity, first.duration) == (second.vehicles, second.capacity, second.duration)
+    for name in ('ids', 'coordinates', 'demands', 'serviceTimes', 'profits'):
+        a, b = getattr(first, name), getattr(second, name)
+        assert a.dtype == b.dtype
+        assert np.array_equal(a, b)
+
+
+def test_txt_and_csv_of_the_shipped_instance_agree():
+    csv = csv_reader.LoadInstance(InstancePath)
+    txt = csv_reader.LoadInstance(os.path.join(Root, 'Instance.txt'))
+    AssertSameInstance(csv, txt)
+    assert len(csv.ids) == 337 and csv.ids[0] == 0
+
+    fromCsv, fromTxt = Model(), Model()
+    fromCsv.build_model(InstancePath)
+    fromTxt.build_model(os.path.join(Root, 'Instance.txt'))
+    assert [c.id for c in fromTxt.customers] == [c.id for c in fromCsv.customers]
+    assert len(fromCsv.customers) < len(fromCsv.allNodes) - 1
+
+
+def test_txt_and_csv_of_a_generated_instance_agree(tmp_path):
+    path = InstanceGenerator.WriteInstance(InstanceGenerator.GenerateInstance(40, 'clustered', seed=2), str(tmp_path))
+    AssertSameInstance(csv_reader.LoadInstance(path), csv_reader.LoadInstance(path[:-4] + '.txt'))
+
+
+def test_short_instance_is_rejected(tmp_path):
+    with open(InstancePath) as f:
+        lines = f.readlines()
+    path = tmp_path / 'short.csv'
+    path.write_text(''.join(lines[:-3]))
+
+    with pytest.raises(ValueError, match='customer rows'):
+        csv_reader.LoadInstance(str(path))
+
+
+@pytest.mark.parametrize('module', ['csv_reader', 'Model'])
+def test_import_does_no_io(module):
+    probe = ImportBudget.Probe(module)
+    assert probe['opened'] == []
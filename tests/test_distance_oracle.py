@@ -0,0 +1,47 @@
+import numpy as np
+import pytest
+
+import AdaptiveTuning as tune
+from conftest import InstancePath
+from DistanceOracle import DistanceOracle
+from Model import Model
+from Solver import Solver
+from TimeBudget import Deadline
+
+
+@pytest.fixture(scope='module')
+def oracleModel() -> Model:
+    # Far below the dense matrices of Instance.csv, so row blocks hold only a few rows
+    m = Model(memoryLimit=200_000)
+    m.build_model(InstancePath)
+    return m
+
+
+def test_oracle_entries_equal_the_dense_matrices(model, oracleModel):
+    assert isinstance(oracleModel.distances, DistanceOracle)
+    assert isinstance(oracleModel.durations, DistanceOracle)
+    n = len(model.allNodes)
+    assert oracleModel.distances.blockRows < n
+    rows, cols = np.arange(n)[:, None], np.arange(n)[None, :]
+    for dense, oracle in ((model.distances, oracleModel.distances), (model.durations, oracleModel.durations)):
+        assert np.array_equal(oracle[rows, cols], dense)
+        assert np.array_equal(oracle[0:n], dense)
+        for i, j in ((0, 0), (0, 5), (17, 3), (n - 1, 1)):
+            assert oracle[i, j] == dense[i, j]
+            assert np.array_equal(oracle[i], dense[i])
+
+
+def test_oracle_nearest_neighbours_equal_the_dense_ones(model, oracleModel):
+    for k in (1, 5, 20):
+        assert np.array_equal(oracleModel.nearest_neighbours(k), model.nearest_neighbours(k))
+
+
+@pytest.mark.parametrize('granularNeighbours', [None, 8])
+def test_oracle_model_solves_like_the_dense_model(model, oracleModel, monkeypatch, granularNeighbours):
+    monkeypatch.setattr(tune, 'granularNeighbours', granularNeighbours)
+
+    dense = Solver(model).solve([10, 20], Deadline())
+    computed = Solver(oracleModel).solve([10, 20], Deadline())
+
+    assert (computed.profit, computed.duration) == (dense.profit, dense.duration)
+    assert [rt.sequenceOfNodes for rt in computed.routes] == [rt.sequenceOfNodes for rt in dense.routes]
@@ -0,0 +1,87 @@
+import math
+
+import pytest
+
+import AdaptiveTuning as tune
+import Solver as solver_module
+from CandidateList import RestrictedCandidateList
+from Solver import BoundedInsertionTable, InsertionTable, Solver
+
+
+class PairedTables:
+    """Drives MinimumInsertions with `InsertionTable` and checks a bounded twin at every step"""
+
+    def __init__(self, model, pool, routes):
+        self.reference = InsertionTable(model, pool, routes)
+        self.bounded = BoundedInsertionTable(model, pool, routes)
+        self.fills = 0
+
+    def AddRoute(self, route):
+        self.reference.AddRoute(route)
+        self.bounded.AddRoute(route)
+
+    def Insert(self, cust, routeIndex):
+        self.reference.Insert(cust, routeIndex)
+        self.bounded.Insert(cust, routeIndex)
+
+    def CandidateCount(self):
+        return self.reference.CandidateCount()
+
+    def FillCandidateList(self, rcl):
+        self.reference.FillCandidateList(rcl)
+        twin = RestrictedCandidateList(rcl.capacity, rcl.precision)
+        self.bounded.FillCandidateList(twin)
+        assert sorted(entry[0] for entry in twin.heap) == sorted(entry[0] for entry in rcl.heap)
+        self.CheckBounds()
+        self.fills += 1
+
+    def CheckBounds(self):
+        for row, cust in enumerate(self.bounded.customers):
+            if cust not in self.reference.entries:
+                continue
+            for routeIndex, scored in enumerate(self.reference.entries[cust]):
+                best = max((trialProfit for trialProfit, _ in scored), default=-math.inf)
+                assert best <= self.bounded.bounds[routeIndex][row]
+
+
+def test_bounded_table_offers_the_best_insertions_of_the_full_table(model, monkeypatch):
+    tables = []
+
+    def Paired(*args):
+        tables.append(PairedTables(*args))
+        return tables[-1]
+
+    # Without the tie tolerance the list holds exactly the best scores, whatever the visiting order
+    monkeypatch.setattr(tune, 'precision', 0)
+    monkeypatch.setattr(solver_module, 'InsertionTable', Paired)
+    Solver(model).MinimumInsertions(itr=10, foundSolution=None)
+
+    assert tables and tables[0].fills > 10
+
+
+def test_bounded_insertions_build_the_same_routes(model, monkeypatch):
+    for itr in (10, 20, 30):
+        reference = Solver(model).MinimumInsertions(itr=itr, foundSolution=None)
+        monkeypatch.setattr(tune, 'boundedInsertions', True)
+        bounded = Solver(model).MinimumInsertions(itr=itr, foundSolution=None)
+        monkeypatch.setattr(tune, 'boundedInsertions', False)
+
+        assert (bounded.profit, bounded.duration) == (reference.profit, reference.duration)
+        assert [rt.sequenceOfNodes for rt in bounded.routes] == [rt.sequenceOfNodes for rt in reference.routes]
+
+
+@pytest.mark.parametrize('instance', ['Instance.csv', 'random', 'clustered', 'mixed'])
+def test_batch_scoring_builds_the_same_routes(instance, model, generatedModels, monkeypatch):
+    m = model if instance == 'Instance.csv' else generatedModels[instance]
+    for itr in (10, 20, 30):
+        reference = Solver(m).MinimumInsertions(itr=itr)
+        batched = Solver(m, batchScoring=True).MinimumInsertions(itr=itr)
+        monkeypatch.setattr(tune, 'boundedInsertions', True)
+        bounded = Solver(m).MinimumInsertions(itr=itr)
+        monkeypatch.setattr(tune, 'boundedInsertions', False)
+
+        routes = [rt.sequenceOfNodes for rt in reference.routes]
+        assert reference.profit > 0
+        for sol in (batched, bounded):
+            assert (sol.profit, sol.duration) == (reference.profit, reference.duration)
+            assert [rt.sequenceOfNodes for rt in sol.routes] == routes
@@ -0,0 +1,50 @@
+import copy
+
+import pytest
+
+import AdaptiveTuning as tune
+import Instrumentation as stats
+import Optimization
+from Solver import Solver
+from TimeBudget import Deadline
+
+
+@pytest.fixture
+def enabled():
+    stats.Enable()
+    yield
+    stats.Enable(False)
+
+
+def Routes(sol) -> list:
+    return [list(rt.sequenceOfNodes) for rt in sol.routes]
+
+
+def test_counting_leaves_the_solve_unchanged(model, enabled):
+    counted = Solver(model).solve([10, 20], Deadline())
+    assert stats.counters['vns.descents'] > 0
+    assert stats.phaseCalls['solve'] == 1
+
+    stats.Enable(False)
+    plain = Solver(model).solve([10, 20], Deadline())
+    assert not stats.counters and not stats.phaseCalls
+
+    assert (counted.profit, counted.duration) == (plain.profit, plain.duration)
+    assert Routes(counted) == Routes(plain)
+
+
+@pytest.mark.parametrize('dontLookBits', [False, True])
+def test_batched_scans_count_like_scalar_scans(model, enabled, monkeypatch, dontLookBits):
+    monkeypatch.setattr(tune, 'dontLookBits', dontLookBits)
+    sol = Solver(model).MinimumInsertions(itr=10, foundSolution=None)
+    runs = []
+    for threshold in (None, 1):
+        monkeypatch.setattr(tune, 'batchMoveThreshold', threshold)
+        stats.Reset()
+        routes = [Routes(Optimization.LocalSearch(copy.deepcopy(sol), model, None, operator).run())
+                  for operator in range(3)]
+        runs.append((routes, dict(stats.counters)))
+
+    assert runs[0] == runs[1]
+    for name in ('relocation', 'swap', 'twoOpt'):
+        assert runs[0][1]['localSearch.%s.evaluated' % name] > 0
@@ -0,0 +1,55 @@
+import os
+
+import numpy as np
+
+from conftest import InstancePath
+from Model import Model
+from Solver import Solver
+from TimeBudget import Deadline
+
+ArrayNames = ('coordinates', 'demands', 'serviceTimes', 'profits', 'distances', 'durations')
+
+
+def ReadText(path: str) -> str:
+    with open(path, newline='') as f:
+        return f.read()
+
+
+def test_cache_round_trip(model, tmp_path):
+    cacheDir = str(tmp_path)
+    built, mapped = Model(), Model()
+
+    assert built.build_model(InstancePath, cacheDir) is False
+    assert os.listdir(cacheDir)
+    assert mapped.build_model(InstancePath, cacheDir) is True
+
+    for name in ArrayNames:
+        array = getattr(mapped, name)
+        assert not array.flags.writeable
+        assert array.dtype == getattr(model, name).dtype
+        assert np.array_equal(array, getattr(model, name))
+    assert (mapped.vehicles, mapped.max_capacity, mapped.max_duration) == \
+        (model.vehicles, model.max_capacity, model.max_duration)
+    assert [c.id for c in mapped.customers] == [c.id for c in model.customers]
+
+    expected = Solver(model).solve([10, 20], Deadline())
+    sol = Solver(mapped).solve([10, 20], Deadline())
+    assert (sol.profit, sol.duration) == (expected.profit, expected.duration)
+    assert [rt.sequenceOfNodes for rt in sol.routes] == [rt.sequenceOfNodes for rt in expected.routes]
+
+
+def test_text_and_file_builds_share_the_cache(model, tmp_path):
+    text = ReadText(InstancePath)
+
+    fromFile = str(tmp_path / 'file')
+    assert Model().build_model(InstancePath, fromFile) is False
+    assert Model().build_model_from_text(text, fromFile) is True
+
+    fromText = str(tmp_path / 'text')
+    payload = Model()
+    assert payload.build_model_from_text(text, fromText) is False
+    assert sorted(os.listdir(fromText)) == sorted(os.listdir(fromFile))
+    mapped = Model()
+    assert mapped.build_model(InstancePath, fromText) is True
+    assert np.array_equal(mapped.durations, model.durations)
+    assert [c.id for c in payload.customers] == [c.id for c in model.customers]
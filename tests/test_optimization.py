@@ -0,0 +1,165 @@
+import copy
+import random
+
+import numpy as np
+import pytest
+
+import AdaptiveTuning as tune
+import Optimization
+from CandidateList import Reservoir
+from conftest import ChiSquare, UniformityBound
+from Solver import Solver
+from TimeBudget import Deadline
+
+
+def test_vns_restarts_from_first_operator(model, monkeypatch):
+    shakes = []
+    shake = Optimization.Shake
+
+    def RecordingShake(s, k, model, improvingOnly=True):
+        before = (s.profit, s.duration, [list(rt.sequenceOfNodes) for rt in s.routes])
+        ss = shake(s, k, model, improvingOnly)
+        # The shaken neighbour is a copy, the incumbent is left as it was
+        assert ss is not s
+        assert all(a is not b for a, b in zip(ss.routes, s.routes))
+        assert (s.profit, s.duration, [list(rt.sequenceOfNodes) for rt in s.routes]) == before
+        shakes.append(k)
+        return ss
+
+    monkeypatch.setattr(Optimization, 'Shake', RecordingShake)
+    solver = Solver(model)
+    sol = solver.MinimumInsertions(itr=10, foundSolution=None)
+    initial = copy.deepcopy(sol)
+    best = Optimization.VNS(sol, 4, model, Deadline())
+
+    assert any(k > 0 and nextK == 0 for k, nextK in zip(shakes, shakes[1:]))
+    assert shakes[-5:] == [0, 1, 2, 3, 4]
+    assert (best.profit, -best.duration) > (initial.profit, -initial.duration)
+
+
+def Fields(move) -> dict:
+    return {name: getattr(move, name) for name in type(move).__slots__}
+
+
+def test_remembered_moves_match_a_scan_from_scratch(model):
+    solver = Solver(model)
+    sol = solver.MinimumInsertions(itr=10, foundSolution=None)
+    for operator in range(3):
+        search = Optimization.LocalSearch(copy.deepcopy(sol), model, None, operator)
+        find, apply = [(search.FindBestRelocationMove, search.ApplyRelocationMove),
+                       (search.FindBestSwapMove, search.ApplySwapMove),
+                       (search.FindBestTwoOptMove, search.ApplyTwoOptMove)][operator]
+        applied = 0
+        while True:
+            move = find()
+            fresh = Optimization.LocalSearch(copy.deepcopy(search.initialSolution), model, None, operator)
+            scratch = [fresh.FindBestRelocationMove, fresh.FindBestSwapMove, fresh.FindBestTwoOptMove][operator]()
+            assert Fields(move) == Fields(scratch)
+            if move.moveDur >= 0:
+                break
+            apply()
+            applied += 1
+        assert applied > 0
+
+
+def test_remembered_ties_go_to_the_first_move_found(model):
+    sol = Solver(model).MinimumInsertions(itr=10, foundSolution=None)
+    search = Optimization.LocalSearch(sol, model, None, 0)
+    for pair, moveDur in (((1, 2), -1.0), ((0, 3), -1.0), ((0, 1), -1.0 + 1e-9)):
+        move = Optimization.RelocationMove()
+        move.Initialize(*pair, 1, 1, 0, 0, moveDur)
+        search.moveMemory[0][pair] = move
+    best = search.BestRememberedMove(0, Optimization.RelocationMove())
+    assert (best.originRoutePosition, best.targetRoutePosition) == (0, 3)
+
+    assert Optimization.ReplayBestIndex(np.array([0.5, -1.0, -1.0, np.inf])) == 1
+    assert Optimization.ReplayBestIndex(np.array([0.0, np.inf])) == -1
+
+
+def FindAndApply(search, operator: int) -> tuple:
+    return [(search.FindBestRelocationMove, search.ApplyRelocationMove),
+            (search.FindBestSwapMove, search.ApplySwapMove),
+            (search.FindBestTwoOptMove, search.ApplyTwoOptMove),
+            (search.FindBestInsertionMove, search.ApplyInsertionMove),
+            (search.FindBestExchangeMove, search.ApplyExchangeMove)][operator]
+
+
+@pytest.mark.parametrize('dontLookBits', [False, True])
+@pytest.mark.parametrize('operator', range(5))
+def test_batched_scans_pick_the_moves_of_scalar_scans(model, monkeypatch, operator, dontLookBits):
+    monkeypatch.setattr(tune, 'dontLookBits', dontLookBits)
+    sol = Solver(model).MinimumInsertions(itr=10, foundSolution=None)
+    if operator >= 3:
+        # Construction leaves nothing to insert until the route moves free some slack
+        for routeOperator in range(3):
+            sol = Optimization.LocalSearch(sol, model, None, routeOperator).run()
+    scalar = Optimization.LocalSearch(copy.deepcopy(sol), model, None, operator)
+    batched = Optimization.LocalSearch(copy.deepcopy(sol), model, None, operator)
+
+    for improvingOnly in (True, False):
+        samples = []
+        for search, threshold in ((scalar, None), (batched, 1)):
+            monkeypatch.setattr(tune, 'batchMoveThreshold', threshold)
+            sample = search.SampleMove(random.Random(5), improvingOnly)
+            samples.append(None if sample is None else Fields(sample))
+        assert samples[0] == samples[1]
+
+    applied = 0
+    while True:
+        monkeypatch.setattr(tune, 'batchMoveThreshold', None)
+        move = FindAndApply(scalar, operator)[0]()
+        monkeypatch.setattr(tune, 'batchMoveThreshold', 1)
+        batchedMove = FindAndApply(batched, operator)[0]()
+        assert Fields(batchedMove) == Fields(move)
+        if not (move.profitGain > 0 if operator >= 3 else move.moveDur < -tune.precision):
+            break
+        FindAndApply(scalar, operator)[1]()
+        FindAndApply(batched, operator)[1]()
+        applied += 1
+    assert applied > 0
+    assert [rt.sequenceOfNodes for rt in batched.initialSolution.routes] == \
+        [rt.sequenceOfNodes for rt in scalar.initialSolution.routes]
+
+
+def Snapshot(sol) -> tuple:
+    return sol.profit, sol.duration, [copy.deepcopy(Fields(rt)) for rt in sol.routes]
+
+
+def Improving(move, operator: int) -> bool:
+    return move.profitGain > 0 if operator >= 3 else move.moveDur < 0
+
+
+@pytest.mark.parametrize('operator', range(5))
+def test_sampled_moves_are_uniform_and_leave_the_solution_unchanged(model, monkeypatch, operator):
+    reservoirs = []
+
+    class RecordingReservoir(Reservoir):
+        def __init__(self, *args):
+            super().__init__(*args)
+            reservoirs.append(self)
+
+    monkeypatch.setattr(Optimization, 'Reservoir', RecordingReservoir)
+    sol = Solver(model).MinimumInsertions(itr=10, foundSolution=None)
+    if operator >= 3:
+        for routeOperator in range(3):
+            sol = Optimization.LocalSearch(sol, model, None, routeOperator).run()
+    search = Optimization.LocalSearch(sol, model, None, operator)
+    # A scan beforehand must not hide the remembered pairs from the samples
+    FindAndApply(search, operator)[0]()
+    before, unrouted = Snapshot(sol), set(search.unrouted)
+
+    rng = random.Random(operator)
+    counts = {}
+    for _ in range(40 * 8):
+        move = search.SampleMove(rng)
+        assert Improving(move, operator)
+        key = tuple(Fields(move).values())
+        counts[key] = counts.get(key, 0) + 1
+    anyMove = search.SampleMove(rng, improvingOnly=False)
+
+    assert Snapshot(sol) == before and search.unrouted == unrouted
+    improving = {reservoir.seen for reservoir in reservoirs[:-1]}
+    assert improving == {len(counts)} and len(counts) > 1
+    assert ChiSquare(list(counts.values())) < UniformityBound(len(counts))
+    # Every feasible insertion gains profit, so only the other operators offer more moves
+    assert anyMove is not None and reservoirs[-1].seen >= len(counts) + (operator != 3)
@@ -0,0 +1,41 @@
+import pytest
+
+from Solver import Solver
+from Testing import TestSolution
+from TimeBudget import Deadline
+
+
+@pytest.mark.parametrize('instance', ['Instance.csv', 'mixed'])
+def test_parallel_solve_equals_sequential_solve(instance, model, generatedModels):
+    m = model if instance == 'Instance.csv' else generatedModels[instance]
+    seeds = [10, 20, 30]
+
+    sequential = Solver(m).solve(seeds, Deadline())
+    parallel = Solver(m).solve(seeds, Deadline(), workers=2)
+
+    assert (parallel.profit, parallel.duration) == (sequential.profit, sequential.duration)
+    assert [rt.sequenceOfNodes for rt in parallel.routes] == [rt.sequenceOfNodes for rt in sequential.routes]
+
+
+def test_ties_go_to_the_earlier_seed(model):
+    solver = Solver(model)
+    first = solver.IndependentStart(10)[1]
+    solver.KeepBest(0, first)
+    second = solver.IndependentStart(10)[1]
+    solver.KeepBest(0, second)
+
+    assert solver.overallBestSol is first
+
+
+@pytest.mark.parametrize('workers', [None, 2])
+def test_expired_deadline_still_makes_one_full_start(model, workers):
+    deadline = Deadline(0)
+    assert deadline.Expired()
+
+    sol = Solver(model).solve([10, 20], deadline, workers=workers)
+
+    # The first construction runs to the end, VNS and the other starts are skipped
+    assert sol.profit == Solver(model).MinimumInsertions(itr=10).profit > 0
+    assert all(len(rt.sequenceOfNodes) > 2 for rt in sol.routes)
+    assert all(rt.load <= rt.capacity and rt.travelled <= rt.duration for rt in sol.routes)
+    assert TestSolution(sol, model)
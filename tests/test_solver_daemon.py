@@ -0,0 +1,83 @@
+import os
+import queue
+import threading
+
+import SolverDaemon
+from SolverDaemon import SolverDaemon as Daemon
+
+from conftest import InstancePath
+
+
+def ReadJob(outbox: queue.Queue) -> list:
+    """Collects the messages of one job until it finishes"""
+    messages = []
+    while not messages or messages[-1]["status"] not in ("done", "error"):
+        messages.append(outbox.get(timeout=60))
+    return messages
+
+
+def test_job_lifecycle_over_a_socket(tmp_path):
+    address = str(tmp_path / 'daemon.sock')
+    server = threading.Thread(target=SolverDaemon.Serve, args=(address, Daemon(workers=1)))
+    server.start()
+    try:
+        while not os.path.exists(address):
+            server.join(0.05)
+        with open(InstancePath, newline='') as f:
+            job = {"id": "first", "instance": f.read(), "seeds": [10, 20]}
+        first = list(SolverDaemon.Submit(address, job))
+        again = list(SolverDaemon.Submit(address, dict(job, id="again")))
+        byPath = list(SolverDaemon.Submit(address, {"path": InstancePath, "seeds": [10, 20]}))
+        bad = list(SolverDaemon.Submit(address, dict(job, tuning={"noSuchSetting": 1})))
+    finally:
+        connection = SolverDaemon.Connect(address)
+        connection.sendall(b'{"command": "shutdown"}\n')
+        connection.close()
+        server.join(60)
+
+    assert [m["status"] for m in first][:2] == ["queued", "running"]
+    assert all(m["id"] == "first" for m in first)
+    assert "incumbent" in [m["status"] for m in first]
+    assert first[-1]["status"] == "done" and first[-1]["model"] == "built"
+    assert again[-1]["model"] == "memory" and byPath[-1]["model"] == "memory"
+    assert again[-1]["routes"] == first[-1]["routes"] == byPath[-1]["routes"]
+    assert bad[-1]["status"] == "error" and "noSuchSetting" in bad[-1]["error"]
+    assert not os.path.exists(address)
+
+
+def test_workers_share_the_disk_cache(tmp_path):
+    daemon = Daemon(workers=2, cacheDir=str(tmp_path))
+    daemon.Start()
+    try:
+        first, second = queue.Queue(), queue.Queue()
+        daemon.Submit({"path": InstancePath, "seeds": [10]}, first)
+        ReadJob(first)
+        # Keep the worker holding the model busy, so the next job goes to the other one
+        daemon.Submit({"path": InstancePath, "seeds": list(range(10, 200, 10))}, first)
+        daemon.Submit({"path": InstancePath, "seeds": [10]}, second)
+        messages = ReadJob(second)
+        ReadJob(first)
+    finally:
+        daemon.Close()
+
+    assert messages[-1]["model"] == "disk"
+
+
+def test_dead_worker_fails_its_job_and_is_replaced():
+    daemon = Daemon(workers=1)
+    daemon.Start()
+    try:
+        outbox = queue.Queue()
+        daemon.Submit({"path": InstancePath, "seeds": list(range(10, 2000, 10))}, outbox)
+        assert [outbox.get(timeout=60)["status"] for _ in range(2)] == ["queued", "running"]
+        daemon.processes[0].kill()
+        failed = ReadJob(outbox)
+        daemon.Submit({"path": InstancePath, "seeds": [10]}, outbox)
+        after = ReadJob(outbox)
+        status = daemon.Status()
+    finally:
+        daemon.Close()
+
+    assert failed[-1]["status"] == "error" and "Worker exited" in failed[-1]["error"]
+    assert after[-1]["status"] == "done"
+    assert status["replacedWorkers"] == 1 and status["running"] == 0 and status["queued"] == 0
@@ -0,0 +1,66 @@
+import math
+import random
+
+import Instrumentation as stats
+from Solver import Solver
+from SpatialIndex import SpatialGrid
+
+
+def BruteForceDetour(coordinates, ids, a: int, b: int, reach: float) -> set:
+    return {p for p in ids
+            if math.dist(coordinates[a], coordinates[p]) + math.dist(coordinates[p], coordinates[b]) <= reach}
+
+
+def test_within_detour_keeps_every_node_of_a_full_scan(model):
+    coordinates = model.coordinates.tolist()
+    ids = [c.id for c in model.customers]
+    grid = SpatialGrid(model.coordinates, ids)
+    rng = random.Random(1)
+    pruning = 0
+    for _ in range(300):
+        if rng.random() < 0.1 and len(ids) > 1:
+            removed = ids.pop(rng.randrange(len(ids)))
+            grid.Remove(removed)
+        a, b = rng.randrange(len(coordinates)), rng.randrange(len(coordinates))
+        reach = math.dist(coordinates[a], coordinates[b]) * rng.uniform(0.9, 1.5) + rng.uniform(0, 30)
+        found = grid.WithinDetour(a, b, reach)
+
+        assert found == sorted(found)
+        assert set(found) <= set(ids)
+        assert BruteForceDetour(coordinates, ids, a, b, reach) <= set(found)
+        pruning += len(found) < len(ids)
+    assert pruning > 0
+
+
+def test_nearest_neighbor_matches_a_scan_of_the_pool(model, monkeypatch):
+    indexed = [Solver(model).NearestNeighbor(itr) for itr in (10, 20, 30)]
+
+    findBestNN = Solver.FindBestNN
+    monkeypatch.setattr(Solver, 'FindBestNN',
+                        lambda self, pool, route, itr, grid=None, pruned=None: findBestNN(self, pool, route, itr))
+    scanned = [Solver(model).NearestNeighbor(itr) for itr in (10, 20, 30)]
+
+    for sol, reference in zip(indexed, scanned):
+        assert (sol.profit, sol.duration) == (reference.profit, reference.duration)
+        assert [rt.sequenceOfNodes for rt in sol.routes] == [rt.sequenceOfNodes for rt in reference.routes]
+
+
+def test_nearest_neighbor_counts_only_the_scored_candidates(model, monkeypatch):
+    counters = []
+    findBestNN = Solver.FindBestNN
+    for scan in (False, True):
+        if scan:
+            monkeypatch.setattr(Solver, 'FindBestNN',
+                                lambda self, pool, route, itr, grid=None, pruned=None: findBestNN(self, pool, route, itr))
+        stats.Enable()
+        try:
+            Solver(model).NearestNeighbor(10)
+            counters.append(dict(stats.counters))
+        finally:
+            stats.Enable(False)
+    indexed, scanned = counters
+
+    # The grid only drops customers a scan would skip without scoring them
+    assert indexed['construction.nnCandidatesScored'] == scanned['construction.nnCandidatesScored'] > 0
+    assert scanned['construction.nnCandidatesVisited'] > scanned['construction.nnCandidatesScored']
+    assert indexed['construction.nnCandidatesVisited'] < scanned['construction.nnCandidatesVisited']
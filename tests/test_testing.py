@@ -0,0 +1,29 @@
+import numpy as np
+
+import AdaptiveTuning as tune
+from Model import Model
+from Solver import Solver
+from Testing import TestSolution
+from TimeBudget import Deadline
+
+from conftest import InstancePath
+
+
+def test_cross_check_accepts_float32_rounding(monkeypatch, capsys):
+    monkeypatch.setattr(tune, 'debugBookkeeping', True)
+    model = Model(np.float32)
+    model.build_model(InstancePath)
+
+    sol = Solver(model).solve([10, 20], Deadline())
+
+    assert TestSolution(sol, model)
+    output = capsys.readouterr().out
+    assert 'problem' not in output and 'Issue' not in output
+
+
+def test_cross_check_reports_wrong_totals(model, capsys):
+    sol = Solver(model).solve([10], Deadline())
+    sol.routes[0].travelled += 0.01
+
+    assert not TestSolution(sol, model)
+    assert 'Route Cost Issue' in capsys.readouterr().out
@@ -0,0 +1,26 @@
+import math
+import time
+
+import pytest
+
+from TimeBudget import Deadline
+
+
+def test_unlimited_deadline():
+    deadline = Deadline()
+    assert not deadline.Expired()
+    assert deadline.Remaining() == math.inf
+    assert deadline.Slice(0.1).Remaining() == math.inf
+
+
+def test_deadline_expires_and_slices_the_time_left():
+    assert Deadline(0).Expired()
+    assert Deadline(0).Remaining() == 0
+
+    deadline = Deadline(1000)
+    assert deadline.Slice(0.25).Remaining() == pytest.approx(250, rel=1e-3)
+    short = Deadline(0.2)
+    assert not short.Expired()
+    time.sleep(0.25)
+    assert short.Expired() and short.Remaining() == 0
+    assert short.Slice(0.5).Expired()
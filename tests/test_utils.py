@@ -0,0 +1,65 @@
+import pytest
+
+import Optimization
+from Model import Route
+from Solver import Solver
+from Utils import CapacityOrDurationIsViolated, UpdateRouteLoadDurAndProfit, UpdateRouteSegments
+
+Tolerance = 1e-9
+
+
+def Simulate(model, template: Route, sequence: list) -> Route:
+    rt = Route(sequence[0], template.capacity, template.duration)
+    rt.sequenceOfNodes = sequence
+    UpdateRouteLoadDurAndProfit(model.durations, model.demands, model.profits, rt)
+    return rt
+
+
+def Splits(model, sol):
+    """Yields every inter-route 2-opt split with the two routes it builds, walked node by node"""
+    for rt in sol.routes:
+        UpdateRouteSegments(model.durations, model.demands, model.profits, rt)
+    for rtInd1, rt1 in enumerate(sol.routes):
+        for rt2 in sol.routes[rtInd1 + 1:]:
+            seq1, seq2 = rt1.sequenceOfNodes, rt2.sequenceOfNodes
+            for nodeInd1 in range(len(seq1) - 1):
+                for nodeInd2 in range(len(seq2) - 1):
+                    yield rt1, nodeInd1, rt2, nodeInd2, \
+                        Simulate(model, rt1, seq1[:nodeInd1 + 1] + seq2[nodeInd2 + 1:]), \
+                        Simulate(model, rt2, seq2[:nodeInd2 + 1] + seq1[nodeInd1 + 1:])
+
+
+def Solutions(model):
+    sol = Solver(model).MinimumInsertions(itr=10, foundSolution=None)
+    yield sol
+    # Route moves tighten the routes, so more splits end close to the limits
+    for operator in range(3):
+        sol = Optimization.LocalSearch(sol, model, None, operator).run()
+    yield sol
+
+
+@pytest.mark.parametrize('instance', ['Instance.csv', 'clustered', 'mixed'])
+def test_two_opt_check_agrees_with_a_route_simulation(instance, model, generatedModels):
+    m = model if instance == 'Instance.csv' else generatedModels[instance]
+    checked, violated, missedArcs = 0, 0, 0
+    for sol in Solutions(m):
+        for rt1, nodeInd1, rt2, nodeInd2, new1, new2 in Splits(m, sol):
+            overLoad = max(new1.load - new1.capacity, new2.load - new2.capacity)
+            overDuration = max(new1.travelled - new1.duration, new2.travelled - new2.duration)
+            if overLoad <= 0 and abs(overDuration) < Tolerance:
+                continue
+            expected = overLoad > 0 or overDuration > 0
+            assert CapacityOrDurationIsViolated(m.durations, rt1, nodeInd1, rt2, nodeInd2) == expected
+            checked += 1
+            violated += expected
+
+            # The baseline check summed the kept segments but not the two arcs joining them
+            seq1, seq2 = rt1.sequenceOfNodes, rt2.sequenceOfNodes
+            withoutArcs1 = new1.travelled - m.durations[seq1[nodeInd1], seq2[nodeInd2 + 1]]
+            withoutArcs2 = new2.travelled - m.durations[seq2[nodeInd2], seq1[nodeInd1 + 1]]
+            if overLoad <= 0 and overDuration > 0 and \
+                    withoutArcs1 <= new1.duration and withoutArcs2 <= new2.duration:
+                missedArcs += 1
+
+    assert 0 < violated < checked
+    assert missedArcs > 0